@@ -3449,12 +3449,9 @@ class Ui_MainWindow(object):
                     fd.write('mdots_1           = ' + list2txt(mdots_1[case_act])      + '\n')
                 if 'reactor' in configs[case_act]:
                     fd.write('n_pts             = ' + str(n_pts[case_act])             + '\n')
-                    fd.write('delta_npts        = ' + str(delta_npts[case_act])        + '\n')
                     fd.write('t_max_coeff       = ' + str(t_max_coeff[case_act])       + '\n')
                     fd.write('Scal_ref          = ' + Scal_ref[case_act]               + '\n')
                     fd.write('grad_curv_ratio   = ' + str(grad_curv_ratio[case_act])   + '\n')
-                    fd.write('tign_nPoints      = ' + str(tign_nPoints[case_act])      + '\n')
-                    fd.write('tign_dt           = ' + str(tign_dt[case_act])           + '\n')
                 elif 'PSR' in configs[case_act]:
                     fd.write('t_max             = ' + str(t_max[case_act])             + '\n')
                 elif 'PFR' in configs[case_act]:
@@ -29,6 +29,14 @@ import sys as sys
 import time as timer
 import cantera as ct
 import copy
+import pickle
+from scipy import sparse
+
+# ct.Species / ct.Reaction objects of the reference mechanisms, interpreted
+# once per process (cantera objects are not picklable : not in Mech_data)
+_ct_mech_objects = {}
+# ct.Solution of the GA mechanisms, updated in place for each individual
+_ct_solutions    = {}
 
 #import re
 #from operator import xor
@@ -273,7 +281,8 @@ class conditions :
 class Red_operator :
     def __init__(self,target_species,optimization=False,n_points=20,          \
                  max_error_sp=30, max_error_T=10, max_error_ig = 10,          \
-                 max_error_Sl=10, max_error_K=20, inter_sp_inter = True,                      \
+                 max_error_Sl=10, max_error_K=20, inter_sp_inter = True,      \
+                 precomp_OIC = True,                                          \
                  eps_init=0.06,delta_eps_init=0.005,eps_max=2.0,              \
                  r_withdraw_intensity = 10,\
 #                 sp_interaction_coeffs=[],r_interaction_coeffs=[]\
@@ -305,6 +314,8 @@ class Red_operator :
         self.inter_sp_inter     = inter_sp_inter
         # drg
         self.graph_search       = 'Dijkstra'  # Dijkstra DFS
+        self.precomp_OIC        = precomp_OIC # eps steps: threshold of OIC table
+        self.OIC_table          = {}          # {path_op / 'SARGEP' / 'SAR' : table}
 
         # sa
         self.tol_ts             = tol_ts
@@ -348,6 +359,13 @@ class Errors:
                 = self.qoi_test(self.qoi_s,self.qoi_T,self.qoi_Sl,self.qoi_ig,\
                   self.qoi_K,conditions,red_data_meth)
 
+    def near_tol(self,conditions,red_data_meth):
+        """ True if all the errors are below screening_margin x tolerances
+            (screened candidates to evaluate at full fidelity)            """
+        return self.qoi_test(self.qoi_s,self.qoi_T,self.qoi_Sl,self.qoi_ig,\
+                  self.qoi_K,conditions,red_data_meth,\
+                  margin=conditions.error_param.screening_margin)[5]
+
 
     def er_estim_s(self,conditions,red_data,ref_results,red_results):
 
@@ -374,70 +392,47 @@ class Errors:
 
         if error_calculation =="points":
 
+            # (points x target species) data
+            index = [gas_ref.species_index(tspc[k]) for k in range(n_tspc)]
+            data1 = np.array(conc_ref[:n_points])[:,index]
+            data2 = np.array(conc_red[:n_points])[:,index]
+            diff  = np.abs(data1-data2)
+            data  = np.sum(data1,axis=0)>0    # absence of data if experimental optimization
+            data1[:,~data] = 1                # (columns without data are not used)
+
+            if error_type == "all":
+                sumDiff = diff/np.amax(data1,axis=0)
+                sumDiff = [list(sumDiff[:,k]) for k in range(n_tspc)]
+            elif error_type == "mean":
+                w = self.trapz_weights(pts_scatter)
+                sumDiff = list(np.dot(w,diff)/np.dot(w,np.abs(data1)))
+            elif error_type == "max":
+                sumDiff = list(np.amax(diff,axis=0)/np.amax(data1,axis=0))
             for k in range(n_tspc):
+                if data[k]: QoI.append(sumDiff[k])
+                else:       QoI.append(False)
 
-                index = gas_ref.species_index(tspc[k])
 
-                data1 = np.zeros(n_points)
-                data2 = np.zeros(n_points)
-                for i in range(n_points):
-                    data1[i] = conc_ref[i][index]
-                    data2[i] = conc_red[i][index]
-                if sum(data1)>0:      # absence of data if experimental optimization
-                    sumDiff = 0
-                    if error_type == "all":
-                        sumDiff = []
-                        for j in range(len(pts_scatter)):
-                            sumDiff.append(abs(data1[j] - data2[j])/np.amax(data1))
-                    elif error_type == "mean":
-                        sumdata=0
-                        for j in range(len(pts_scatter)):
-                            if j==0:
-                                sumDiff += abs(data1[j] - data2[j])*.5*(pts_scatter[j+1]-pts_scatter[j])
-                                sumdata += abs(data1[j])*.5*(pts_scatter[j+1]-pts_scatter[j])
-                            elif j==(len(pts_scatter)-1):
-                                sumDiff += abs(data1[j] - data2[j])*.5*(pts_scatter[j]-pts_scatter[j-1])
-                                sumdata += abs(data1[j])*.5*(pts_scatter[j]-pts_scatter[j-1])
-                            else:
-                                sumDiff += abs(data1[j] - data2[j])*.5*(pts_scatter[j+1]-pts_scatter[j-1])
-                                sumdata += abs(data1[j])*.5*(pts_scatter[j+1]-pts_scatter[j-1])
-                                          #/np.amax(data1)
-                        #sumDiff = sumDiff/len(pts_scatter)
-                        #sumDiff = sumDiff/np.amax(data1)
-                        sumDiff/=sumdata
-                    elif error_type == "max":
-                        diff = abs(np.array([data1]) - np.array([data2]))
-                        sumDiff = np.amax(diff)/np.amax(data1)
-                    QoI.append(sumDiff)
-                else:
-                    QoI.append(False)
+        elif error_calculation == "QoI":
 
+            # (points x target species) data (last point excluded)
+            index = [gas_ref.species_index(tspc[k]) for k in range(len(tspc))]
+            data1_all = np.array(conc_ref[:n_points-1])[:,index]
+            data2_all = np.array(conc_red[:n_points-1])[:,index]
 
-        elif error_calculation == "QoI":
+            # Analysis of the curve shapes
+            ref_var_grad = np.diff(data1_all,axis=0)\
+                          /np.diff(np.array(pts_scatter[:n_points-1]))[:,None]
+            ref_var_grad[np.abs(ref_var_grad)<0.1] = 0
+            max_grad = np.max(ref_var_grad,axis=0)
+            min_grad = np.min(ref_var_grad,axis=0)
 
             for k in range(len(tspc)):
-                index = gas_ref.species_index(tspc[k])
-                data1 = []
-                data2 = []
-                for i in range(n_points-1):
-                    data1.append(conc_ref[i][index])
-                    data2.append(conc_red[i][index])
+                data1 = data1_all[:,k] ; data2 = data2_all[:,k]
 
                 if sum(data1)>0:     # absence of data if experimental optimization
 
-                    data1=np.array(data1) ; data2=np.array(data2)
-                    ref_var_grad = []
-
-                    # Analysis of the curve shape
-                    for i in range(len(data1)-1):
-                        grad = (data1[i+1]-data1[i])/(pts_scatter[i+1]-pts_scatter[i])
-                        if abs(grad) < 0.1:
-                            grad = 0
-                        ref_var_grad.append(grad)
-                    max_grad = max(ref_var_grad)
-                    min_grad  = min(ref_var_grad)
-
-                    if min_grad < 0 and max_grad > 0 : # bell curve
+                    if min_grad[k] < 0 and max_grad[k] > 0 : # bell curve
                         thd=1.2 #threshold
                         if data1[0]>data1[-1]:
                             if (np.max(data1)-data1[-1])/(data1[0]-data1[-1])>thd:
@@ -456,8 +451,8 @@ class Errors:
                         else :
                             if np.max(data1)>data1[0]: shape = 'bell'
                             else: shape = 'bell (inv)'
-                    elif max_grad <= 0: shape='downward'  # downward curve
-                    else: shape='upward'                  # upward curve
+                    elif max_grad[k] <= 0: shape='downward'  # downward curve
+                    else: shape='upward'                     # upward curve
 
                     if verbose>5:print_(tspc[k]+' curve shape: '+shape,mp)
                     QoI_S= self.qoi_computation(pts_scatter, data1, data2, shape)
@@ -501,33 +496,14 @@ class Errors:
         if error_calculation=="points" and np.mean(T_ref)<273:
 
             # ========   2 - Temperature error   ==========
-            sumDiff = 0
+            T_ref = np.array(T_ref[:n_points]) ; T_red = np.array(T_red[:n_points])
+            diff  = np.abs(T_ref-T_red)
             if error_type == "all" :
-                sumDiff = []
-                for j in range(len(pts_scatter)):
-                    sumDiff.append(abs(T_ref[j] - T_red[j])/np.amax(T_ref))
+                sumDiff = list(diff/np.amax(T_ref))
             elif error_type == "mean":
-                sumdata=0
-                for j in range(len(pts_scatter)):
-                    if j==0:
-                        sumDiff += abs(T_ref[j] - T_red[j])*.5*(pts_scatter[j+1]-pts_scatter[j])
-                        sumdata += abs(T_ref[j])*.5*(pts_scatter[j+1]-pts_scatter[j])
-                    elif j==(len(pts_scatter)-1):
-                        sumDiff += abs(T_ref[j] - T_red[j])*.5*(pts_scatter[j]-pts_scatter[j-1])
-                        sumdata += abs(T_ref[j])*.5*(pts_scatter[j]-pts_scatter[j-1])
-                    else:
-                        sumDiff += abs(data1[j] - T_red[j])*.5*(pts_scatter[j+1]-pts_scatter[j-1])
-                        sumdata += abs(T_ref[j])*.5*(pts_scatter[j+1]-pts_scatter[j-1])
-                                  #/np.amax(data1)
-                #sumDiff = sumDiff/len(pts_scatter)
-                #sumDiff = sumDiff/np.amax(data1)
-                sumDiff/=sumdata
-#                for i in range(n_points):
-#                    sumDiff += abs(T_ref[i] - T_red[i])
-#                sumDiff = sumDiff/n_points
-#                sumDiff = sumDiff/np.amax(T_ref)
+                w = self.trapz_weights(pts_scatter)
+                sumDiff = np.dot(w,diff)/np.dot(w,np.abs(T_ref))
             elif error_type == "max":
-                diff = abs(np.array([T_ref]) - np.array([T_red]))
                 sumDiff = np.amax(diff)/np.amax(T_ref)
             QoI = sumDiff
 
@@ -612,6 +588,16 @@ class Errors:
         return diff
 
 
+    def trapz_weights(self,pts_scatter):
+        """ trapezoidal integration weights of the points """
+        x = np.array(pts_scatter,dtype=float)
+        w = np.zeros(len(x))
+        w[0]    = .5*(x[1]-x[0])
+        w[-1]   = .5*(x[-1]-x[-2])
+        w[1:-1] = .5*(x[2:]-x[:-2])
+        return w
+
+
     def qoi_computation(self,pts_scatter, ref_var, red_var, curve_type='upward'):
         if curve_type == "upward":
 
@@ -896,13 +882,14 @@ class Errors:
 
 
     def qoi_test(self,qoi_s,qoi_T,qoi_Sl,qoi_ig,qoi_K,conditions,red_data_meth,\
-                 fileNameExt='temp.cti'):
+                 fileNameExt='temp.cti',margin=1.):
+        # margin: multiplication factor of the tolerances
 
         # Species
         max_error_sp = red_data_meth.max_error_sp
         under_tol_s = []
         for i in range(conditions.error_param.n_tspc):
-            tolerance = max_error_sp[i]
+            tolerance = margin*max_error_sp[i]
             if qoi_s:
                 if np.amax(qoi_s[i])*100>tolerance:
                     under_tol_s.append(False)
@@ -913,7 +900,7 @@ class Errors:
         under_tol_T = True
         if qoi_T:
             if conditions.error_param.T_check:
-                if qoi_T*100>red_data_meth.max_error_T:
+                if qoi_T*100>margin*red_data_meth.max_error_T:
                     under_tol_T = False
 
 
@@ -921,7 +908,7 @@ class Errors:
         under_tol_Sl = True
         if qoi_Sl:
             if 'flame' in conditions.config and conditions.error_param.Sl_check:
-                if qoi_Sl*100>red_data_meth.max_error_Sl:
+                if qoi_Sl*100>margin*red_data_meth.max_error_Sl:
                     under_tol_Sl = False
 
 
@@ -929,14 +916,14 @@ class Errors:
         under_tol_ig = True
         if qoi_ig:
             if 'reactor' in conditions.config and conditions.error_param.ig_check:
-                if qoi_ig*100>red_data_meth.max_error_ig:
+                if qoi_ig*100>margin*red_data_meth.max_error_ig:
                     under_tol_ig = False
 
         # Extinction strain rate
         under_tol_K = True
         if qoi_K:
             if 'diff_flame' in conditions.config and conditions.error_param.K_check:
-                if qoi_K*100>red_data_meth.max_error_K:
+                if qoi_K*100>margin*red_data_meth.max_error_K:
                     under_tol_K = False
 
         # all tol under_tol
@@ -979,6 +966,11 @@ class Error_param :
         self.Sl_check          = Sl_check
         self.K_check           = K_check
         self.strain_accuracy   = 0.05
+        # two-stage (multi-fidelity) evaluation of the candidate mechanisms
+        self.screening         = False   # screening of the candidates with coarse simulations
+        self.screening_tol     = 10.     # tolerances (tol_ss, tol_ts) multiplication factor
+        self.screening_step    = 2       # decimation of the time vectors / grids (1 point out of n)
+        self.screening_margin  = 2.      # full fidelity if screened errors < margin x tolerances
         self.sp_T              = sp_T
         self.sp_ig             = sp_ig
         self.sp_Sl             = sp_Sl
@@ -1214,38 +1206,36 @@ class Mech_data:
 
         # check submechanism family:
         gas = ct.Solution(mech)
-        nu_f = gas.reactant_stoich_coeffs()
-        nu_r = gas.product_stoich_coeffs()
+        self.path = os.path.abspath(mech)
+        self.topo = Mech_topology(gas)
         self.react.subm_C  = [0]*len(self.react.formula)
         self.react.subm_N  = [0]*len(self.react.formula)
         self.react.subm_S  = [0]*len(self.react.formula)
         self.react.subm_Si = [0]*len(self.react.formula)
         self.react.subm_CO = [False]*len(self.react.formula)
         for r in range(len(self.react.formula)):
-            for sp in range(len(self.spec.name)):
-                if (nu_f[sp][r]!=0 or nu_r[sp][r]!=0) and nu_f[sp][r]!=nu_r[sp][r]:
-                    n_at = self.spec.atoms[sp].split(' ')
-                    for at in n_at:
-                        if 'C' in at or 'c' in at:
-                            n_C = int(at.split(':')[-1])
-                            self.react.subm_C[r] = max(self.react.subm_C[r],n_C)
-                        if 'N' in at or 'n' in at:
-                            n_N = int(at.split(':')[-1])
-                            self.react.subm_N[r] = max(self.react.subm_N[r],n_N)
-                        if 'S' in at or 's' in at:
-                            n_S = int(at.split(':')[-1])
-                            self.react.subm_S[r] = max(self.react.subm_S[r],n_S)
-                        if 'Si' in at or 'si' in at:
-                            n_Si = int(at.split(':')[-1])
-                            self.react.subm_Si[r] = max(self.react.subm_Si[r],n_Si)
+            for sp in self.topo.r_species_net(r):
+                n_at = self.spec.atoms[sp].split(' ')
+                for at in n_at:
+                    if 'C' in at or 'c' in at:
+                        n_C = int(at.split(':')[-1])
+                        self.react.subm_C[r] = max(self.react.subm_C[r],n_C)
+                    if 'N' in at or 'n' in at:
+                        n_N = int(at.split(':')[-1])
+                        self.react.subm_N[r] = max(self.react.subm_N[r],n_N)
+                    if 'S' in at or 's' in at:
+                        n_S = int(at.split(':')[-1])
+                        self.react.subm_S[r] = max(self.react.subm_S[r],n_S)
+                    if 'Si' in at or 'si' in at:
+                        n_Si = int(at.split(':')[-1])
+                        self.react.subm_Si[r] = max(self.react.subm_Si[r],n_Si)
             if self.react.subm_C[r]==1:
                 self.react.subm_CO[r] = True
-                for sp in range(len(self.spec.name)):
-                    if (nu_f[sp][r]!=0 or nu_r[sp][r]!=0) and nu_f[sp][r]!=nu_r[sp][r]:
-                        n_at = self.spec.atoms[sp].split(' ')
-                        at = str(n_at)
-                        if ('C' in at or 'c' in at) and ('H' in at or 'h' in at):
-                            self.react.subm_CO[r] = False
+                for sp in self.topo.r_species_net(r):
+                    n_at = self.spec.atoms[sp].split(' ')
+                    at = str(n_at)
+                    if ('C' in at or 'c' in at) and ('H' in at or 'h' in at):
+                        self.react.subm_CO[r] = False
 
         self.spec.activ_p  = [False]*len(self.spec.name)       # act spec for cases loop
         self.spec.activ_m  = [True]*len(self.spec.name)       # act spec for methods loop
@@ -1260,21 +1250,7 @@ class Mech_data:
         fd = open(filename, 'w')
 
         # active species and reactions lists
-        if act_sp=="no_arg": act_sp = self.spec.activ_p
-        if act_r=="no_arg" : act_r  = self.react.activ_p
-        if True not in act_sp:
-            act_sp=self.spec.activ_m ; act_r =self.react.activ_m
-
-        sp_list=[];remove_sp_list=[]
-        for sp in range(len(act_sp)):
-            if act_sp[sp]:
-                sp_list.append(sp)
-            else:
-                remove_sp_list.append(sp)
-        r_list=[]
-        for r in range(len(act_r)):
-            if act_r[r]:
-                r_list.append(r)
+        act_sp, sp_list, r_list = self.active_lists(act_sp,act_r)
 
 
 # =============================================================================
@@ -1399,15 +1375,6 @@ class Mech_data:
         fd.write("#-------------------------------------------------------------------------------\n")
         fd.write("\n")
 
-        r_list_ = copy.deepcopy(r_list)
-        for r in r_list_:
-            if r in self.duplicate_list:
-                for d in self.duplicate_list:
-                        if self.react.formula[d]==self.react.formula[r]:
-                            if d not in r_list:
-                                r_list.append(d)
-        r_list.sort()
-
         for r in r_list: # in activated reactions list
 
             fd.write("\n# Reaction "+str(self.react.number[r])+"\n")
@@ -1519,6 +1486,196 @@ class Mech_data:
         fd.close()
 
 
+    def active_lists(self,act_sp="no_arg",act_r="no_arg"):
+        """ indices of the kept species and reactions (+ duplicate reactions
+            of the kept ones)                                             """
+
+        if act_sp=="no_arg": act_sp = self.spec.activ_p
+        if act_r=="no_arg" : act_r  = self.react.activ_p
+        if True not in act_sp:
+            act_sp=self.spec.activ_m ; act_r =self.react.activ_m
+
+        sp_list = [sp for sp in range(len(act_sp)) if act_sp[sp]]
+        r_list  = [r for r in range(len(act_r)) if act_r[r]]
+
+        r_list_ = copy.deepcopy(r_list)
+        for r in r_list_:
+            if r in self.duplicate_list:
+                for d in self.duplicate_list:
+                        if self.react.formula[d]==self.react.formula[r]:
+                            if d not in r_list:
+                                r_list.append(d)
+        r_list.sort()
+
+        return act_sp, sp_list, r_list
+
+
+    def get_ct_objects(self):
+        """ ct.Species / ct.Reaction objects of the reference mechanism and
+            their reference rates (SI units), interpreted once per process """
+
+        if self.path not in _ct_mech_objects:
+            gas = ct.Solution(self.path)
+            reactions = gas.reactions()
+            ref_rates = []
+            for reac in reactions:
+                if   hasattr(reac,'high_rate'): ref_rates.append([reac.high_rate,reac.low_rate])
+                elif hasattr(reac,'rates'):     ref_rates.append(list(reac.rates))
+                else:                           ref_rates.append(reac.rate)
+            # reaction input data: new ct.Reaction objects for each Solution
+            # (the objects passed to a Solution are kept by it, never shared)
+            _ct_mech_objects[self.path] = {'gas':        gas,
+                                           'species':    gas.species(),
+                                           'input_data': [reac.input_data for reac in reactions],
+                                           'ref_rates':  ref_rates,
+                                           'transport':  gas.transport_model}
+
+        return _ct_mech_objects[self.path]
+
+
+    def act_energy_factor(self):
+        """ conversion factor of the activation energies to J/kmol """
+
+        E_units = {'cal/mol':4184., 'kcal/mol':4.184e6, 'J/mol':1e3,
+                   'kJ/mol':1e6, 'J/kmol':1., 'K':ct.gas_constant,
+                   'eV':ct.faraday}
+        for txt in self.gas_prop:
+            if 'units(' in txt and 'act_energy' in txt:
+                txt = txt.replace('"',"'")
+                return E_units[txt.split('act_energy')[1].split("'")[1]]
+        return E_units['cal/mol']
+
+
+    def arrhenius(self,kin,kin_ref,rate_ref,f_E):
+        """ SI Arrhenius rate from the mechanism units coefficients """
+
+        if kin_ref[0]!=0: A = kin[0]*rate_ref.pre_exponential_factor/kin_ref[0]
+        else:             A = rate_ref.pre_exponential_factor
+        return ct.Arrhenius(A,kin[1],kin[2]*f_E)
+
+
+    def new_solution(self,act_sp="no_arg",act_r="no_arg"):
+        """ ct.Solution of the mechanism built in memory from the reference
+            ct.Species / ct.Reaction objects (no mechanism file writing),
+            with the kinetic coefficients of self.react.kin              """
+
+        ct_obj = self.get_ct_objects()
+        act_sp, sp_list, r_list = self.active_lists(act_sp,act_r)
+        sp_names = [self.spec.name[sp] for sp in sp_list]
+        f_E      = self.act_energy_factor()
+
+        reactions = [self.ct_reaction(r,ct_obj,sp_names,f_E) for r in r_list]
+
+        gas = ct.Solution(thermo='IdealGas', kinetics='GasKinetics',\
+                          species=[ct_obj['species'][sp] for sp in sp_list],\
+                          reactions=reactions)
+        if ct_obj['transport'] not in ['None','',None]:
+            try:
+                gas.transport_model = ct_obj['transport']
+            except ct.CanteraError as err:
+                print_("Warning, transport model "+str(ct_obj['transport'])+\
+                       " not set on the reduced mechanism: "+str(err),'')
+
+        return gas
+
+
+    def ct_reaction(self,r,ct_obj,sp_names,f_E,ref=False):
+        """ new ct.Reaction of reaction r: reference input data with the
+            collision efficiencies of the kept species only, and rates of
+            self.react.kin (reference rates if ref)                        """
+
+        data = dict(ct_obj['input_data'][r])
+        if 'efficiencies' in data:
+            data['efficiencies'] = {sp:eff for sp,eff in \
+                    data['efficiencies'].items() if sp in sp_names}
+        reac = ct.Reaction.from_dict(data,ct_obj['gas'])
+        self.set_rates(reac,r,ct_obj['ref_rates'][r],f_E,ref)
+
+        return reac
+
+
+    def set_rates(self,reac,r,rate_ref,f_E,ref=False):
+        """ rates of the ct.Reaction object reac from self.react.kin[r]
+            (reference rate objects if ref or if the coefficients are
+            unchanged)                                                     """
+
+        modified = not ref and self.react.kin[r]!=self.react.ref_kin[r]
+        if self.react.type[r]=="falloff_reaction":
+            if modified:
+                reac.high_rate = self.arrhenius(self.react.kin[r][0],\
+                                 self.react.ref_kin[r][0],rate_ref[0],f_E)
+                reac.low_rate  = self.arrhenius(self.react.kin[r][1],\
+                                 self.react.ref_kin[r][1],rate_ref[1],f_E)
+            else:
+                reac.high_rate = rate_ref[0] ; reac.low_rate = rate_ref[1]
+        elif self.react.type[r]=="pdep_arrhenius":
+            if modified:
+                reac.rates = [(rate_ref[l][0],self.arrhenius(\
+                               self.react.kin[r][l],self.react.ref_kin[r][l],\
+                               rate_ref[l][1],f_E)) for l in range(len(rate_ref))]
+            else:
+                reac.rates = rate_ref
+        else:
+            if modified:
+                reac.rate = self.arrhenius(self.react.kin[r],\
+                            self.react.ref_kin[r],rate_ref,f_E)
+            else:
+                reac.rate = rate_ref
+
+
+    def A_factor(self,r):
+        """ common factor of the pre-exponential factors of reaction r if
+            n and Ea are unchanged (rate constant k scaled by this factor,
+            also for falloff and plog rates), False otherwise              """
+
+        kin = self.react.kin[r] ; kin_ref = self.react.ref_kin[r]
+        if self.react.type[r] in ["reaction","three_body_reaction"]:
+            kin = [kin] ; kin_ref = [kin_ref]
+        f_A = False
+        for k in range(len(kin)):
+            if kin[k][1]!=kin_ref[k][1] or kin[k][2]!=kin_ref[k][2] \
+            or kin_ref[k][0]==0:
+                return False
+            f_k = kin[k][0]/kin_ref[k][0]
+            if f_A is False:                         f_A = f_k
+            elif abs(f_k-f_A) > 1e-12*abs(f_A):     return False
+        return f_A
+
+
+    def get_solution(self,act_sp="no_arg",act_r="no_arg"):
+        """ ct.Solution of the mechanism kept in memory (one per process
+            and per set of active species / reactions) and updated in place
+            with the kinetic coefficients of self.react.kin :
+              - A only changes    : gas.set_multiplier
+              - n / Ea changes    : gas.modify_reaction (new rate objects)
+            (fast path of new_solution for the GA individuals)            """
+
+        act_sp, sp_list, r_list = self.active_lists(act_sp,act_r)
+        key = (self.path,tuple(sp_list),tuple(r_list))
+        if key not in _ct_solutions:
+            # reference kinetics, then updated as the other individuals
+            kin = self.react.kin ; self.react.kin = self.react.ref_kin
+            _ct_solutions[key] = [self.new_solution(act_sp,act_r),set()]
+            self.react.kin = kin
+        gas, modified_r = _ct_solutions[key]
+
+        ct_obj   = self.get_ct_objects()
+        f_E      = self.act_energy_factor()
+        sp_names = [self.spec.name[sp] for sp in sp_list]
+        for i_r in range(len(r_list)):
+            r   = r_list[i_r]
+            f_A = self.A_factor(r)
+            if f_A is False or r in modified_r:
+                # modify / restore the rates (new reaction object)
+                reac = self.ct_reaction(r,ct_obj,sp_names,f_E,ref=f_A is not False)
+                gas.modify_reaction(i_r,reac)
+                if f_A is False: modified_r.add(r) ; f_A = 1
+                else:            modified_r.discard(r)
+            gas.set_multiplier(f_A,i_r)
+
+        return gas
+
+
     def find_element(self,element,act_sp):
         for sp in range(len(self.spec.name)):
             if act_sp[sp]:
@@ -1594,6 +1751,16 @@ class Optim_param :
         self.best_fitness         = []
         self.mean_fitness         = []
         self.worst_fitness         = []
+        self.steady_state         = False   # asynchronous steady-state GA
+        self.n_islands            = 1       # island model: number of populations
+        self.migration_gen        = 5       # generations between migrations
+        self.n_migrants           = 2       # best individuals sent by an island
+        self.migration_topology   = 'ring'  # ring, all, random
+        self.surrogate            = False   # surrogate pre-screening of the childs
+        self.surrogate_pct        = 50      # percentage of the childs simulated
+        self.n_simul              = []      # simulated individuals per generation
+        self.surrogate_error      = []      # surrogate prediction error per generation
+        self.cache_hit_rate       = []      # fitness cache hit rate per generation
         self.main_path            = ''
         self.exp_data             = False
         self.nb_r2opt             = nb_r2opt
@@ -1644,6 +1811,62 @@ class Reactions:
 
 
 
+class Mech_topology:
+    """ Sparse stoichiometry of the mechanism (ns x nr), built once from the
+        reaction objects (no dense reactant/product_stoich_coeffs arrays).
+        nu_f / nu_r / nu : stoichiometric coefficients (CSR)
+        incid            : species involved in the reaction (nu_f!=0 or nu_r!=0)
+        incid_net        : species with a net stoichiometric coeff (nu!=0)   """
+
+    def __init__(self,gas):
+
+        ns = gas.n_species ; nr = gas.n_reactions
+        row_f=[] ; col_f=[] ; val_f=[]
+        row_r=[] ; col_r=[] ; val_r=[]
+        for r,reac in enumerate(gas.reactions()):
+            for sp in reac.reactants:
+                row_f.append(gas.species_index(sp)) ; col_f.append(r)
+                val_f.append(reac.reactants[sp])
+            for sp in reac.products:
+                row_r.append(gas.species_index(sp)) ; col_r.append(r)
+                val_r.append(reac.products[sp])
+
+        self.ns   = ns
+        self.nr   = nr
+        self.nu_f = sparse.csr_matrix((val_f,(row_f,col_f)),shape=(ns,nr))
+        self.nu_r = sparse.csr_matrix((val_r,(row_r,col_r)),shape=(ns,nr))
+        self.nu   = self.nu_f - self.nu_r
+        self.nu.eliminate_zeros()
+
+        self.incid     = (abs(self.nu_f)+abs(self.nu_r)).astype(bool).tocsr()
+        self.incid_net = self.nu.astype(bool).tocsr()
+        # reaction -> species lookups
+        self.incid_T     = self.incid.T.tocsr()
+        self.incid_net_T = self.incid_net.T.tocsr()
+
+    def sp_reactions(self,sp):
+        """ reactions involving species sp """
+        return self.incid.indices[self.incid.indptr[sp]:self.incid.indptr[sp+1]]
+
+    def r_species(self,r):
+        """ species involved in reaction r """
+        return self.incid_T.indices[self.incid_T.indptr[r]:self.incid_T.indptr[r+1]]
+
+    def r_species_net(self,r):
+        """ species with a non-zero net stoichiometric coeff in reaction r """
+        return self.incid_net_T.indices[self.incid_net_T.indptr[r]:\
+                                        self.incid_net_T.indptr[r+1]]
+
+    def reactions_involving(self,sp_mask):
+        """ boolean vector of the reactions involving one of the species of sp_mask """
+        return self.incid_T.dot(np.asarray(sp_mask,dtype=float))>0
+
+    def species_involved(self,r_mask):
+        """ boolean vector of the species involved in one of the reactions of r_mask """
+        return self.incid.dot(np.asarray(r_mask,dtype=float))>0
+
+
+
 class Red_data :
     def __init__(self,gas_ref,mech_name,tspc,n_tspc,reduction_operator='DRG_sp',   \
                  optim = False,verbose=6,targetSpeciesIdx=[],gas_loop='gas_ref',gas_act='gas_ref'):
@@ -1692,18 +1915,14 @@ class Simul_param :
                  tol_ss = [1.0e-5, 1.0e-8],                                  \
                  tol_ts = [1.0e-4, 1.0e-8],                                  \
                  verbose = 0,                                                \
-                 tign_nPoints = 130, tign_dt = 1e-09,                    \
-                 n_pts = 250, delta_npts = 10, t_max_coeff = 5,              \
+                 n_pts = 250, t_max_coeff = 5,                               \
                  Scal_ref = 'H2O', grad_curv_ratio = 0.5):
 
         self.pts_scatter      = pts_scatter      # time stepping  or  grid
         self.end_sim          = end_sim          # tmax           or  xmax
         self.tol_ss           = tol_ss
         self.tol_ts           = tol_ts
-        self.tign_nPoints     = tign_nPoints
-        self.tign_dt          = tign_dt
         self.n_pts            = n_pts
-        self.delta_npts       = delta_npts
         self.t_max_coeff      = t_max_coeff
         self.t_max_react      = 10
         self.Scal_ref         = Scal_ref
@@ -1721,6 +1940,12 @@ class Simul_param :
         self.u_0              = .006   # PFR opt - inflow velocity [m/s]
         self.area             = 1.e-4  # PFR opt - cross-sectional area [m**2]
         self.par_ind          = False
+        self.flame_spill      = True   # binary copy of the flame snapshots on disk
+        self.ref_cache        = False  # folder of the reference results cache
+        self.checkpoint       = True   # progress of the reduction / GA saved on disk
+        self.resume           = False  # restart from the checkpoints of main_path
+        self.jsr_workers      = 1      # processes sharing the JSR temperatures (reference,
+                                       # no continuation between the temperature blocks)
 
 class Sim_Results :
     def __init__(self,conditions,gas=[], pts_scatter=[],         \
@@ -1742,32 +1967,58 @@ class Sim_Results :
         self.K_ext       = 0
         self.f           = False
 #        self.error_param = Error_param(error_param)
-        self.X           = 0
-        self.conc2X()
         self.res_fname   = 'reduction_results.csv'
 
 
+    # columnar storage: (points x species) and (points x reactions) arrays,
+    # X is computed from conc when first needed
+    @property
+    def conc(self):
+        return self._conc
+
+    @conc.setter
+    def conc(self,conc):
+        self._conc = float_array(conc)
+        self._X    = None
+
+    @property
+    def X(self):
+        if self._X is None: self.conc2X()
+        return self._X
+
+    @X.setter
+    def X(self,X):
+        self._X = float_array(X)
+
+    @property
+    def kf(self):
+        return self._kf
+
+    @kf.setter
+    def kf(self,kf):
+        self._kf = float_array(kf)
+
+    @property
+    def kr(self):
+        return self._kr
+
+    @kr.setter
+    def kr(self,kr):
+        self._kr = float_array(kr)
+
+
     def conc2X(self):
-        self.X=[]
-        for step in range(len(self.conc)):
-            self.X.append([])
-            n_tot = sum(self.conc[step])
-            for sp in range(len(self.conc[step])):
-                if n_tot!=0:
-                    self.X[step].append(self.conc[step][sp]/n_tot)
-                else:
-                    self.X[step].append(0)
+        conc  = self._conc
+        if len(conc)==0: self._X = conc ; return
+        n_tot = np.sum(conc,axis=1)
+        X     = np.zeros(np.shape(conc))
+        nz    = n_tot!=0
+        X[nz] = conc[nz]/n_tot[nz][:,None]
+        self._X = X
 
     def X2conc(self):
-        conc=[]
-#        if sum(self.X[0])>0.001:
-        for step in range(len(self.X)):
-#            if self.T[step]==0: print('toto')
-            ntot_V = self.P/(8.314*self.T[step])/1000  # kmol/m3
-            conc.append([])
-            for idx in range(len(self.X[step])):
-                conc[step].append(self.X[step][idx]*ntot_V)
-        self.conc=conc
+        ntot_V = np.array(self.P)/(8.314*np.array(self.T,dtype=float))/1000  # kmol/m3
+        self._conc = np.array(self.X)*ntot_V[:,None]
 
 
     def plotData_opt(self,spec2plot):
@@ -1991,9 +2242,17 @@ class Sim_Results :
 
 
 
+def float_array(data):
+    """ per-point data as a contiguous float64 array (kept as is if not possible) """
+    if data is False: return data
+    try:    return np.ascontiguousarray(data,dtype=np.float64)
+    except: return data
+
+
 def searchNearest(data, search_value, start =0, end_ind=-1) :
-    vect = list(abs(np.array(data) - search_value))
-    index = vect.index(np.amin(vect[start:end_ind]))
+    # first index of the nearest value found in data[start:end_ind]
+    vect  = np.abs(np.asarray(data) - search_value)
+    index = int(np.argmax(vect == np.amin(vect[start:end_ind])))
     value = data[index]
 
     return value, index
@@ -2021,6 +2280,22 @@ def print_(text,main_path,file_n='red_info.txt'):
     os.chdir(cur_path)
 
 
+def write_checkpoint(data,filename):
+    """ checkpoint written atomically: binary pickle in a temporary file
+        renamed once complete (no partial checkpoint if the run is killed) """
+    tmp = filename+'.tmp'
+    with open(tmp,'wb') as ckpt_f:
+        pickle.dump(data,ckpt_f,pickle.HIGHEST_PROTOCOL)
+        ckpt_f.flush() ; os.fsync(ckpt_f.fileno())
+    os.replace(tmp,filename)
+
+def read_checkpoint(filename):
+    """ checkpoint data, False if not available """
+    if not os.path.isfile(filename): return False
+    with open(filename,'rb') as ckpt_f:
+        return pickle.load(ckpt_f)
+
+
 class ProgressBar:
     """
     This class allows you to make easily a progress bar.
@@ -27,7 +27,561 @@ from  __packages.Class_def import print_
 import time as timer
 import os
 import sys
-import pandas as pd
+import pickle
+import copy
+import multiprocessing
+
+
+#==============================================================================
+#   Flame solution snapshots
+#==============================================================================
+
+_flame_snapshots = {}   # in-memory store of the flame solutions (per process)
+_jsr_gas         = {}   # mechanisms of the JSR workers
+
+class Flame_snapshot :
+    """ grid, profiles and inlet states of a flame solution, used to
+        warm-start flames (possibly with a reduced mechanism)           """
+
+    def __init__(self, f):
+        self.P        = f.P
+        self.grid     = np.array(f.flame.grid)
+        self.profiles = {}
+        for comp in f.flame.component_names:
+            self.profiles[comp] = np.array(f.profile(f.flame,comp))
+        self.inlets   = {}
+        species       = f.gas.species_names
+        for dom in f.domains:
+            if isinstance(dom, ct.Inlet1D):
+                Y = {}
+                for k,y in enumerate(dom.Y):
+                    if y!=0: Y[species[k]] = y
+                self.inlets[dom.name] = [dom.mdot, dom.T, Y]
+
+    def restore(self, f):
+        f.P       = self.P
+        n_points  = f.flame.n_points
+        if n_points == len(self.grid):
+            f.flame.grid = self.grid
+        else:   # the number of points of the flame is kept: grid resampling
+            f.flame.grid = np.interp(np.linspace(0,1,n_points),\
+                                     np.linspace(0,1,len(self.grid)),self.grid)
+        positions = (self.grid-self.grid[0])/(self.grid[-1]-self.grid[0])
+        for comp in f.flame.component_names:
+            if comp in self.profiles:
+                f.set_profile(comp, positions, self.profiles[comp])
+            else:   # species removed from the snapshot mechanism
+                f.set_profile(comp, [0,1], [0,0])
+        species = f.gas.species_names
+        for dom in f.domains:
+            if dom.name in self.inlets:
+                mdot, T, Y = self.inlets[dom.name]
+                dom.mdot = mdot ; dom.T = T
+                dom.Y    = {sp:Y[sp] for sp in Y if sp in species}
+
+
+def flame_key(conditions):
+    """ name of the reference flame solution of the condition """
+
+    if 'free' in conditions.config or 'burner' in conditions.config:
+        key = str(conditions.num)+'ff_'
+    elif 'tp_' in conditions.config:
+        key = str(conditions.num)+'tp_'
+    else:
+        key = str(conditions.num)+'cf_'
+    if 'diff' in conditions.config: phi = 'diff'
+    else: phi = '%.2f' %conditions.composition.phi
+    key += conditions.composition.fuel.replace('/','').split('(')[0]+'_'+phi\
+          +'_'+'%.0f'%conditions.state_var.T
+    if conditions.state_var.P>10000:
+        key += '_'+'%.2f'%(conditions.state_var.P/1e5)
+    else:
+        key += '_'+'%.0f'%(conditions.state_var.P)
+
+    return key
+
+
+def save_flame(f, key, conditions, spill=False):
+    """ store the flame solution in memory (and in Flame_ref_results if spill) """
+
+    _flame_snapshots[key] = Flame_snapshot(f)
+    if spill: spill_flame(key, conditions)
+
+
+def spill_flame(key, conditions):
+    """ binary copy of a stored flame solution in Flame_ref_results """
+
+    folder = os.path.join(conditions.main_path,'Flame_ref_results')
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder,key+'.snp'),'wb') as snp_file:
+        pickle.dump(_flame_snapshots[key], snp_file, pickle.HIGHEST_PROTOCOL)
+
+
+def load_flame(key, conditions):
+    """ stored flame solution (memory, then disk) """
+
+    if key not in _flame_snapshots:
+        fn = os.path.join(conditions.main_path,'Flame_ref_results',key+'.snp')
+        with open(fn,'rb') as snp_file:
+            _flame_snapshots[key] = pickle.load(snp_file)
+
+    return _flame_snapshots[key]
+
+
+def restore_flame(f, key, conditions):
+    """ initialize the flame with a stored solution """
+
+    load_flame(key, conditions).restore(f)
+
+
+def ref_flame(conditions, gas=False, fn=False):
+    """ flame rebuilt from its stored solution (cached references, parallel
+        validation); default: reference mechanism and reference solution   """
+
+    mp      = conditions.main_path
+    verbose = conditions.simul_param.verbose
+    if not gas: gas = conditions.composition.gas
+    if not fn:  fn  = flame_key(conditions)
+    grid    = load_flame(fn, conditions).grid
+
+    if 'free' in conditions.config:
+        f = ct.FreeFlame(gas, grid)
+    elif 'burner' in conditions.config:
+        grid_i           = list(conditions.simul_param.pts_scatter_i)
+        f                = ct.BurnerFlame(gas, grid)
+        f.energy_enabled = False
+        f.flame.set_fixed_temp_profile(np.array(grid_i)/max(grid_i),conditions.simul_param.T_profile)
+    elif 'tp_' in conditions.config:
+        f = ct.CounterflowTwinPremixedFlame(gas, grid=grid)
+    else:
+        f = ct.CounterflowDiffusionFlame(gas, grid=grid)
+    try:
+        f.transport_model = conditions.simul_param.transport_model
+    except:
+        f.transport_model = "Mix"
+    f.flame.set_steady_tolerances(default=conditions.simul_param.tol_ss)
+    f.flame.set_transient_tolerances(default=conditions.simul_param.tol_ts)
+    restore_flame(f, fn, conditions)
+
+    # converged solution: no refinement, a few newton iterations
+    if verbose<9:
+        old_stdout = sys.stdout ; old_stderr = sys.stderr
+        with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
+    try:
+        f.solve(auto = False, loglevel = 0, refine_grid = False)
+        simul_success = True
+    except:
+        simul_success = False
+    if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr
+    if not simul_success:
+        print_("     WARNING: stored flame solution not solved",mp)
+
+    return f
+
+
+#==============================================================================
+#   State capture
+#==============================================================================
+
+def index_maps(gas_ref, gas_red, act_sp, act_r):
+    """ reference mech indices of the active species and reactions, and
+        reduced mech indices of the active species                      """
+
+    sp_ref = np.flatnonzero(np.array(act_sp, dtype=bool))
+    sp_red = np.array([gas_red.species_index(gas_ref.species_name(sp)) \
+                       for sp in sp_ref], dtype=int)
+    r_ref  = np.flatnonzero(np.array(act_r, dtype=bool))
+
+    return sp_ref, sp_red, r_ref
+
+
+def ref_indexing(maps, n_sp, n_r, conc_red, kf_red, kr_red, success=True):
+    """ reduced mech profiles (points x species / reactions) on the
+        reference mech indexing (0 for the removed species / reactions,
+        and for the concentrations of the failed points).
+        kf and kr stay False if they were not captured (lean evaluation) """
+
+    sp_ref, sp_red, r_ref = maps
+    n_points = len(conc_red)
+    success  = np.broadcast_to(np.asarray(success, dtype=bool), (n_points,))
+    conc = np.zeros((n_points, n_sp))
+    conc[np.ix_(success, sp_ref)] = np.asarray(conc_red)[success][:,sp_red]
+    if kf_red is False:
+        return conc, False, False
+    kf   = np.zeros((n_points, n_r))
+    kr   = np.zeros((n_points, n_r))
+    kf[:,r_ref] = kf_red
+    kr[:,r_ref] = kr_red
+
+    return conc, kf, kr
+
+
+def flame_states(f, gas, kinetics=True):
+    """ concentrations, kf and kr at all the flame grid points (bulk
+        evaluation with a SolutionArray). kf and kr are False if
+        kinetics is False                                              """
+
+    states     = ct.SolutionArray(gas, f.flame.n_points)
+    states.TPY = f.T, f.P, f.Y.T
+
+    if not kinetics:
+        return states.concentrations, False, False
+    return states.concentrations, states.forward_rate_constants, \
+           states.reverse_rate_constants
+
+
+def screening_conditions(conditions):
+    """ copy of the conditions for the screening of the candidates: coarse
+        tolerances, mixture-averaged transport, decimated time vectors /
+        grids (reactors, JSR and free flames) and extinction strain rate
+        accuracy                                                        """
+
+    error_param = conditions.error_param
+    factor      = error_param.screening_tol
+    step        = int(error_param.screening_step)
+
+    coarse             = copy.copy(conditions)
+    coarse.simul_param = copy.copy(conditions.simul_param)
+    coarse.error_param = copy.copy(error_param)
+    simul_param        = coarse.simul_param
+    simul_param.tol_ss = [tol*factor for tol in simul_param.tol_ss]
+    simul_param.tol_ts = [tol*factor for tol in simul_param.tol_ts]
+    simul_param.transport_model     = 'Mix'
+    coarse.error_param.strain_accuracy = error_param.strain_accuracy*max(step,1)
+
+    pts = np.array(conditions.simul_param.pts_scatter)
+    if step>1 and len(pts)>=10*step and ('reactor' in conditions.config \
+       or 'JSR' in conditions.config or 'free_flame' in conditions.config):
+        simul_param.pts_scatter = np.append(pts[:-1:step], pts[-1])
+
+    return coarse
+
+
+def points_interp(x_new, x, data):
+    """ (points x variables) data interpolated on the points x_new """
+
+    x     = np.asarray(x, dtype=float)
+    order = np.argsort(x)
+    data  = np.asarray(data, dtype=float)[order]
+    if data.ndim == 1:
+        return np.interp(x_new, x[order], data)
+
+    return np.array([np.interp(x_new, x[order], var) for var in data.T]).T
+
+
+def strained_flame(f, snapshot, factor, T_ext, verbose=0):
+    """ counterflow diffusion flame solved at factor x the strain rate of the
+        stored solution snapshot. Returns True if the flame is burning
+        (maximum temperature above T_ext)                                 """
+
+    # Exponents for the initial solution variation with changes in strain rate
+    # Taken from Fiala and Sattelmayer (2014) (doi:10.1155/2014/484372)
+    exp_d_a    = - 1. / 2.
+    exp_u_a    = 1. / 2.
+    exp_V_a    = 1.
+    exp_lam_a  = 2.
+    exp_mdot_a = 1. / 2.
+
+    snapshot.restore(f)
+    # Create an initial guess based on the stored solution
+    # Update grid
+    f.flame.grid    *= factor ** exp_d_a
+    normalized_grid  = f.grid / (f.grid[-1] - f.grid[0])
+    # Update mass fluxes
+    f.fuel_inlet.mdot     *= factor ** exp_mdot_a
+    f.oxidizer_inlet.mdot *= factor ** exp_mdot_a
+    # Update velocities
+    f.set_profile('u', normalized_grid, f.u * factor ** exp_u_a)
+    f.set_profile('V', normalized_grid, f.V * factor ** exp_V_a)
+    # Update pressure curvature
+    f.set_profile('lambda', normalized_grid, f.L * factor ** exp_lam_a)
+
+    # supress console output during the simulation
+    if verbose<9:
+        old_stdout = sys.stdout ; old_stderr = sys.stderr
+        with open(os.devnull, "w") as devnull:
+            sys.stdout = devnull ; sys.stderr = devnull
+    try:
+        f.solve(loglevel=0)
+        error = False
+    except Exception as e:
+        error = e
+    # restore console output
+    if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr
+
+    if error:
+        if verbose>3 and (not error.args or error.args[0] != 'Flame extinguished'):
+            print('Error occurred while solving:', error)
+        return False
+
+    return np.max(f.T) > T_ext
+
+
+def extinction_strain_rate(f, conditions, snapshot, step=1., verbose=0):
+    """ extinction strain rate of the counterflow diffusion flame f, by
+        continuation from the stored burning solution snapshot (in memory):
+        the strain factor is increased (step, then doubled) until extinction
+        and the turning point is bracketed by bisection on the strain factor
+        down to error_param.strain_accuracy. If snapshot does not burn with
+        f's mechanism (reduced mechanism warm-started from the reference
+        extinction), the strain factor is first decreased.
+        Returns K_ext (0 if no burning solution), the last burning solution
+        and the relative width of the final bracket                        """
+
+    mp       = conditions.main_path
+    accuracy = conditions.error_param.strain_accuracy
+    T_ext    = max(conditions.state_var.T,conditions.state_var.T2)+500  # K
+    max_it   = 30 ; it_n = 0
+
+    burning = False ; K_ext = 0 ; factor_hi = False
+    if strained_flame(f, snapshot, 1, T_ext, verbose):
+        burning = Flame_snapshot(f) ; K_ext = f.strain_rate('max')
+    else:   # strain rate decreased until a burning solution is found
+        factor = 1 ; step_down = min(step,.5)/2
+        while it_n < max_it and factor > 1e-3:
+            it_n += 1
+            factor_prev = factor ; factor *= 1-step_down
+            if strained_flame(f, snapshot, factor, T_ext, verbose):
+                burning   = Flame_snapshot(f) ; K_ext = f.strain_rate('max')
+                factor_hi = factor_prev/factor
+                break
+            step_down = min(2*step_down,.5)
+
+    # upper bound of the bracket
+    while burning and not factor_hi and it_n < max_it:
+        it_n += 1
+        if strained_flame(f, burning, 1+step, T_ext, verbose):
+            burning = Flame_snapshot(f) ; K_ext = f.strain_rate('max')
+            if verbose>3: print_('Strain rate: ' + format(K_ext, '.2e') + ' 1/s',mp)
+            step *= 2
+        else:
+            factor_hi = 1+step
+
+    # bisection (geometric) between the last burning solution and factor_hi
+    while burning and factor_hi-1 > accuracy and it_n < max_it:
+        it_n += 1
+        factor = np.sqrt(factor_hi)
+        if strained_flame(f, burning, factor, T_ext, verbose):
+            burning   = Flame_snapshot(f) ; K_ext = f.strain_rate('max')
+            factor_hi = factor_hi/factor
+            if verbose>3: print_('Strain rate: ' + format(K_ext, '.2e') + ' 1/s',mp)
+        else:
+            factor_hi = factor
+
+    if burning: burning.restore(f)
+    if not factor_hi: factor_hi = 1+step
+
+    return K_ext, burning, factor_hi-1
+
+
+def new_reactor(conditions, gas):
+    """ reactor network of the reactor case, initial state of the case """
+
+    gas.TPX = conditions.state_var.T, conditions.state_var.P, conditions.composition.X
+    if conditions.config == 'reactor_UV':
+        reactor = ct.IdealGasReactor(gas)
+    elif conditions.config == 'reactor_HP':
+        reactor = ct.IdealGasConstPressureReactor(gas)
+
+    return reactor, ct.ReactorNet([reactor])
+
+
+def reactor_dense_solution(conditions, gas, scal_idx=False):
+    """ single pass integration of the reactor over the internal time steps
+        of the solver. The integration is stopped at t_max_coeff x ignition
+        time (heat release peak, detected once the heat release has dropped
+        below half of its maximum after a 5% temperature rise) or at
+        t_max_react (same solver tolerances as the reduced computations).
+        Returns the time, T and scalar (mass fraction of species scal_idx,
+        T if False) of each step, the ignition time and the ignition
+        detection. The full states are not kept (see reactor_states)     """
+
+    t_max_coeff = conditions.simul_param.t_max_coeff
+    tmax        = conditions.simul_param.t_max_react
+    max_steps   = 100000
+
+    reactor, sim = new_reactor(conditions, gas)
+
+    def scal(): return reactor.T if scal_idx is False else gas.Y[scal_idx]
+
+    time = [0.] ; T = [reactor.T] ; X_Scal = [scal()]
+    heat_release = [0.] ; hr_max = 0. ; tign = 0. ; ignited = False
+    while time[-1] < tmax and len(time) < max_steps:
+        if ignited:     # after ignition: growing steps (< tign/5), ending at tmax
+            dt = min(2*(time[-1]-time[-2]), tign/5)
+            time.append(min(time[-1]+dt, tmax)) ; sim.advance(time[-1])
+        else:
+            time.append(sim.step())
+        T.append(reactor.T) ; X_Scal.append(scal())
+        try:
+            heat_release.append(-np.dot(gas.net_rates_of_progress,gas.delta_enthalpy))
+        except:     # ignition detected with the temperature gradient
+            heat_release.append((T[-1]-T[-2])/(time[-1]-time[-2]))
+        if heat_release[-1] > hr_max:
+            hr_max = heat_release[-1] ; tign = time[-1]
+        elif not ignited and heat_release[-1] < 0.5*hr_max and T[-1] > 1.05*T[0]:
+            ignited = True
+        if ignited:
+            tmax = min(conditions.simul_param.t_max_react, t_max_coeff*tign)
+
+    if time[-1] < tmax:
+        print_("    WARNING : reactor integration stopped after "+str(max_steps)+\
+               " solver steps at t = "+str(time[-1])+"s (t_max = "+str(tmax)+"s)",\
+               conditions.main_path)
+
+    # no ignition: the heat release peak is used as before
+    if not ignited and tign > 0:
+        tmax = min(tmax, t_max_coeff*tign)
+    time = np.array(time)
+    n    = max(np.searchsorted(time, tmax, side='right'), min(len(time), 4))
+
+    return time[:n], np.array(T[:n]), np.array(X_Scal[:n]), tign, ignited
+
+
+def reactor_states(conditions, gas, times):
+    """ second integration of the reactor up to each of the selected times.
+        Returns the T, density and mass fractions at these times           """
+
+    reactor, sim = new_reactor(conditions, gas)
+
+    T = [] ; D = [] ; Y = []
+    for t in times:
+        if t > 0: sim.advance(t)
+        T.append(reactor.T) ; D.append(reactor.density) ; Y.append(gas.Y)
+
+    return T, D, Y
+
+
+def reactor_time_points(time, X_Scal, n_pts, grad_curv_ratio):
+    """ indices of (about) n_pts output points among the solver time steps,
+        distributed according to the gradient and to the curvature of the
+        scalar X_Scal (grad_curv_ratio) and, for a quarter of them, evenly
+        in time                                                            """
+
+    if len(time) <= n_pts: return np.arange(len(time))
+
+    dt   = np.diff(time)
+    dX   = np.abs(np.diff(X_Scal))
+    grad = np.diff(X_Scal)/np.maximum(dt, 1e-300)
+    dgrad = np.concatenate(([0], np.abs(np.diff(grad))))
+
+    weight = dt/np.sum(dt)*0.25
+    for var, coeff in [(dX, grad_curv_ratio), (dgrad, 1-grad_curv_ratio)]:
+        if np.sum(var) > 0: weight += var/np.sum(var)*coeff*0.75
+    weight_cum = np.concatenate(([0], np.cumsum(weight)))
+
+    # points merged on the same time step are compensated by extra levels
+    n_levels = n_pts
+    for it in range(10):
+        idx = np.searchsorted(weight_cum, np.linspace(0, weight_cum[-1], n_levels))
+        idx = np.unique(np.concatenate(([0], np.minimum(idx, len(time)-1), [len(time)-1])))
+        if len(idx) >= n_pts: break
+        n_levels += n_pts-len(idx)
+
+    return idx
+
+
+def jsr_steady_states(gas, T_list, P, X_in, residenceTime, time_lim=False, verbose=0, mp=False):
+    """ steady states of the isothermal JSR at the temperatures of T_list,
+        computed with the steady-state solver of the reactor network (time
+        integration up to 50 s if it fails). The solution at the previous
+        temperature is used as initial guess.
+        Returns the T, P, concentrations, kf and kr arrays and the success
+        of each point (computation stopped after time_lim seconds)         """
+
+    # Reactor parameters
+    reactorVolume = 30.5*(1e-2)**3 #m3
+    # Instrument parameters
+    pressureValveCoefficient = .01
+    # Simulation termination criterion (time integration)
+    maxSimulationTime = 50 # seconds
+
+    n_T     = len(T_list)
+    T       = np.zeros(n_T) ; P_r = np.zeros(n_T)
+    conc    = np.zeros((n_T,gas.n_species))
+    kf      = np.zeros((n_T,gas.n_reactions)) ; kr = np.zeros((n_T,gas.n_reactions))
+    success = np.zeros(n_T, dtype=bool)
+
+    concentrations = X_in
+    tic_sim = timer.time()
+    for i,temperature in enumerate(T_list):
+        tic = timer.time()
+        # reservoirs at the inlet composition
+        gas.TPX = temperature,P,X_in
+        fuelAirMixtureTank = ct.Reservoir(gas)
+        exhaust            = ct.Reservoir(gas)
+        # use concentrations from the previous temperature to speed up convergence
+        gas.TPX = temperature,P,concentrations
+        stirredReactor     = ct.IdealGasReactor(gas, energy='off', volume=reactorVolume)
+        massFlowController = ct.MassFlowController(upstream=fuelAirMixtureTank,
+                                                   downstream=stirredReactor,
+                                                   mdot=stirredReactor.mass/residenceTime)
+        pressureRegulator  = ct.Valve(upstream=stirredReactor,
+                                      downstream=exhaust,
+                                      K=pressureValveCoefficient)
+        reactorNetwork     = ct.ReactorNet([stirredReactor])
+
+        if time_lim and (tic-tic_sim) > time_lim:
+            if verbose >= 3: print_("\n     WARNING: JSR computation time limit reached\n",mp)
+        else:
+            # supress console output during the simulation
+            if verbose<9:
+                old_stdout = sys.stdout ; old_stderr = sys.stderr
+                with open(os.devnull, "w") as devnull:
+                    sys.stdout = devnull ; sys.stderr = devnull
+            try:
+                reactorNetwork.advance_to_steady_state()
+                success[i] = True
+            except:
+                try:
+                    gas.TPX = temperature,P,concentrations
+                    stirredReactor.syncState()
+                    reactorNetwork.reinitialize()
+                    t = 0
+                    while t < maxSimulationTime:
+                        t = reactorNetwork.step()
+                    success[i] = True
+                except:
+                    success[i] = False
+            # restore console output
+            if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr
+            if not success[i] and verbose >= 3:
+                print_("\n     WARNING: No solution found at T="+str(temperature)+"K\n",mp)
+
+        # results
+        T[i]   = stirredReactor.T
+        P_r[i] = stirredReactor.thermo.P
+        if success[i]:
+            conc[i]        = stirredReactor.thermo.concentrations
+            concentrations = stirredReactor.thermo.X
+        kf[i] = gas.forward_rate_constants
+        kr[i] = gas.reverse_rate_constants
+
+        if verbose>4:
+            print_('Simulation at T={}K took {:3.2f}s to compute'.format(temperature, timer.time()-tic),mp)
+
+    return T, P_r, conc, kf, kr, success
+
+
+def jsr_worker(task):
+    """ steady states of a part of the JSR temperatures (reference mech),
+        and solving time of the worker                                   """
+
+    mech, main_path, T_list, P, X_in, residenceTime = task
+    os.chdir(main_path)
+    if mech not in _jsr_gas:
+        # supress console output during the interpretation
+        old_stdout = sys.stdout ; old_stderr = sys.stderr
+        with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
+        _jsr_gas[mech] = ct.Solution(mech)
+        # restore console output
+        sys.stdout = old_stdout ; sys.stderr = old_stderr
+
+    tic = timer.time()
+    outputs = jsr_steady_states(_jsr_gas[mech], T_list, P, X_in, residenceTime)
+
+    return outputs, timer.time()-tic
+
 
 def ref_computation(conditions, verbose=0):
 
@@ -116,19 +670,11 @@ def ref_computation(conditions, verbose=0):
         f.solve(loglevel, refine_grid)
         if verbose >=2 : print_("Problem solved on ["+ str(f.flame.n_points)+ "] point grid",mp)
 
-        npoints = f.flame.n_points
-        conc = []
-        kf = []
-        kr = []
-        for n in range(npoints):
-            f.set_gas_state(n)
-            conc.append(gas.concentrations)
-            kf.append(gas.forward_rate_constants)
-            kr.append(gas.reverse_rate_constants)
+        conc, kf, kr = flame_states(f, gas)
 
 
         results = cdef.Sim_Results(conditions, gas, np.array(f.flame.grid), \
-                          list(f.T), f.P, list(conc), list(kf), list(kr))
+                          list(f.T), f.P, conc, kf, kr)
         results.Sl = f.u[0]
         results.f  = f
 
@@ -137,22 +683,8 @@ def ref_computation(conditions, verbose=0):
         conditions.simul_param.pts_scatter = np.array(f.flame.grid)
 
         # Save results
-        os.chdir(conditions.main_path)
-        if 'Flame_ref_results' not in os.listdir():
-            os.mkdir('Flame_ref_results')
-        os.chdir('Flame_ref_results')
-        if conditions.state_var.P>10000:
-            fn = conditions.num+'ff_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+'%.2f' %conditions.composition.phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.2f'%(conditions.state_var.P/1e5)\
-            +'.xml'
-        else:
-            fn = conditions.num+'ff_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+'%.2f' %conditions.composition.phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.0f'%(conditions.state_var.P)\
-            +'.xml'
-        f.save(fn,'ref_solution')
-        os.chdir(conditions.main_path)
+        fn = flame_key(conditions)
+        save_flame(f, fn, conditions, conditions.simul_param.flame_spill)
 
     if 'pp_flame' in conditions.config :
         if conditions.composition.phi == conditions.composition.phi2:
@@ -280,18 +812,10 @@ def ref_computation(conditions, verbose=0):
 
 
         # Save data
-        npoints = f.flame.n_points
-        conc = []
-        kf = []
-        kr = []
-        for n in range(npoints):
-            f.set_gas_state(n)
-            conc.append(gas.concentrations)
-            kf.append(gas.forward_rate_constants)
-            kr.append(gas.reverse_rate_constants)
+        conc, kf, kr = flame_states(f, gas)
 
         results = cdef.Sim_Results(conditions, gas, np.array(f.flame.grid), \
-                          list(f.T), f.P, list(conc), list(kf), list(kr))
+                          list(f.T), f.P, conc, kf, kr)
         results.K_max = f.strain_rate('max')
         results.f = f
 
@@ -299,23 +823,8 @@ def ref_computation(conditions, verbose=0):
 
 
         # Save results
-        os.chdir(conditions.main_path)
-        if 'Flame_ref_results' not in os.listdir():
-            os.mkdir('Flame_ref_results')
-        os.chdir('Flame_ref_results')
-        if 'diff' in conditions.config: phi = 'diff'
-        else: phi = '%.2f' %conditions.composition.phi
-        if conditions.state_var.P>10000:
-            fn = conditions.num+'cf_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.2f'%(conditions.state_var.P/1e5)\
-            +'.xml'
-        else:
-            fn = conditions.num+'cf_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.0f'%(conditions.state_var.P)\
-            +'.xml'
-        f.save(fn,'ref_solution')
+        fn = flame_key(conditions)
+        save_flame(f, fn, conditions, conditions.simul_param.flame_spill)
 
 
 
@@ -323,100 +832,18 @@ def ref_computation(conditions, verbose=0):
             if verbose>3:
                 print_('Extinction strain rate computation:',mp)
 
-            # =============================================================================
-            # # PART 3: STRAIN RATE LOOP
-            # =============================================================================
-
-            # Compute counterflow diffusion flames at increasing strain rates at 1 bar
-            # The strain rate is assumed to increase by 25% in each step until the flame is
-            # extinguished
-            strain_factor = 10
-
-            # Exponents for the initial solution variation with changes in strain rate
-            # Taken from Fiala and Sattelmayer (2014) (doi:10.1155/2014/484372)
-            exp_d_a = - 1. / 2.
-            exp_u_a = 1. / 2.
-            exp_V_a = 1.
-            exp_lam_a = 2.
-            exp_mdot_a = 1. / 2.
-
-            # Restore initial solution
-            if verbose<8:
-                old_stdout = sys.stdout ; old_stderr = sys.stderr
-                with open(os.devnull,"w") as devnull: sys.stdout=devnull;sys.stderr=devnull
-            f.restore(fn, 'ref_solution')
-            if verbose<8: sys.stdout = old_stdout ; sys.stderr = old_stderr      # restore console output
-
-
-
-            strain_accuracy = conditions.error_param.strain_accuracy
-            max_it = 30 ; it_n = 0 ; n = 0 ; fn = 'Kref_'+fn
-            pct_var_strain=strain_accuracy+1 ;
-            strain_rate = 1 ; strain_rate_prev = 0
-            it_strain = 1 ; restart_sim=False   #009 46  025 41 05 43  2 46   20 49
-
-            # Do the strain rate loop
+            # Do the strain rate continuation from the initial solution
             clock = cdef.Clock('Stretch') ; clock.start()
-
-            while pct_var_strain>strain_accuracy:
-                it_n += 1
-                if it_n>max_it: break
-                while np.max(f.T) > temperature_limit_extinction or restart_sim:
-#                    while np.max(f.T) > temperature_limit_extinction or restart_sim:
-                    # supress console output during the simulation
-                    if verbose<9:
-                        old_stdout = sys.stdout ; old_stderr = sys.stderr
-                        with open(os.devnull,"w") as devnull: sys.stdout=devnull;sys.stderr=devnull
-                    if n!=0: f.restore(fn, 'solution')
-                    if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr      # restore console output
-                    n += 1
-
-                    # Create an initial guess based on the previous solution
-                    # Update grid
-                    f.flame.grid *= strain_factor ** exp_d_a
-                    normalized_grid = f.grid / (f.grid[-1] - f.grid[0])
-                    # Update mass fluxes
-                    f.fuel_inlet.mdot *= strain_factor ** exp_mdot_a
-                    f.oxidizer_inlet.mdot *= strain_factor ** exp_mdot_a
-                    # Update velocities
-                    f.set_profile('u', normalized_grid, f.u * strain_factor ** exp_u_a)
-                    f.set_profile('V', normalized_grid, f.V * strain_factor ** exp_V_a)
-                    # Update pressure curvature
-                    f.set_profile('lambda', normalized_grid, f.L * strain_factor ** exp_lam_a)
-                    try:
-                        # Try solving the flame
-                        f.solve(loglevel=0)
-                        if verbose<9:
-                            old_stdout = sys.stdout ; old_stderr = sys.stderr
-                            with open(os.devnull,"w") as devnull: sys.stdout=devnull;sys.stderr=devnull
-                        f.save(fn,'solution')
-                        if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr      # restore console output
-                        strain_factor=1+it_strain ;
-                        if not restart_sim:
-                            strain_rate = f.strain_rate('max') # the maximum axial strain rate
-                            if verbose>3:
-                                print('\rStrain rate: ' + format(strain_rate, '.2e') + ' 1/s',end='')
-                            strain_rate_prev2 = strain_rate_prev
-                            strain_rate_prev  = strain_rate
-                            temperature_limit_extinction=.75*np.max(f.T)
-                        else:
-                            restart_sim=False
-                    except Exception as e:
-                        if e.args[0] == 'Flame extinguished':
-                            if verbose>3: print('\nFlame extinguished')
-                            strain_factor=1-it_strain/(it_strain+1)
-                            restart_sim=True
-                        else:
-                            print('Error occurred while solving:', e)
-                        break
-                it_strain /=2
-                pct_var_strain = abs((strain_rate_prev2-strain_rate_prev)/strain_rate_prev)
-                if verbose>3: print_('Accuracy: '+  format(pct_var_strain*100, '.1f') + '%',mp)
-            if verbose>3: print_('Extinction strain rate: ' + format(strain_rate, '.2e') + ' 1/s',mp)
-            results.K_ext = strain_rate_prev
+            results.K_ext, burning, conditions.simul_param.K_bracket_ref \
+                = extinction_strain_rate(f, conditions, load_flame(fn, conditions),\
+                                         1., verbose)
+            if verbose>3: print_('Extinction strain rate: ' + format(results.K_ext, '.2e') + ' 1/s',mp)
+            # last burning solution: warm start of the reduced mechanisms
+            if burning:
+                _flame_snapshots['Kref_'+fn] = burning
+                if conditions.simul_param.flame_spill: spill_flame('Kref_'+fn, conditions)
             clock.stop()
             if verbose>2: clock.display()
-        os.chdir(conditions.main_path)
 
 
     if 'tp_flame' in conditions.config:
@@ -452,222 +879,86 @@ def ref_computation(conditions, verbose=0):
         f.solve(loglevel=0, auto=True)
 
         # Save data
-        npoints = f.flame.n_points
-        conc = []
-        kf = []
-        kr = []
-        for n in range(npoints):
-            f.set_gas_state(n)
-            conc.append(gas.concentrations)
-            kf.append(gas.forward_rate_constants)
-            kr.append(gas.reverse_rate_constants)
+        conc, kf, kr = flame_states(f, gas)
 
         results = cdef.Sim_Results(conditions, gas, np.array(f.flame.grid), \
-                          list(f.T), f.P, list(conc), list(kf), list(kr))
+                          list(f.T), f.P, conc, kf, kr)
         results.f = f
 
         conditions.simul_param.pts_scatter = np.array(f.flame.grid)
 
 
         # Save results
-        os.chdir(conditions.main_path)
-        if 'Flame_ref_results' not in os.listdir():
-            os.mkdir('Flame_ref_results')
-        os.chdir('Flame_ref_results')
-        if conditions.state_var.P>10000:
-            fn = conditions.num+'tp_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+'%.2f' %conditions.composition.phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.2f'%(conditions.state_var.P/1e5)\
-            +'.xml'
-        else:
-            fn = conditions.num+'tp_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+'%.2f' %conditions.composition.phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.0f'%(conditions.state_var.P)\
-            +'.xml'
-        f.save(fn,'ref_solution')
+        fn = flame_key(conditions)
+        save_flame(f, fn, conditions, conditions.simul_param.flame_spill)
 
 
 
 
 
     elif 'reactor' in conditions.config:
-        gas  = conditions.composition.gas
-        init = conditions.state_var.T, conditions.state_var.P,conditions.composition.X
-        init_points = int(conditions.simul_param.tign_nPoints)     # max number of time step
-        dt          = conditions.simul_param.tign_dt          # time step
-        n_pts       = conditions.simul_param.n_pts
-        delta_npts  = conditions.simul_param.delta_npts
-        t_max_coeff = conditions.simul_param.t_max_coeff
+        gas         = conditions.composition.gas
+        n_pts       = int(conditions.simul_param.n_pts)
         Scal_ref    = conditions.simul_param.Scal_ref  # Scalar selected for the time vector computation
         grad_curv_ratio = conditions.simul_param.grad_curv_ratio
-        tmax_react  = conditions.simul_param.t_max_react
 
-    #   Auto ignition time Detection
-             # Record the scalar evolution and check ignition
-             # with H2O variation (considered if variation >20%)
         time1 = timer.time()
         print_("  Computation...",mp)
-        gas.TPX = init
-        if conditions.config == 'reactor_UV':
-            reactor = ct.IdealGasReactor(gas)
-        elif conditions.config == 'reactor_HP':
-            reactor = ct.IdealGasConstPressureReactor(gas)
-        sim = ct.ReactorNet([reactor])
-        sim.rtol = conditions.simul_param.tol_ts[0]
-        sim.atol = conditions.simul_param.tol_ts[1]
-        time_init = tmax_react
-        timeVec_ignit = []
-        for i in range(init_points):
-            timeVec_ignit.append(time_init)
-            time_init/=1.25
-        timeVec_ignit.reverse()
-        H2O = np.zeros(init_points-1, 'd')
-        X_Scal = np.zeros(init_points-1, 'd')
-        dH2O = np.zeros(init_points-2, 'd')
-
-
 
+    #   Single pass integration over the solver time steps, stopped at
+    #   t_max_coeff x ignition time (heat release peak)
         if Scal_ref == "T" or Scal_ref == "T(K)" or Scal_ref == "Temp":
-            X_Scal[0] = reactor.T
+            scal_idx = False
         else:
-            X_Scal[0] = gas.X[gas.species_index(Scal_ref)]
-        try:
-            H2O[0] = gas.X[gas.species_index("H2O")]
-        except:
-            H2O[0] = 0
-
-        for n in range(1, init_points-1):
-#            timeVec_ignit[n] = timeVec_ignit[n-1] + dt
-            sim.advance(timeVec_ignit[n])
-
-            if Scal_ref == "T" or Scal_ref == "T(K)" or Scal_ref == "Temp":
-                X_Scal[n] = reactor.T
-            else:
-                X_Scal[n] = gas.X[gas.species_index(Scal_ref)]
-
-            try:
-                H2O[n] = gas.X[gas.species_index("H2O")]
-                dH2O[n-1] = (H2O[n]-H2O[n-1]) *0.5
-            except:
-                H2O[n] = 0
-                dH2O[n-1] = np.abs(X_Scal[n]-X_Scal[n-1]) *0.5
-
-
-        idx_maxgrad = np.where(dH2O==max(dH2O)) #find max grad index
-        tign = timeVec_ignit[idx_maxgrad[0][0]]
+            scal_idx = gas.species_index(Scal_ref)
+        time_d, T_d, X_Scal, tign, ignited = reactor_dense_solution(conditions, gas, scal_idx)
         if verbose >=4:
-            if H2O[0]*1.2>H2O[-1] or tign>0.97*timeVec_ignit[-1]:
+            if not ignited:
                 print_("    WARNING : No ignition was detected in the first "+
-                      str(init_points*dt)+"s" +".",mp)
+                      str(time_d[-1])+"s" +".",mp)
             elif verbose>7:
-                print_("    - first ignition time estimation:  "+"%5.3f" %(tign*1e6)+'µs',mp)
-
-
-    # Computing the time vector according to the selected scalar variation
-        tmax = min(tmax_react,t_max_coeff*tign)
-
-
-        # Grad and curve vectors calculation
-        grad_vect_0 = [] ; curv_vect = []
-        # grad calculation
-        for i in range(len(X_Scal)-1):
-            grad_vect_0.append((X_Scal[i+1]-X_Scal[i])/(dt))
-        # curv calculation
-        for i in range(len(grad_vect_0)-1):
-            curv_vect.append((grad_vect_0[i+1]-grad_vect_0[i])/(2*dt))
-        # grad recomputed, for corresponding to the curv values
-        grad_vect = []
-        for i in range(len(X_Scal)-2):
-            grad_vect.append((X_Scal[i+2]-X_Scal[i])/(2*dt))
-
-        if verbose>7:
-            print_("grad and curve calculation done",mp)
-
-        time_stepping_calc=True; pt_coeff=2e5
-        coeff_dtmax = n_pts/10 ; coeff_dtmin = n_pts*2
-        time_stepping_calc_try=0
-        while time_stepping_calc:
-            # time stepping
-            timeVec = [0]
-            # first point => considering only grad_vect_0 (curve data not available)
-            timeVec.append(tmax/((grad_vect_0[0]/np.sum([grad_vect_0[0]]))*n_pts))
-            # Next points => considering only grad_vect_0 (curve data not available)
-            while timeVec[-1]<tmax:
-                idx = min((np.abs(timeVec_ignit-timeVec[-1])).argmin()-2,len(grad_vect)-1)
-                dt = (tmax/(n_pts*pt_coeff))/(abs((grad_vect[idx]/np.sum(np.abs([grad_vect])))*
-                     grad_curv_ratio+curv_vect[idx]/np.sum(np.abs([curv_vect]))*(1-grad_curv_ratio)))
-                if dt<(tign/coeff_dtmin):
-                    timeVec.append(timeVec[-1]+tign/200)
-                elif dt>(tign/coeff_dtmax):
-                    timeVec.append(timeVec[-1]+tign/5)
-                else:
-                    timeVec.append(timeVec[-1]+dt)
-
-            if len(timeVec)>n_pts-delta_npts and len(timeVec)<n_pts+delta_npts:
-                time_stepping_calc=False
-            else:
-                if verbose>4:
-                    print_("Bad number of time steps:"+str(len(timeVec))+". Recomputing time vector",mp)
-                pt_coeff=pt_coeff*(n_pts/len(timeVec))**2
-                time_stepping_calc=True
-                time_stepping_calc_try+=1
-                if time_stepping_calc_try>50:  time_stepping_calc=False
-                if pt_coeff<1e-5:
-                    print_("Warning : larger time steps imposed for the calculation",mp)
-                    pt_coeff = 2e5 ; coeff_dtmax = coeff_dtmax/4
-                if pt_coeff>1e20:
-                    print_("Warning : smaller time steps imposed for the calculation",mp)
-                    pt_coeff = 2e5 ; coeff_dtmin = coeff_dtmin*4
+                print_("    - ignition time estimation:  "+"%5.3f" %(tign*1e6)+'µs',mp)
+
+    #   Output points selected among the solver time steps according to the
+    #   selected scalar variation
+        idx     = reactor_time_points(time_d, X_Scal, n_pts, grad_curv_ratio)
+        timeVec = list(time_d[idx])
+        T_s, D_s, Y_s = reactor_states(conditions, gas, timeVec)
         if verbose>3:
             print_("    - time vector contains: "+str(len(timeVec))+" points",mp)
 
 
-
-    # Data computation
-        gas.TPX = init
-        if conditions.config == 'reactor_UV' :
-            reactor = ct.IdealGasReactor(gas)
-        elif conditions.config == 'reactor_HP':
-            reactor = ct.IdealGasConstPressureReactor(gas)
-        sim = ct.ReactorNet([reactor])
-        T = []
-        P = []
-        conc = []
-        kf = []
-        kr = []
-        heat_release = [0]
-        T.append(reactor.T)
-        P.append(reactor.thermo.P)
-        conc.append(reactor.thermo.concentrations.tolist())
-        kf.append(gas.forward_rate_constants)
-        kr.append(gas.reverse_rate_constants)
+    # Data at the output points (solver states of the second integration)
+        T = [] ; P = [] ; conc = [] ; kf = [] ; kr = []
+        heat_release = []
         fuel = conditions.composition.fuel.split('/')[0].split('(')[0]
         target_ign_idx = gas.species_index(fuel)
         target_ign_ = []
         grad_fuel = []
-        for n in range(1,len(timeVec)):
-            sim.advance(timeVec[n])
-            T.append(reactor.T)
-            P.append(reactor.thermo.P)
-            conc.append(reactor.thermo.concentrations.tolist())
+        hr = "ok"
+        for n in range(len(idx)):
+            gas.TDY = T_s[n], D_s[n], Y_s[n]
+            T.append(gas.T)
+            P.append(gas.P)
+            conc.append(gas.concentrations.tolist())
             target_ign_.append(gas.X[target_ign_idx])
             kf.append(gas.forward_rate_constants)
             kr.append(gas.reverse_rate_constants)
             # heat release calculation
-            hr="ok"
             try:
                 heat_release.append(-np.dot(gas.net_rates_of_progress,\
                                            gas.delta_enthalpy))
             except:
-                if n==1:
+                if hr == "ok":
                     print_("warning: heat release calculation issues",mp)
-                    hr="no_heat_release"
+                hr = "no_heat_release" ; heat_release.append(0)
+        heat_release[0] = 0
+        target_ign_ = target_ign_[1:]
         # ignition time calculation
            # 1- based on heat release (default)
         if hr!= "no_heat_release":
             ign_time_hr = timeVec[heat_release.index(max(heat_release))]
         else: ign_time_hr=False
-        ign_time_hr = timeVec[heat_release.index(max(heat_release))]
            # 2- based on fuel gradients (if heat relase calculation troubles)
         for t in range(len(timeVec)-3):
             grad_fuel.append((target_ign_[t+2]-target_ign_[t])/(timeVec[t+2]-timeVec[t]))
@@ -690,113 +981,38 @@ def ref_computation(conditions, verbose=0):
     elif 'JSR' in conditions.config:
         # adapted from https://www.cantera.org/examples/jupyter/reactors/stirred_reactor.ipynb.html
 
-        # =============================================================================
-        # Initial conditions
-        # =============================================================================
-        gas  = conditions.composition.gas
-        T_list = list(conditions.simul_param.pts_scatter)
-        gas.TPX = T_list[0], conditions.state_var.P,conditions.composition.X
-        time1 = timer.time()
-        # Reactor parameters
+        gas           = conditions.composition.gas
+        T_list        = list(conditions.simul_param.pts_scatter)
+        P             = conditions.state_var.P
         residenceTime = conditions.simul_param.end_sim #s
-        reactorVolume = 30.5*(1e-2)**3 #m3
-        # Instrument parameters
-        pressureValveCoefficient = .01
-        # Simulation termination criterion
-        maxSimulationTime = 50 # seconds
-
-        # =============================================================================
-        # Reactor model
-        # =============================================================================
-        #Initialize the stirred reactor and connect all peripherals
-        fuelAirMixtureTank = ct.Reservoir(gas)
-        exhaust = ct.Reservoir(gas)
-        stirredReactor = ct.IdealGasReactor(gas, energy='off', volume=reactorVolume)
-        massFlowController = ct.MassFlowController(upstream=fuelAirMixtureTank,
-                                                   downstream=stirredReactor,
-                                                   mdot=stirredReactor.mass/residenceTime)
-        pressureRegulator = ct.Valve(upstream=stirredReactor,
-                                     downstream=exhaust,
-                                     K=pressureValveCoefficient)
-        reactorNetwork = ct.ReactorNet([stirredReactor])
-        # now compile a list of all variables for which we will store data
-        columnNames = [stirredReactor.component_name(item) for item in range(stirredReactor.n_vars)]
-        columnNames = ['pressure'] + columnNames
-        # use the above list to create a DataFrame
-        timeHistory = pd.DataFrame(columns=columnNames)
-
-        # =============================================================================
-        # Modeling data
-        # =============================================================================
-        T = [] ; P = [] ; conc = []; kf = [] ; kr = []
+        n_workers     = min(conditions.simul_param.jsr_workers, len(T_list))
 
-        # Create a data frame to store values for the above points
-        tempDependence = pd.DataFrame(columns=timeHistory.columns)
-        tempDependence.index.name = 'Temperature'
-        inletConcentrations = conditions.composition.X
-        concentrations      = inletConcentrations
         tic_sim = timer.time()
-        for temperature in T_list:
-            #Re-initialize the gas
-            reactorTemperature = temperature #Kelvin
-            gas.TPX = reactorTemperature,conditions.state_var.P,inletConcentrations
-            # Re-initialize the dataframe used to hold values
-            timeHistory = pd.DataFrame(columns=columnNames)
-            # Re-initialize all the reactors, reservoirs, etc
-            fuelAirMixtureTank = ct.Reservoir(gas)
-            exhaust            = ct.Reservoir(gas)
-            # use concentrations from the previous iteration to speed up convergence
-            gas.TPX = reactorTemperature,conditions.state_var.P,concentrations
-
-            stirredReactor = ct.IdealGasReactor(gas, energy='off', volume=reactorVolume)
-            massFlowController = ct.MassFlowController(upstream=fuelAirMixtureTank,
-                                                       downstream=stirredReactor,
-                                                       mdot=stirredReactor.mass/residenceTime)
-            pressureRegulator  = ct.Valve(upstream=stirredReactor,
-                                         downstream=exhaust,
-                                         K=pressureValveCoefficient)
-            reactorNetwork     = ct.ReactorNet([stirredReactor])
-            tic = timer.time()
-
-            # Re-run the isothermal simulations
-            t = 0
-            while t < maxSimulationTime:
-                t = reactorNetwork.step()
-                if verbose>7:
-                    write_t = '\r'+str(t) + '                '
-                    print(write_t ,end="")
-            if verbose>7:print(' ')
-            state = np.hstack([stirredReactor.thermo.P,
-                               stirredReactor.mass,
-                               stirredReactor.volume,
-                               stirredReactor.T,
-                               stirredReactor.thermo.X])
-            diff_P = conditions.state_var.P - stirredReactor.thermo.P
-            if(abs(diff_P/conditions.state_var.P) > 0.01):
-                print_("WARNING: Non-trivial pressure rise in the reactor. You may adjust pressureValveCoefficient value in ./packages/Computation.py",mp)
-            concentrations = stirredReactor.thermo.X
-            # Store the result in the dataframe that indexes by temperature
-            tempDependence.loc[temperature] = state
-            toc = timer.time()
-
-            if verbose>4:
-                print_('Simulation at T={}K took {:3.2f}s to compute'.format(temperature, toc-tic),mp)
-            else:
-                print("\r  Computation at T="+str(stirredReactor.T)+'K ...  ',end='')
-
-            # results
-            T.append(stirredReactor.T)
-            P.append(stirredReactor.thermo.P)
-            conc.append(stirredReactor.thermo.concentrations.tolist())
-            kf.append(gas.forward_rate_constants)
-            kr.append(gas.reverse_rate_constants)
-
-        toc_sim = timer.time()
+        # temperatures shared between processes (not from a pool worker)
+        if n_workers > 1 and not multiprocessing.current_process().daemon:
+            chunks = np.array_split(np.array(T_list), n_workers)
+            tasks  = [(conditions.mech, mp, list(chunk), P, conditions.composition.X,\
+                       residenceTime) for chunk in chunks]
+            with multiprocessing.Pool(n_workers) as pool:
+                outputs = pool.map(jsr_worker, tasks)
+            T, P_r, conc, kf, kr, success = [np.concatenate(data) for data in \
+                                             zip(*[output[0] for output in outputs])]
+            # serial time of the sweep (time limit of the reduced mech computations)
+            time_sim = sum([output[1] for output in outputs])
+        else:
+            T, P_r, conc, kf, kr, success \
+                = jsr_steady_states(gas, T_list, P, conditions.composition.X,\
+                                    residenceTime, False, verbose, mp)
+            time_sim = timer.time()-tic_sim
 
+        if np.any(np.abs((P-P_r)/P) > 0.01):
+            print_("WARNING: Non-trivial pressure rise in the reactor. You may adjust pressureValveCoefficient value in ./packages/Computation.py",mp)
+        if not np.all(success):
+            print_("WARNING: JSR steady state not found at T="+str(list(np.array(T_list)[~success]))+"K",mp)
 
         results = cdef.Sim_Results(conditions, gas, np.array(T_list), list(T), \
-                             list(P), list(conc), list(kf), list(kr))
-        conditions.simul_param.time_jsr_ref_lim = toc_sim-tic_sim
+                             list(P_r), conc, kf, kr)
+        conditions.simul_param.time_jsr_ref_lim = time_sim
 
 
     elif 'PFR' in conditions.config:
@@ -880,11 +1096,28 @@ def ref_computation(conditions, verbose=0):
 
 
 
-def red_computation(conditions, gas_red, act_sp,act_r):
+def red_computation(conditions, gas_red, act_sp,act_r, kinetics=True, screening=False):
+    """ simulation of the case with the reduced mechanism gas_red.
+        kinetics=False skips the kf / kr capture (lean evaluation): only
+        the results compared by Errors are computed, the rate constants
+        are required for the DRG / SA analysis of the next operator.
+        screening=True: low fidelity simulation (see screening_conditions),
+        results interpolated on the reference points                      """
+
+    if screening:
+        conditions_full = conditions
+        conditions      = screening_conditions(conditions)
+        kinetics        = False
+        decimated       = len(conditions.simul_param.pts_scatter) \
+                          != len(conditions_full.simul_param.pts_scatter)
 
     verbose    = conditions.simul_param.verbose
     mp = conditions.main_path
 
+    # reference <-> reduced mech indices
+    maps = index_maps(conditions.composition.gas, gas_red, act_sp, act_r)
+    sp_ref, sp_red, r_ref = maps
+
     if 'free_flame' in conditions.config or 'burner_flame' in conditions.config:
 
         # Main variables
@@ -913,18 +1146,7 @@ def red_computation(conditions, gas_red, act_sp,act_r):
 
 
         # Get saved results
-        os.chdir(conditions.main_path)
-        os.chdir('Flame_ref_results')
-        if conditions.state_var.P>10000:
-            fn = conditions.num+'ff_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+'%.2f' %conditions.composition.phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.2f'%(conditions.state_var.P/1e5)\
-            +'.xml'
-        else:
-            fn = conditions.num+'ff_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+'%.2f' %conditions.composition.phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.0f'%(conditions.state_var.P)\
-            +'.xml'
+        fn = flame_key(conditions)
 
 
         # --------------------     Simulation     ----------------------
@@ -934,9 +1156,7 @@ def red_computation(conditions, gas_red, act_sp,act_r):
             old_stdout = sys.stdout ; old_stderr = sys.stderr
             with open(os.devnull, "w") as devnull:
                 sys.stdout = devnull ; sys.stderr = devnull
-        f.restore(fn, 'ref_solution')
-
-        os.chdir(conditions.main_path)
+        restore_flame(f, fn, conditions)
 
         try:
             f.solve(auto = False, loglevel = 0, refine_grid = False)
@@ -957,31 +1177,11 @@ def red_computation(conditions, gas_red, act_sp,act_r):
         # ------------------     end of simulation     --------------------
 
         # saving spec concentrations at
-        conc = [] ; kf = [] ; kr = [] ; npoints = f.flame.n_points
-        for n in range(npoints):
-            f.set_gas_state(n)
-            # saving spec concentrations
-            conc_x = []
-            for sp in range(len(act_sp)):
-                if act_sp[sp] and simul_success:
-                    sp_ind=gas_red.species_index(gas_ref.species_name(sp))
-                    conc_x.append(gas_red.concentrations[sp_ind])
-                else:
-                    conc_x.append(0)
-            conc.append(conc_x)
-            # saving kf and kr values
-            kf_x=[];kr_x=[];r_red=0
-            for r in range(len(act_r)):
-                if act_r[r]:
-                        kf_x.append(gas_red.forward_rate_constants[r_red])
-                        kr_x.append(gas_red.reverse_rate_constants[r_red])
-                        r_red+=1
-                else:
-                    kf_x.append(0); kr_x.append(0)
-            kf.append(kf_x); kr.append(kr_x)
+        conc, kf, kr = ref_indexing(maps, len(act_sp), len(act_r),\
+                                    *flame_states(f, gas_red, kinetics), success=simul_success)
 
         results = cdef.Sim_Results(conditions, gas_red, list(f.flame.grid), \
-                          list(f.T), f.P, list(conc), list(kf), list(kr))
+                          list(f.T), f.P, conc, kf, kr)
         results.Sl = f.u[0]
         results.f  = f
 
@@ -992,21 +1192,14 @@ def red_computation(conditions, gas_red, act_sp,act_r):
         gas_ref   = conditions.composition.gas
 
 
-        f = ct.CounterflowTwinPremixedFlame(gas_red)
-
         # Get saved results
-        os.chdir(conditions.main_path)
-        os.chdir('Flame_ref_results')
-        if conditions.state_var.P>10000:
-            fn = conditions.num+'tp_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+'%.2f' %conditions.composition.phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.2f'%(conditions.state_var.P/1e5)\
-            +'.xml'
-        else:
-            fn = conditions.num+'tp_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+'%.2f' %conditions.composition.phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.0f'%(conditions.state_var.P)\
-            +'.xml'
+        fn = flame_key(conditions)
+        f  = ct.CounterflowTwinPremixedFlame(gas_red, grid=load_flame(fn,conditions).grid)
+
+        if screening:
+            f.transport_model = conditions.simul_param.transport_model
+            f.flame.set_steady_tolerances(default=conditions.simul_param.tol_ss)
+            f.flame.set_transient_tolerances(default=conditions.simul_param.tol_ts)
 
 
         # supress console output during the simulation
@@ -1015,7 +1208,7 @@ def red_computation(conditions, gas_red, act_sp,act_r):
             with open(os.devnull, "w") as devnull:
                 sys.stdout = devnull ; sys.stderr = devnull
 
-        f.restore(fn, 'ref_solution')
+        restore_flame(f, fn, conditions)
 
         # Initialize and solve
         try:
@@ -1037,31 +1230,11 @@ def red_computation(conditions, gas_red, act_sp,act_r):
 
 
         # saving spec concentrations at
-        conc = [] ; kf = [] ; kr = [] ; npoints = f.flame.n_points
-        for n in range(npoints):
-            f.set_gas_state(n)
-            # saving spec concentrations
-            conc_x = []
-            for sp in range(len(act_sp)):
-                if act_sp[sp] and simul_success:
-                    sp_ind=gas_red.species_index(gas_ref.species_name(sp))
-                    conc_x.append(gas_red.concentrations[sp_ind])
-                else:
-                    conc_x.append(0)
-            conc.append(conc_x)
-            # saving kf and kr values
-            kf_x=[];kr_x=[];r_red=0
-            for r in range(len(act_r)):
-                if act_r[r]:
-                        kf_x.append(gas_red.forward_rate_constants[r_red])
-                        kr_x.append(gas_red.reverse_rate_constants[r_red])
-                        r_red+=1
-                else:
-                    kf_x.append(0); kr_x.append(0)
-            kf.append(kf_x); kr.append(kr_x)
+        conc, kf, kr = ref_indexing(maps, len(act_sp), len(act_r),\
+                                    *flame_states(f, gas_red, kinetics), success=simul_success)
 
         results = cdef.Sim_Results(conditions, gas_red, list(f.flame.grid), \
-                          list(f.T), f.P, list(conc), list(kf), list(kr))
+                          list(f.T), f.P, conc, kf, kr)
         results.f  = f
 
         os.chdir(conditions.main_path)
@@ -1073,30 +1246,20 @@ def red_computation(conditions, gas_red, act_sp,act_r):
 
         # Main variables
         gas_ref  = conditions.composition.gas
-        width    = conditions.simul_param.end_sim
 
 
         # =============================================================================
         # # PART 1: INITIALIZATION
         # =============================================================================
 
-        f = ct.CounterflowDiffusionFlame(gas_red, width=width)
-
         # Get saved results
-        os.chdir(conditions.main_path)
-        os.chdir('Flame_ref_results')
-        if 'diff' in conditions.config: phi = 'diff'
-        else: phi = '%.2f' %conditions.composition.phi
-        if conditions.state_var.P>10000:
-            fn = conditions.num+'cf_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.2f'%(conditions.state_var.P/1e5)\
-            +'.xml'
-        else:
-            fn = conditions.num+'cf_'+conditions.composition.fuel.replace('/','').split('(')[0]\
-            +'_'+phi\
-            +'_'+'%.0f'%conditions.state_var.T+'_'+'%.0f'%(conditions.state_var.P)\
-            +'.xml'
+        fn = flame_key(conditions)
+        f  = ct.CounterflowDiffusionFlame(gas_red, grid=load_flame(fn,conditions).grid)
+
+        if screening:
+            f.transport_model = conditions.simul_param.transport_model
+            f.flame.set_steady_tolerances(default=conditions.simul_param.tol_ss)
+            f.flame.set_transient_tolerances(default=conditions.simul_param.tol_ts)
 
 #        # Define a limit for the maximum temperature below which the flame is
 #        # considered as extinguished and the computation is aborted
@@ -1115,7 +1278,7 @@ def red_computation(conditions, gas_red, act_sp,act_r):
             with open(os.devnull, "w") as devnull:
                 sys.stdout = devnull ; sys.stderr = devnull
 
-        f.restore(fn, 'ref_solution')
+        restore_flame(f, fn, conditions)
 
         # Initialize and solve
         try:
@@ -1137,31 +1300,11 @@ def red_computation(conditions, gas_red, act_sp,act_r):
 
 
         # saving spec concentrations at
-        conc = [] ; kf = [] ; kr = [] ; npoints = f.flame.n_points
-        for n in range(npoints):
-            f.set_gas_state(n)
-            # saving spec concentrations
-            conc_x = []
-            for sp in range(len(act_sp)):
-                if act_sp[sp] and simul_success:
-                    sp_ind=gas_red.species_index(gas_ref.species_name(sp))
-                    conc_x.append(gas_red.concentrations[sp_ind])
-                else:
-                    conc_x.append(0)
-            conc.append(conc_x)
-            # saving kf and kr values
-            kf_x=[];kr_x=[];r_red=0
-            for r in range(len(act_r)):
-                if act_r[r]:
-                        kf_x.append(gas_red.forward_rate_constants[r_red])
-                        kr_x.append(gas_red.reverse_rate_constants[r_red])
-                        r_red+=1
-                else:
-                    kf_x.append(0); kr_x.append(0)
-            kf.append(kf_x); kr.append(kr_x)
+        conc, kf, kr = ref_indexing(maps, len(act_sp), len(act_r),\
+                                    *flame_states(f, gas_red, kinetics), success=simul_success)
 
         results = cdef.Sim_Results(conditions, gas_red, list(f.flame.grid), \
-                          list(f.T), f.P, list(conc), list(kf), list(kr))
+                          list(f.T), f.P, conc, kf, kr)
         results.K_max = f.strain_rate('max')
         results.f  = f
 
@@ -1169,104 +1312,19 @@ def red_computation(conditions, gas_red, act_sp,act_r):
         if conditions.error_param.K_check and simul_success:
             if verbose>4:
                 print_('Extinction strain rate computation:',mp)
-            # =============================================================================
-            # # PART 3: STRAIN RATE LOOP
-            # =============================================================================
-
-            # Compute counterflow diffusion flames at increasing strain rates at 1 bar
-            # The strain rate is assumed to increase by 25% in each step until the flame is
-            # extinguished
-            strain_factor = 0.95
-
-            # Exponents for the initial solution variation with changes in strain rate
-            # Taken from Fiala and Sattelmayer (2014) (doi:10.1155/2014/484372)
-            exp_d_a = - 1. / 2.
-            exp_u_a = 1. / 2.
-            exp_V_a = 1.
-            exp_lam_a = 2.
-            exp_mdot_a = 1. / 2.
-
-            # Counter to identify the loop
-            strain_accuracy = conditions.error_param.strain_accuracy
-            max_it = 30
-            if conditions.simul_param.par_ind: Ki = conditions.simul_param.par_ind
-            else:                              Ki = ''
-            it_n = 0 ; fnK = 'Kref_'+fn ; fnKi = 'K'+Ki+'_'+fn
-            pct_var_strain=strain_accuracy+1 ;
-            strain_rate = 1 ; strain_rate_prev = 0
-            it_strain = .05 ; restart_sim = False   #009 46  025 41 05 43  2 46   20 49
-
-
-            if simul_success:
-                first_it = True
-                while pct_var_strain>strain_accuracy:
-                    it_n += 1
-                    if it_n>max_it: break
-                    it_sn = 0
-                    while np.max(f.T) > temperature_limit_extinction or restart_sim:
-                        it_sn +=1
-                        if it_sn>40:
-                            it_n = max_it*2
-                            break
-                        # supress console output during the simulation
-                        if verbose<9:
-                            old_stdout = sys.stdout ; old_stderr = sys.stderr
-                            with open(os.devnull,"w") as devnull: sys.stdout=devnull;sys.stderr=devnull
-                        if it_n == 1: f.restore(fnK, 'solution')
-                        else:         f.restore(fnKi, 'solution')
-                        if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr      # restore console output
-
-                        # Create an initial guess based on the previous solution
-                        # Update grid
-                        f.flame.grid    *= strain_factor ** exp_d_a
-                        normalized_grid  = f.grid / (f.grid[-1] - f.grid[0])
-                        # Update mass fluxes
-                        f.fuel_inlet.mdot     *= strain_factor ** exp_mdot_a
-                        f.oxidizer_inlet.mdot *= strain_factor ** exp_mdot_a
-                        # Update velocities
-                        f.set_profile('u', normalized_grid, f.u * strain_factor ** exp_u_a)
-                        f.set_profile('V', normalized_grid, f.V * strain_factor ** exp_V_a)
-                        # Update pressure curvature
-                        f.set_profile('lambda', normalized_grid, f.L * strain_factor ** exp_lam_a)
-                        try:
-                            # Try solving the flame
-                            f.solve(loglevel=0)
-                            if verbose<9:
-                                old_stdout = sys.stdout ; old_stderr = sys.stderr
-                                with open(os.devnull,"w") as devnull: sys.stdout=devnull;sys.stderr=devnull
-                            f.save(fnKi,'solution')
-                            if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr      # restore console output
-                            strain_factor=1+it_strain ;
-                            first_it = False
-                            if not restart_sim:
-                                strain_rate = f.strain_rate('max') # the maximum axial strain rate
-                                if verbose>5:
-                                    print('\rStrain rate:' + format(strain_rate, '.2e') + ' 1/s',end='')
-                                strain_rate_prev2 = strain_rate_prev
-                                strain_rate_prev  = strain_rate
-                                temperature_limit_extinction=.75*np.max(f.T)
-                            else:
-                                restart_sim=False
-
-                        except Exception as e:
-                            if e.args[0] == 'Flame extinguished':
-                                if verbose>5: print('\nFlame extinguished')
-                                strain_factor=1-it_strain/(it_strain+1)
-                                restart_sim=True
-                                # if extinction at first iteration
-                                if first_it:
-                                    it_strain *= 4
-                                    strain_rate_prev2 = 1 ; strain_rate_prev=0.1
-                                else:
-                                    it_strain = abs(it_strain)
-                            else:
-                                print('Error occurred while solving:', e)
-                            break
-                    it_strain /=2
-                    pct_var_strain = abs((strain_rate_prev2-strain_rate_prev)/strain_rate_prev)
-                    if verbose>6: print_('Accuracy: '+ format(pct_var_strain*100, '.1f') + '%',mp)
-                if verbose>5: print_('Extinction strain rate: ' + format(strain_rate, '.2e') + ' 1/s',mp)
-                results.K_ext = strain_rate_prev
+            # continuation from the reference extinction solution
+            fnK = 'Kref_'+fn
+            if fnK in _flame_snapshots or \
+               os.path.isfile(os.path.join(mp,'Flame_ref_results',fnK+'.snp')):
+                K_snapshot = load_flame(fnK, conditions)
+            else:
+                K_snapshot = load_flame(fn, conditions)
+            # first step: width of the reference bracket (5% at least)
+            try:    step = max(2*conditions.simul_param.K_bracket_ref, .05)
+            except: step = .05
+            K_ext = extinction_strain_rate(f, conditions, K_snapshot, step, verbose-2)[0]
+            if verbose>5: print_('Extinction strain rate: ' + format(K_ext, '.2e') + ' 1/s',mp)
+            results.K_ext = K_ext
 
         os.chdir(conditions.main_path)
 
@@ -1284,33 +1342,27 @@ def red_computation(conditions, gas_red, act_sp,act_r):
         elif conditions.config == 'reactor_HP':
             reactor = ct.IdealGasConstPressureReactor(gas_red)
         sim = ct.ReactorNet([reactor])
-
-
-        T = [] ; P = [] ; conc = [] ; kf = [] ; kr = []
+        if screening:
+            sim.rtol = sim.rtol*conditions.error_param.screening_tol
+            sim.atol = sim.atol*conditions.error_param.screening_tol
+
+        T = [] ; P = []
+        conc = np.zeros((len(timeVec),len(act_sp)))
+        if kinetics:
+            kf   = np.zeros((len(timeVec),len(act_r)))
+            kr   = np.zeros((len(timeVec),len(act_r)))
+        else:
+            kf = False ; kr = False
     #    gradT = [0]
         heat_release = [0]
         T.append(reactor.T)
         P.append(reactor.thermo.P)
 
-        # saving spec concentrations at t=0
-        conc_t=[]
-        for sp in range(len(act_sp)):
-            if act_sp[sp]:
-                sp_ind=gas_red.species_index(gas_ref.species_name(sp))
-                conc_t.append(reactor.thermo.concentrations[sp_ind])
-            else:
-                conc_t.append(0)
-        conc.append(conc_t)
-        # saving kf and kr values at t=0
-        kf_t=[];kr_t=[];r_red=0
-        for r in range(len(act_r)):
-            if act_r[r]:
-                    kf_t.append(gas_red.forward_rate_constants[r_red])
-                    kr_t.append(gas_red.reverse_rate_constants[r_red])
-                    r_red+=1
-            else:
-                kf_t.append(0); kr_t.append(0)
-        kf.append(kf_t); kr.append(kr_t)
+        # saving spec concentrations, kf and kr values at t=0
+        conc[0,sp_ref] = reactor.thermo.concentrations[sp_red]
+        if kinetics:
+            kf[0,r_ref]    = gas_red.forward_rate_constants
+            kr[0,r_ref]    = gas_red.reverse_rate_constants
 
 
         fuel = conditions.composition.fuel.split('/')[0].split('(')[0]
@@ -1342,26 +1394,14 @@ def red_computation(conditions, gas_red, act_sp,act_r):
             T.append(reactor.T)
             P.append(reactor.thermo.P)
             # saving spec concentrations
-            conc_t=[]
-            for sp in range(len(act_sp)):
-                if act_sp[sp] and simul_success:
-                    sp_ind=gas_red.species_index(gas_ref.species_name(sp))
-                    conc_t.append(reactor.thermo.concentrations[sp_ind])
-                else:
-                    conc_t.append(0)
-            conc.append(conc_t)
+            if simul_success:
+                conc[n,sp_ref] = reactor.thermo.concentrations[sp_red]
             target_ign_.append(gas_red.X[target_ign_idx])
 
             # saving kf and kr values
-            kf_t=[];kr_t=[];r_red=0
-            for r in range(len(act_r)):
-                if act_r[r]:
-                        kf_t.append(gas_red.forward_rate_constants[r_red])
-                        kr_t.append(gas_red.reverse_rate_constants[r_red])
-                        r_red+=1
-                else:
-                    kf_t.append(0); kr_t.append(0)
-            kf.append(kf_t); kr.append(kr_t)
+            if kinetics:
+                kf[n,r_ref] = gas_red.forward_rate_constants
+                kr[n,r_ref] = gas_red.reverse_rate_constants
             # heat release calculation
             hr="ok"
             try:
@@ -1384,7 +1424,7 @@ def red_computation(conditions, gas_red, act_sp,act_r):
 
 
         results = cdef.Sim_Results(conditions, gas_red, list(timeVec), list(T),\
-                             list(P), list(conc), list(kf), list(kr))
+                             list(P), conc, kf, kr)
         results.ign_time_hr = ign_time_hr
         results.ign_time_sp = ign_time_sp
 
@@ -1394,140 +1434,23 @@ def red_computation(conditions, gas_red, act_sp,act_r):
     elif 'JSR' in conditions.config:
         # adapted from https://www.cantera.org/examples/jupyter/reactors/stirred_reactor.ipynb.html
 
-        # =============================================================================
-        # Initial conditions
-        # =============================================================================
-        X_red = conditions.composition.X
-
         gas_ref  = conditions.composition.gas
-        T_list = list(conditions.simul_param.pts_scatter)
-        gas_red.TPX = T_list[0], conditions.state_var.P,X_red
-        # Reactor parameters
-        residenceTime = conditions.simul_param.end_sim #s
-        reactorVolume = 30.5*(1e-2)**3 #m3
-        # Instrument parameters
-        pressureValveCoefficient = .01
-        # Simulation termination criterion
-        maxSimulationTime = 50 # seconds
-
-        # =============================================================================
-        # Reactor model
-        # =============================================================================
-        #Initialize the stirred reactor and connect all peripherals
-        fuelAirMixtureTank = ct.Reservoir(gas_red)
-        exhaust = ct.Reservoir(gas_red)
-        stirredReactor = ct.IdealGasReactor(gas_red, energy='off', volume=reactorVolume)
-        massFlowController = ct.MassFlowController(upstream=fuelAirMixtureTank,
-                                                   downstream=stirredReactor,
-                                                   mdot=stirredReactor.mass/residenceTime)
-        pressureRegulator = ct.Valve(upstream=stirredReactor,
-                                     downstream=exhaust,
-                                     K=pressureValveCoefficient)
-        reactorNetwork = ct.ReactorNet([stirredReactor])
-        # now compile a list of all variables for which we will store data
-        columnNames = [stirredReactor.component_name(item) for item in range(stirredReactor.n_vars)]
-        columnNames = ['pressure'] + columnNames
-        # use the above list to create a DataFrame
-        timeHistory = pd.DataFrame(columns=columnNames)
+        T_list   = list(conditions.simul_param.pts_scatter)
+        # computation stopped if it becomes too long
+        time_lim = 100*conditions.simul_param.time_jsr_ref_lim
 
-        # =============================================================================
-        # Modeling data
-        # =============================================================================
-        T = [] ; P = [] ; conc = []; kf = [] ; kr = []
+        T, P, conc_red, kf_red, kr_red, success \
+            = jsr_steady_states(gas_red, T_list, conditions.state_var.P,\
+                                conditions.composition.X, conditions.simul_param.end_sim,\
+                                time_lim, min(verbose,4), mp)
 
-        # Create a data frame to store values for the above points
-        tempDependence = pd.DataFrame(columns=timeHistory.columns)
-        tempDependence.index.name = 'Temperature'
-        inletConcentrations = X_red
-        concentrations      = inletConcentrations
-        tic_sim = timer.time()
-        for temperature in T_list:
-            conc_T = []
-            #Re-initialize the gas
-            reactorTemperature = temperature #Kelvin
-            reactorVolume = 30.5*(1e-2)**3 #m3
-            gas_red.TPX = reactorTemperature,conditions.state_var.P,inletConcentrations
-            # Re-initialize the dataframe used to hold values
-            timeHistory = pd.DataFrame(columns=columnNames)
-            # Re-initialize all the reactors, reservoirs, etc
-            fuelAirMixtureTank = ct.Reservoir(gas_red)
-            exhaust = ct.Reservoir(gas_red)
-            # use concentrations from the previous iteration to speed up convergence
-            gas_red.TPX = reactorTemperature,conditions.state_var.P,concentrations
-
-            stirredReactor = ct.IdealGasReactor(gas_red, energy='off', volume=reactorVolume)
-            massFlowController = ct.MassFlowController(upstream=fuelAirMixtureTank,
-                                                       downstream=stirredReactor,
-                                                       mdot=stirredReactor.mass/residenceTime)
-            pressureRegulator  = ct.Valve(upstream=stirredReactor,
-                                         downstream=exhaust,
-                                         K=pressureValveCoefficient)
-            reactorNetwork     = ct.ReactorNet([stirredReactor])
-
-            # supress console output during the simulation
-            if verbose<9:
-                old_stdout = sys.stdout ; old_stderr = sys.stderr
-                with open(os.devnull, "w") as devnull:
-                    sys.stdout = devnull ; sys.stderr = devnull
-
-            try:
-                # Re-run the isothermal simulations
-                t = 0
-                simul_success = True
-                while t < maxSimulationTime:
-                    toc_sim = timer.time()
-                    if (toc_sim-tic_sim) > (100*conditions.simul_param.time_jsr_ref_lim):  # if calculation time becomes too long
-                        simul_success = False
-                        t = maxSimulationTime + 1
-                        if verbose >= 3:
-                            print("\n     WARNING: No solution found\n")
-                            print(str(toc_sim-tic_sim))
-                    else:
-                        t = reactorNetwork.step()
-
-                # restore console output
-                if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr
-            except:
-                simul_success = False
-                # restore console output
-                if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr
-                if verbose >= 3:
-                    print("\n     WARNING: No solution found\n",mp)
-
-            state = np.hstack([stirredReactor.thermo.P,
-                               stirredReactor.mass,
-                               stirredReactor.volume,
-                               stirredReactor.T,
-                               stirredReactor.thermo.X])
-            if simul_success:
-                concentrations = stirredReactor.thermo.X
-            # Store the result in the dataframe that indexes by temperature
-            tempDependence.loc[temperature] = state
-
-            # results
-            T.append(stirredReactor.T)
-            P.append(stirredReactor.thermo.P)
-            # saving spec concentrations
-            for sp in range(len(act_sp)):
-                if act_sp[sp] and simul_success:
-                    sp_ind=gas_red.species_index(gas_ref.species_name(sp))
-                    conc_T.append(stirredReactor.thermo.concentrations[sp_ind])
-                else:
-                    conc_T.append(0)
-            conc.append(conc_T)
-            # saving kf and kr values
-            kf_t=[];kr_t=[];r_red=0
-            for r in range(len(act_r)):
-                if act_r[r]:
-                        kf_t.append(gas_red.forward_rate_constants[r_red])
-                        kr_t.append(gas_red.reverse_rate_constants[r_red])
-                        r_red+=1
-                else:
-                    kf_t.append(0); kr_t.append(0)
-            kf.append(kf_t); kr.append(kr_t)
+        # reference mechanism indexing
+        if not kinetics: kf_red = False
+        conc, kf, kr = ref_indexing(maps, len(act_sp), len(act_r),\
+                                    conc_red, kf_red, kr_red, success)
 
         results = cdef.Sim_Results(conditions, gas_red, list(T_list), list(T), \
-                             list(P), list(conc), list(kf), list(kr))
+                             list(P), conc, kf, kr)
 
 
     elif 'PFR' in conditions.config:
@@ -1583,25 +1506,11 @@ def red_computation(conditions, gas_red, act_sp,act_r):
         # saving data at t=0
         T.append(r1.T)
         P.append(r1.thermo.P)
-        # conc
-        conc_t=[]
-        for sp in range(len(act_sp)):
-            if act_sp[sp]:
-                sp_ind=gas_red.species_index(gas_ref.species_name(sp))
-                conc_t.append(r1.thermo.concentrations[sp_ind])
-            else:
-                conc_t.append(0)
-        conc.append(conc_t)
-        # reaction rate coefficients
-        kf_t=[];kr_t=[];r_red=0
-        for r in range(len(act_r)):
-            if act_r[r]:
-                    kf_t.append(gas_red.forward_rate_constants[r_red])
-                    kr_t.append(gas_red.reverse_rate_constants[r_red])
-                    r_red+=1
-            else:
-                kf_t.append(0); kr_t.append(0)
-        kf.append(kf_t); kr.append(kr_t)
+        success = [True]
+        conc.append(r1.thermo.concentrations)
+        if kinetics:
+            kf.append(gas_red.forward_rate_constants)
+            kr.append(gas_red.reverse_rate_constants)
 
 
         for n1, t_i in enumerate(timeVec):
@@ -1633,25 +1542,11 @@ def red_computation(conditions, gas_red, act_sp,act_r):
             # save simulation data
             T.append(r1.T)
             P.append(r1.thermo.P)
-            #conc
-            conc_t=[]
-            for sp in range(len(act_sp)):
-                if act_sp[sp] and simul_success:
-                    sp_ind=gas_red.species_index(gas_ref.species_name(sp))
-                    conc_t.append(r1.thermo.concentrations[sp_ind])
-                else:
-                    conc_t.append(0)
-            conc.append(conc_t)
-            # reaction rate coefficients
-            kf_t=[];kr_t=[];r_red=0
-            for r in range(len(act_r)):
-                if act_r[r]:
-                        kf_t.append(gas_red.forward_rate_constants[r_red])
-                        kr_t.append(gas_red.reverse_rate_constants[r_red])
-                        r_red+=1
-                else:
-                    kf_t.append(0); kr_t.append(0)
-            kf.append(kf_t); kr.append(kr_t)
+            success.append(simul_success)
+            conc.append(r1.thermo.concentrations)
+            if kinetics:
+                kf.append(gas_red.forward_rate_constants)
+                kr.append(gas_red.reverse_rate_constants)
 
 
         tic_1 = timer.time()
@@ -1659,12 +1554,28 @@ def red_computation(conditions, gas_red, act_sp,act_r):
         z1      = np.insert(z1,0,0)
 
 
+        # reference mechanism indexing
+        if not kinetics: kf = False
+        conc, kf, kr = ref_indexing(maps, len(act_sp), len(act_r),\
+                                    conc, kf, kr, success)
+
         results = cdef.Sim_Results(conditions, gas_red, timeVec, list(T),\
-                             list(P), list(conc), list(kf), list(kr))
+                             list(P), conc, kf, kr)
         results.z1 = list(z1)
         conditions.simul_param.pts_scatter=np.array(timeVec)
 
 
+    if screening:
+        results.conditions = conditions_full
+        pts_scatter = conditions_full.simul_param.pts_scatter
+        if decimated:
+            # decimated simulation: results on the reference points
+            results.conc = points_interp(pts_scatter, results.pts_scatter, results.conc)
+            results.T    = list(points_interp(pts_scatter, results.pts_scatter, results.T))
+            if np.ndim(results.P) > 0:
+                results.P = list(points_interp(pts_scatter, results.pts_scatter, results.P))
+            results.pts_scatter = list(pts_scatter)
+
     return results
 
 
@@ -24,14 +24,95 @@ import time as timer
 import __packages.Class_def as cdef
 from  __packages.Class_def import print_
 import multiprocessing
+import heapq
+from scipy import sparse
 
 
 
 
+def reaction_rates(k_f,k_r,conc,nu_f,nu_r,react_activ):
+    """ rates of progress (fwd - rev) of the active reactions, in log space:
+        q = k * exp(sum_sp nu_sp,r * ln(1e3*conc_sp))                      """
+
+    react_activ = np.asarray(react_activ,dtype=bool)
+    c           = 1e3*np.asarray(conc,dtype=float)
+
+    # log(|c|) with zero / negative concentrations handled separately
+    c_zero = (c==0) ; c_neg = (c<0)
+    log_c  = np.log(np.where(c_zero,1.,np.abs(c)))
+
+    def rate(k,nu_x):
+        log_q  = nu_x.T.dot(log_c)
+        q      = np.asarray(k,dtype=float)*np.exp(log_q)
+        q[(nu_x!=0).T.dot(c_zero.astype(float))>0] = 0     # 0**nu = 0
+        n_neg  = nu_x.T.dot(c_neg.astype(float))            # (-c)**nu (integer nu)
+        q[n_neg%2==1] *= -1
+        return q
+
+    reactionRate = np.zeros(len(react_activ))
+    reactionRate[react_activ] = rate(k_f,nu_f)[react_activ] \
+                              - rate(k_r,nu_r)[react_activ]
+
+    return reactionRate
+
+
+
 def dic_par(dic_par_arg_i):
 
     dic_par_arg     = dic_par_arg_i[0]
 
+    k_f             = dic_par_arg_i[1]
+    k_r             = dic_par_arg_i[2]
+    conc            = dic_par_arg_i[3]
+    i               = dic_par_arg_i[4]
+    ns              = dic_par_arg[0]
+    nr              = dic_par_arg[1]
+    react_activ     = dic_par_arg[2]
+    spec_activ      = dic_par_arg[3]
+    nu              = dic_par_arg[4]
+    nu_f            = dic_par_arg[5]
+    nu_r            = dic_par_arg[6]
+    kronecker       = dic_par_arg[7]
+
+    # reaction rates computation
+    reactionRate = reaction_rates(k_f,k_r,conc,nu_f,nu_r,react_activ)
+
+    dic = dic_coeffs(nu,reactionRate,kronecker,spec_activ)
+
+    return (dic,i)
+
+
+
+def dic_coeffs(nu,reactionRate,kronecker,spec_activ):
+    """ r_AB = |sum_r nu_Ar rate_r delta_Br| / max(prod A, conso A)
+        nu and kronecker : dense arrays or scipy sparse matrices (ns x nr) """
+
+    if sparse.issparse(nu):
+        nu_rate = nu.multiply(reactionRate[None,:]).tocsr()
+        num     = nu_rate.dot(kronecker.T).toarray()
+        PA      = np.asarray(nu_rate.maximum(0).sum(axis=1)).ravel()
+        CA      = np.asarray((-nu_rate).maximum(0).sum(axis=1)).ravel()
+    else:
+        nu_rate = nu*reactionRate
+        num     = nu_rate.dot(kronecker.T)
+        PA      = np.sum(np.maximum(0, nu_rate),axis=1)
+        CA      = np.sum(np.maximum(0,-nu_rate),axis=1)
+    den     = np.maximum(PA,CA)
+
+    dic     = np.zeros(num.shape)
+    sp_ok   = np.asarray(spec_activ,dtype=bool) & (den!=0)
+    dic[sp_ok,:] = np.abs(num[sp_ok,:])/den[sp_ok,None]
+
+    return dic
+
+
+
+def dic_par_loop(dic_par_arg_i):
+    """ Former (loop based) computation of the direct interaction coefficients,
+        kept as reference for dic_par (see benchmark_DRG.py)                """
+
+    dic_par_arg     = dic_par_arg_i[0]
+
     k_f             = dic_par_arg_i[1]
     k_r             = dic_par_arg_i[2]
     conc            = dic_par_arg_i[3]
@@ -115,16 +196,12 @@ def dic(red_data,mech_data,results):
 
     ns = gas_ref.n_species                      # number of species
     nr = gas_ref.n_reactions                    # number of elementary reactions
-    # stoechiometric coefficients : direct, reverse, net
-    nu_f = gas_ref.reactant_stoich_coeffs()
-    nu_r = gas_ref.product_stoich_coeffs()
-    nu = nu_f - nu_r
+    # stoechiometric coefficients : direct, reverse, net (sparse)
+    nu_f = mech_data.topo.nu_f
+    nu_r = mech_data.topo.nu_r
+    nu   = mech_data.topo.nu
 
-    kronecker = np.zeros((ns,nr))
-    for r in range(nr):
-        for sp in range(ns):
-            if nu_f[sp,r]!=0 or nu_r[sp,r]!=0:
-                kronecker[sp,r] = 1
+    kronecker = mech_data.topo.incid.astype(float)
 
 
     if gas_red.n_species > 25 :
@@ -173,6 +250,7 @@ def dic(red_data,mech_data,results):
 
 
     red_data.red_op.interaction_coeffs = list(interactionCoefficients)
+    red_data.red_op.OIC_table = {}      # reset of the precomputed OIC
 
     del interactionCoefficients
 
@@ -200,9 +278,16 @@ def ric(red_data, mech_data, red_results):
     tsp_idx   = red_data.targetSpeciesIdx
     n_tsp     = len(tsp_idx)
 
-    nu_f = gas_ref.reactant_stoich_coeffs()
-    nu_r = gas_ref.product_stoich_coeffs()
-    nu = nu_f - nu_r
+    # active species / reactions (all of them for the 1st reduction)
+    if True in mech_data.react.activ_p: r_activ = list(mech_data.react.activ_p)
+    else:                               r_activ = [True]*n_r_ref
+    if True in mech_data.spec.activ_p:  sp_activ = np.array(mech_data.spec.activ_p,dtype=float)
+    else:                               sp_activ = np.ones(n_sp_ref)
+
+    # stoechiometric coefficients of the active species (sparse)
+    nu_f = sparse.diags(sp_activ).dot(mech_data.topo.nu_f)
+    nu_r = sparse.diags(sp_activ).dot(mech_data.topo.nu_r)
+    nu   = mech_data.topo.nu
 
     r_interCoeff =  np.zeros((n_tsp,n_r_ref))
 
@@ -215,44 +300,18 @@ def ric(red_data, mech_data, red_results):
     bar.update(0)
     for i in range(n_points):
         if i%max(div_DRG_points,1)==0:
-            k_f = red_results.kf[i]
-            k_r = red_results.kr[i]
             # reaction rates computation
-            reactionRate = np.zeros(n_r_ref)
-            fRate = np.ones(n_r_ref)
-            rRate = np.ones(n_r_ref)
-            # Reaction rate calculation
-            r_red=-1
-            for r in range(n_r_ref):
-                if mech_data.react.activ_p[r]\
-                or True not in mech_data.react.activ_p: # (1st reduction)
-                    r_red+=1
-                    for spA in range(n_sp_ref):
-                        if mech_data.spec.activ_p[spA] \
-                        or True not in mech_data.spec.activ_p:
-                            if nu_f[spA, r]!=0 or nu_r[spA, r]!=0:
-                                fRate[r]*=(1e3*red_results.conc[i][spA])**nu_f[spA, r]
-                                rRate[r]*=(1e3*red_results.conc[i][spA])**nu_r[spA, r]
-                    fRate[r] *= k_f[r]
-                    rRate[r] *= k_r[r]
-                    reactionRate[r] = fRate[r] - rRate[r]
+            reactionRate = reaction_rates(red_results.kf[i],red_results.kr[i],\
+                                          red_results.conc[i],nu_f,nu_r,r_activ)
 
             # Computation of Direct Interaction Coefficients at time n
             for t_sp in range(n_tsp):
-                PA = 0
-                CA = 0
-                for r in range(n_r_ref):
-                    if mech_data.react.activ_p[r]\
-                    or True not in mech_data.react.activ_p: # (1st reduction)
-                        PA += max(0, nu[t_sp, r]*reactionRate[r])
-                        CA += max(0, -nu[t_sp, r]*reactionRate[r])
+                nu_rate = nu[t_sp,:].toarray().ravel()*reactionRate
+                PA  = np.sum(np.maximum(0, nu_rate))
+                CA  = np.sum(np.maximum(0,-nu_rate))
                 den = max(PA, CA)
-                for r in range(n_r_ref):
-                    if mech_data.react.activ_p[r]\
-                    or True not in mech_data.react.activ_p: # (1st reduction)
-                        num = abs(nu[t_sp, r]*reactionRate[r])
-                        if den > 0:
-                            r_interCoeff[t_sp,r]=max(num/den,r_interCoeff[t_sp,r])
+                if den > 0:
+                    r_interCoeff[t_sp] = np.maximum(np.abs(nu_rate)/den,r_interCoeff[t_sp])
         bar.update(i)
 
     bar.update(n_points);print_("\n",mp)
@@ -266,6 +325,76 @@ def ric(red_data, mech_data, red_results):
 
 
 
+def ic_graph(IC_p,eps_min=0):
+    """ sparse adjacency (csr) of the interaction coefficients graph at one
+        sampling point. Edges with r_AB <= eps_min cannot belong to a kept
+        path (r_AB <= 1) and are not stored                                """
+
+    IC_p = np.array(IC_p,dtype=float)
+    IC_p[IC_p<=eps_min] = 0
+    np.fill_diagonal(IC_p,0)
+
+    return sparse.csr_matrix(IC_p)
+
+
+
+def graph_max_path(adj,source,eps=0,path_op='product'):
+    """ Dijkstra (heap based) search of the overall interaction coefficients
+        R_B = max over the paths source->B of :
+            prod(r_ij) (path_op='product', DRGEP)
+            min(r_ij)  (path_op='min',     DRG: reachability with r_ij > eps)
+        Paths with R <= eps are not explored.                              """
+
+    R = np.zeros(adj.shape[0])
+    R[source] = 1.
+    indptr = adj.indptr ; indices = adj.indices ; data = adj.data
+
+    mpq = [(-1.,source)]                        # max-priority queue
+    while mpq:
+        R_node, node = heapq.heappop(mpq)
+        R_node = -R_node
+        if R_node < R[node]: continue           # outdated queue entry
+        for k in range(indptr[node],indptr[node+1]):
+            spB = indices[k]
+            if path_op=='product': R_B = R_node*data[k]
+            else:                  R_B = min(R_node,data[k])
+            if R_B > R[spB] and R_B > eps:
+                R[spB] = R_B
+                heapq.heappush(mpq,(-R_B,spB))
+
+    return R
+
+
+
+def oic_table(red_data,path_op='product'):
+    """ Overall interaction coefficients of all the species for each target
+        species (max over the sampling points), computed once per case with
+        eps = 0 and stored in red_op.OIC_table[path_op].
+        As r_AB <= 1, the paths with R > eps only go through the nodes with
+        R > eps : R_max > eps <=> the species is kept by the eps search.
+        Each eps step is then a threshold of this table.
+        returns [OIC_sp (direct coefficients), R (overall coefficients)]   """
+
+    if path_op not in red_data.red_op.OIC_table:
+        IC = red_data.red_op.interaction_coeffs
+        target_species = red_data.targetSpeciesIdx
+        ns = len(IC[0][1,:])
+
+        OIC_sp = np.zeros((len(target_species),ns))
+        R_tab  = np.zeros((len(target_species),ns))
+        for p in range(len(IC)):
+            adj = ic_graph(IC[p])
+            for tsp in range(len(target_species)):
+                tsp_idx = target_species[tsp]
+                OIC_sp[tsp] = np.maximum(OIC_sp[tsp],IC[p][tsp_idx,:])
+                R_tab[tsp]  = np.maximum(R_tab[tsp],\
+                                         graph_max_path(adj,tsp_idx,0,path_op))
+        red_data.red_op.OIC_table[path_op] = [OIC_sp, R_tab]
+
+    return red_data.red_op.OIC_table[path_op]
+
+
+
 def graphSearch(conditions,red_data,mech_data,eps):
 
     # main variables
@@ -340,55 +469,24 @@ def graphSearch(conditions,red_data,mech_data,eps):
 
     elif red_data.red_op.graph_search == 'Dijkstra':
 
-        # Dijkstra algorithm
-        OIC_sp = np.zeros((len(target_species),ns))
-
-        for tsp in range(len(target_species)):
-            tsp_idx = target_species[tsp]
+        # Dijkstra algorithm (max-min path : species connected to the
+        # targets through interaction coefficients > eps)
+        if red_data.red_op.precomp_OIC:
+            # threshold of the precomputed OIC table
+            OIC_sp, R_tab = oic_table(red_data,'min')
+            for tsp in range(len(target_species)):
+                for sp in np.nonzero(R_tab[tsp]>eps[tsp])[0]:
+                    active_species[sp] = True
+        else:
+            OIC_sp = np.zeros((len(target_species),ns))
             for p in range(points):
-                mpq_list = []
-
-                # max-priority queue (mpq) construction
-                OIC = []
-                for spA in range(ns):
-                    OIC.append(IC[p][tsp_idx, spA])
-                    if IC[p][tsp_idx, spA]>OIC_sp[tsp][spA]:
-                        OIC_sp[tsp][spA]=IC[p][tsp_idx, spA]
-                    if OIC[spA] > eps[tsp]:
-                        mpq_list.append(spA)
-
-                for mpq in range(len(mpq_list)):
-                    mpq_idx = mpq_list[mpq]
-                    R_max=[] ; visited_sp=[]
-                    for sp in range(ns):
-                        R_max.append(IC[p][mpq_idx,sp])
-                        visited_sp.append([tsp,sp])
-                        if OIC[mpq]*IC[p][mpq_idx,sp] > eps[tsp]:
-                            active_species[sp] = True
-                    R_max[tsp]=0 ; R_max[mpq]=0
-
-
-                    # graph search
-                    idx_node = R_max.index(max(R_max))
-                    while max(R_max)>eps[tsp]:
-                        # node informations
-                        visited_sp_node = visited_sp[idx_node]
-                        # interaction coefficients of the step
-                        Ri = []
-                        for sp in range(ns):
-                            if sp not in visited_sp_node:
-                                Ri.append(IC[p][idx_node,sp])
-                                if Ri[-1]>eps[tsp]:
-                                    active_species[sp] = True
-                            else:
-                                Ri.append(0)
-                        # record informations on the present step of graph analysis
-                        R_max[idx_node]=max(Ri)
-                        visited_sp[idx_node].append(Ri.index(max(Ri)))
-                        if max(Ri)>max(R_max):
-                            idx_node = Ri.index(max(Ri))
-                        else:
-                            idx_node = R_max.index(max(R_max))
+                adj = ic_graph(IC[p],np.min(eps))
+                for tsp in range(len(target_species)):
+                    tsp_idx = target_species[tsp]
+                    OIC_sp[tsp] = np.maximum(OIC_sp[tsp],IC[p][tsp_idx,:])
+                    R = graph_max_path(adj,tsp_idx,eps[tsp],'min')
+                    for sp in np.nonzero(R>eps[tsp])[0]:
+                        active_species[sp] = True
 
 
     timeDRG_2 = timer.time()
@@ -449,58 +547,23 @@ def graphSearch_DRGEP(conditions,red_data,mech_data,eps):
             if not active_species[ind_spec]: active_species[ind_spec]=True
 
 
-    # Dijkstra algorithm
-    OIC_sp = np.zeros((len(target_species),ns))
-    for tsp in range(len(target_species)):
-        tsp_idx = target_species[tsp]
+    # Dijkstra algorithm (max-product path)
+    if red_data.red_op.precomp_OIC:
+        # threshold of the precomputed OIC table
+        OIC_sp, R_tab = oic_table(red_data,'product')
+        for tsp in range(len(target_species)):
+            for sp in np.nonzero(R_tab[tsp]>eps[tsp])[0]:
+                active_species[sp] = True
+    else:
+        OIC_sp = np.zeros((len(target_species),ns))
         for p in range(points):
-            mpq_list = []
-
-            # max-priority queue (mpq) construction
-            OIC = []
-            for spA in range(ns):
-                OIC.append(IC[p][tsp_idx, spA])
-                if IC[p][tsp_idx, spA]>OIC_sp[tsp][spA]:
-                    OIC_sp[tsp][spA]=IC[p][tsp_idx, spA]
-                if OIC[spA] > eps[tsp]:
-                    mpq_list.append(spA)
-
-
-            for mpq in range(len(mpq_list)):
-                mpq_idx = mpq_list[mpq]
-#                R = np.array((ns,ns))
-                R_max=[] ; visited_sp=[]
-                for sp in range(ns):
-                    R_max.append(OIC[mpq]*IC[p][mpq_idx,sp])
-                    visited_sp.append([tsp,sp])
-                    if OIC[mpq]*IC[p][mpq_idx,sp] > eps[tsp]:
-                        active_species[sp] = True
-                R_max[tsp]=0 ; R_max[mpq]=0
-
-
-                # graph search
-                idx_node = R_max.index(max(R_max))
-                while max(R_max)>eps[tsp]:
-                    # node informations
-                    visited_sp_node = visited_sp[idx_node]
-
-                    # interaction coefficients of the step
-                    Ri = []
-                    for sp in range(ns):
-                        if sp not in visited_sp_node:
-                            Ri.append(R_max[idx_node]*IC[p][idx_node,sp])
-                            if Ri[-1]>eps[tsp]:
-                                active_species[sp] = True
-                        else:
-                            Ri.append(0)
-
-                    # record informations on the present step of graph analysis
-                    R_max[idx_node]=max(Ri)
-                    visited_sp[idx_node].append(Ri.index(max(Ri)))
-                    if max(Ri)>max(R_max):
-                        idx_node = Ri.index(max(Ri))
-                    else:
-                        idx_node = R_max.index(max(R_max))
+            adj = ic_graph(IC[p],np.min(eps))
+            for tsp in range(len(target_species)):
+                tsp_idx = target_species[tsp]
+                OIC_sp[tsp] = np.maximum(OIC_sp[tsp],IC[p][tsp_idx,:])
+                R = graph_max_path(adj,tsp_idx,eps[tsp],'product')
+                for sp in np.nonzero(R>eps[tsp])[0]:
+                    active_species[sp] = True
 
     timeDRG_2 = timer.time()
     #  Display options
@@ -536,9 +599,7 @@ def reactionWithdrawal(mech_data,red_data,red_method,eps_r,conditions,active_spe
     n_sp_ref  = gas_ref.n_species
     n_r_ref   = gas_ref.n_reactions
 
-    nu_f =gas_ref.reactant_stoich_coeffs()
-    nu_r =gas_ref.product_stoich_coeffs()
-#    nu = nu_f-nu_r
+    topo = mech_data.topo
 
     if verbose >=8 :
         print(  "  reactions removal ...")
@@ -562,17 +623,10 @@ def reactionWithdrawal(mech_data,red_data,red_method,eps_r,conditions,active_spe
 
     # define new activated species / reactions based on species sensitivities
     if '_sp' in red_method:
-        active_reactions = [True]*len(mech_data.react.activ_p)
-        for r in range(n_r_ref):
-            if not mech_data.react.activ_m[r]:
-                active_reactions[r] = False
-            else:
-                for sp in range(n_sp_ref):
-                    # remove reactions involving non active species
-                    if not active_species[sp]:
-                        if nu_f[sp][r]!=0 or nu_r[sp][r]!=0:
-                            active_reactions[r] = False
-                            break
+        # remove reactions involving non active species
+        r_removed = topo.reactions_involving(np.logical_not(active_species))
+        active_reactions = [bool(mech_data.react.activ_m[r] and not r_removed[r])\
+                            for r in range(n_r_ref)]
 
 
     # define new activated species / reactions based on reaction interaction coeffs
@@ -612,14 +666,12 @@ def reactionWithdrawal(mech_data,red_data,red_method,eps_r,conditions,active_spe
                     else:
                         if r_inter_coeffs[t][r]>lim_val and not active_reactions[r]:
                             active_reactions[r]=True
+        # keep species involved in active reactions
+        sp_involved = topo.species_involved(active_reactions)
         for sp in range(n_sp_ref):
-            if not active_species[sp]:
-                if mech_data.spec.activ_m[sp]:
-                    for r in range(n_r_ref):
-                        if active_reactions[r]:
-                            if nu_f[sp][r]!=0 or nu_r[sp][r]!=0:
-                                active_species[sp]=True
-                                break
+            if not active_species[sp] and mech_data.spec.activ_m[sp] \
+            and sp_involved[sp]:
+                active_species[sp]=True
 
     # check threebody exception (+AR) (+HE) etc.
     for r in range(len(mech_data.react.formula)):
@@ -33,11 +33,18 @@ import __packages.GeneticAlgorithm as ga
 import gc
 import copy
 import datetime
+import hashlib
+import pickle
+import shutil
+import multiprocessing
 import __packages.Class_def as cdef
 from  __packages.Class_def import print_
 import cantera as ct
 from scipy.interpolate import interp1d
 
+_ref_worker = {}    # mechanism loaded once per reference worker
+_red_worker = {}    # mechanisms loaded once per validation worker
+
 
 
 #==============================================================================
@@ -61,9 +68,371 @@ def computation_reference(conditions, verbose=1):
             print_('phi = '+str(conditions.composition.phi),mp)
         print_('============================ \n\n',mp)
 
+    cache_key = ref_cache_key(conditions)
+    results   = load_ref_cache(conditions,cache_key)
+    if results:
+        if verbose >=1: print_('Reference results loaded from cache ('+cache_key[:12]+')',mp)
+    else:
         results,conditions = comp.ref_computation(conditions,verbose)
+        save_ref_cache(results,conditions,cache_key)
+
+    return results,conditions
+
+
+def computation_references(conditions_list, verbose=1):
+    """ reference computation of all the cases in a pool of processes
+        (one task per case, results returned in the cases order)       """
+
+    mp      = conditions_list[0].main_path
+    n_cases = len(conditions_list)
+
+    # cached cases are loaded by the main process
+    ref_results_list = [False]*n_cases ; cases = []
+    for i in range(n_cases):
+        ref_results_list[i] = load_ref_cache(conditions_list[i],\
+                                             ref_cache_key(conditions_list[i]))
+        if not ref_results_list[i]: cases.append(i)
+    if verbose >=1 and len(cases)<n_cases:
+        print_(str(n_cases-len(cases))+' reference case(s) loaded from cache',mp)
+    if len(cases) == 1:
+        i = cases[0]
+        ref_results_list[i],conditions_list[i] = computation_reference(conditions_list[i],verbose)
+    if len(cases) <= 1:
+        return conditions_list, ref_results_list
+
+    # saving and suppression of unpickable variables on workers inputs
+    gas     = [cond.composition.gas     for cond in conditions_list]
+    gas_ref = [cond.composition.gas_ref for cond in conditions_list]
+    for i in cases:
+        del conditions_list[i].composition.gas
+        del conditions_list[i].composition.gas_ref
+
+    num_cores = min(multiprocessing.cpu_count(),len(cases))
+    with multiprocessing.Pool(num_cores,initializer=init_ref_worker,\
+                              initargs=(conditions_list[0].mech,mp)) as pool:
+        outputs = pool.map(ref_worker,[(conditions_list[i],verbose) for i in cases])
+
+    errors = []
+    for i,output in zip(cases,outputs):
+        conditions, results, snapshots, error = output
+        if error:
+            conditions = conditions_list[i]
+            errors.append('   case '+str(i+1)+' ('+conditions.config+'): '+error)
+        conditions.composition.gas     = gas[i]
+        conditions.composition.gas_ref = gas_ref[i]
+        conditions_list[i] = conditions
+        if error: continue
+        results.gas = gas_ref[i]
+        comp._flame_snapshots.update(snapshots)
+        if 'flame' in conditions.config: results.f = comp.ref_flame(conditions)
+        ref_results_list[i] = results
+
+    if errors:
+        print_('\nReference computation failed for '+str(len(errors))+' case(s):',mp)
+        for error in errors: print_(error,mp)
+        raise Exception('reference computation failed')
+
+    return conditions_list, ref_results_list
+
+
+def init_ref_worker(mech,main_path):
+
+    os.chdir(main_path)
+
+    # supress console output during the interpretation
+    old_stdout = sys.stdout ; old_stderr = sys.stderr
+    with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
+    _ref_worker['gas'] = ct.Solution(mech)
+    # restore console output
+    sys.stdout = old_stdout ; sys.stderr = old_stderr
+
+
+def ref_worker(task):
+
+    conditions, verbose = task
+    conditions.composition.gas     = _ref_worker['gas']
+    conditions.composition.gas_ref = _ref_worker['gas']
+
+    try:
+        results,conditions = computation_reference(conditions,verbose)
+        error = False
+    except Exception as e:
+        results = False ; error = str(e)
+    os.chdir(conditions.main_path)
+
+    # flame solutions, sent back to the main process
+    snapshots = {}
+    if results and 'flame' in conditions.config:
+        fn = comp.flame_key(conditions)
+        for key in [fn,'Kref_'+fn]:
+            if key in comp._flame_snapshots:
+                snapshots[key] = comp._flame_snapshots[key]
+
+    # suppression of unpickable variables
+    del conditions.composition.gas
+    del conditions.composition.gas_ref
+    if results:
+        del results.gas
+        results.f = False
+
+    return conditions, results, snapshots, error
+
+
+def candidate_evaluation(conditions,ref_results,red_data,gas_red,act_sp,act_r):
+    """ errors of a candidate mechanism. If error_param.screening, the
+        candidate is first simulated at low fidelity, and only evaluated
+        at full fidelity if its screened errors are near or below the
+        tolerances (screening_margin)                                     """
+
+    if conditions.error_param.screening:
+        red_results = comp.red_computation(conditions,gas_red,act_sp,act_r,\
+                                           kinetics=False,screening=True)
+        errors = cdef.Errors(conditions,ref_results,red_results,\
+                             red_data,red_data.red_op)
+        if not errors.near_tol(conditions,red_data.red_op):
+            if conditions.simul_param.verbose > 5:
+                print_("     Candidate rejected at the screening stage",conditions.main_path)
+            return red_results, errors
+
+    # lean evaluation: kf / kr not needed by Errors
+    red_results = comp.red_computation(conditions,gas_red,act_sp,act_r,kinetics=False)
+    errors = cdef.Errors(conditions,ref_results,red_results,\
+                         red_data,red_data.red_op)
+
+    return red_results, errors
+
+
+def computation_validation(conditions_list,mech_data):
+    """ reduced mechanism computation of all the cases (validation of an
+        operator) in a pool of processes, results returned in the cases order """
+
+    mp      = conditions_list[0].main_path
+    n_cases = len(conditions_list)
+    act_sp  = mech_data.spec.activ_p ; act_r = mech_data.react.activ_p
+
+    if n_cases == 1:
+        gas_red = mech_data.new_solution()
+        return [comp.red_computation(conditions_list[0],gas_red,act_sp,act_r)]
+
+    # reference flame solutions used by the workers to initialize the flames
+    snapshots = {}
+    for conditions in conditions_list:
+        if 'flame' in conditions.config:
+            fn = comp.flame_key(conditions)
+            for key in [fn,'Kref_'+fn]:
+                if key in comp._flame_snapshots or \
+                   os.path.isfile(os.path.join(mp,'Flame_ref_results',key+'.snp')):
+                    snapshots[key] = comp.load_flame(key,conditions)
+
+    # saving and suppression of unpickable variables on workers inputs
+    gas     = [cond.composition.gas     for cond in conditions_list]
+    gas_ref = [cond.composition.gas_ref for cond in conditions_list]
+    for cond in conditions_list:
+        del cond.composition.gas
+        del cond.composition.gas_ref
+
+    num_cores = min(multiprocessing.cpu_count(),n_cases)
+    try:
+        with multiprocessing.Pool(num_cores,initializer=init_red_worker,\
+                 initargs=(conditions_list,mech_data,snapshots)) as pool:
+            outputs = pool.map(red_worker,range(n_cases))
+    finally:
+        for i in range(n_cases):
+            conditions_list[i].composition.gas     = gas[i]
+            conditions_list[i].composition.gas_ref = gas_ref[i]
+
+    # reduced mechanism built once, shared by the results of all the cases
+    gas_red = mech_data.new_solution()
+    red_results_list = [] ; errors = []
+    for i,output in enumerate(outputs):
+        conditions = conditions_list[i]
+        results, snapshot, error = output
+        if error:
+            errors.append('   case '+str(i+1)+' ('+conditions.config+'): '+error)
+            continue
+        results.conditions = conditions
+        results.gas        = gas_red
+        if snapshot:
+            key = 'red_'+comp.flame_key(conditions)
+            comp._flame_snapshots[key] = snapshot
+            results.f = comp.ref_flame(conditions,results.gas,key)
+        red_results_list.append(results)
+
+    if errors:
+        print_('\nReduced mechanism computation failed for '+str(len(errors))+' case(s):',mp)
+        for error in errors: print_(error,mp)
+        raise Exception('reduced mechanism computation failed')
+
+    return red_results_list
+
+
+def init_red_worker(conditions_list,mech_data,snapshots):
+
+    os.chdir(conditions_list[0].main_path)
+
+    # supress console output during the interpretation
+    old_stdout = sys.stdout ; old_stderr = sys.stderr
+    with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
+    gas     = ct.Solution(conditions_list[0].mech)
+    # restore console output
+    sys.stdout = old_stdout ; sys.stderr = old_stderr
+    gas_red = mech_data.new_solution()
+
+    for conditions in conditions_list:
+        conditions.composition.gas     = gas
+        conditions.composition.gas_ref = gas
+    comp._flame_snapshots.update(snapshots)
+
+    _red_worker['conditions_list'] = conditions_list
+    _red_worker['mech_data']       = mech_data
+    _red_worker['gas_red']         = gas_red
+
+
+def red_worker(i):
+
+    conditions = _red_worker['conditions_list'][i]
+    mech_data  = _red_worker['mech_data']
 
-        return results,conditions
+    try:
+        results = comp.red_computation(conditions,_red_worker['gas_red'],\
+                                mech_data.spec.activ_p,mech_data.react.activ_p)
+        error = False
+    except Exception as e:
+        results = False ; error = str(e)
+    os.chdir(conditions.main_path)
+
+    # reduced flame solution, sent back to the main process
+    snapshot = False
+    if results and 'flame' in conditions.config:
+        snapshot = comp.Flame_snapshot(results.f)
+
+    # suppression of unpickable variables
+    if results:
+        del results.gas
+        del results.conditions
+        results.f = False
+
+    return results, snapshot, error
+
+
+def ref_cache_key(conditions):
+    """ hash of the mechanism file, of the case parameters and of the
+        cantera version (False if the cache is not used)                """
+
+    if not conditions.simul_param.ref_cache: return False
+
+    mech_file = False
+    for fn in [os.path.join(conditions.main_path,conditions.mech.split('/')[-1]),\
+               conditions.mech, os.path.join('_kinetic_mech',conditions.mech)]:
+        if os.path.isfile(fn): mech_file = fn ; break
+    if not mech_file: return False
+
+    key = hashlib.sha1()
+    with open(mech_file,'rb') as mech_f: key.update(mech_f.read())
+    txt  = 'cantera='+ct.__version__+';config='+conditions.config
+    txt += ';exp_data='+str(conditions.exp_data)+';conc_unit='+conditions.conc_unit
+    txt += ';K_check='+str(conditions.error_param.K_check)
+    txt += ';strain_accuracy='+repr(conditions.error_param.strain_accuracy)
+    txt += cache_txt(conditions.composition,_cache_composition)
+    txt += cache_txt(conditions.state_var,_cache_state_var)
+    txt += cache_txt(conditions.simul_param,_cache_simul_param)
+    key.update(txt.encode())
+
+    return key.hexdigest()
+
+
+# parameters of the reference results (cache key). Explicit lists: the
+# runtime options (verbose, workers, cache, checkpoints...) are not hashed
+_cache_composition = ['fuel','oxidant','diluent','phi','diluent_ratio','mixt','X',\
+                      'fuel2','oxidant2','diluent2','phi2','diluent_ratio2','mixt2','X2']
+_cache_state_var   = ['T','P','T2']
+_cache_simul_param = ['pts_scatter','pts_scatter_i','end_sim','tol_ss','tol_ts',\
+                      'rtol_ss','atol_ss','rtol_ts','atol_ts','n_pts','t_max_coeff',\
+                      't_max_react','Scal_ref','grad_curv_ratio','mdot','mdot2',\
+                      'transport_model','slope_ff','curve_ff','ratio_ff','prune_ff',\
+                      'T_lim','u_0','area','T_profile','P2','phi2','shift']
+
+def cache_txt(obj,names):
+    txt = ''
+    for name in names:
+        if not hasattr(obj,name): continue
+        val = getattr(obj,name)
+        if isinstance(val,np.ndarray): val = val.tolist()
+        txt += ';'+name+'='+repr(val)
+    return txt
+
+
+def save_ref_cache(results,conditions,cache_key):
+    """ reference results stored as .npy arrays (+ info.pkl) in
+        ref_cache/cache_key                                        """
+
+    if not cache_key: return
+    folder = os.path.join(conditions.simul_param.ref_cache,cache_key)
+    if os.path.isdir(folder): return
+    tmp = folder+'_'+str(os.getpid())
+    os.makedirs(tmp)
+
+    info = {'config':conditions.config, 'P_list':isinstance(results.P,(list,np.ndarray)),\
+            'simul_param':{}, 'results':{}, 'flames':{}}
+    for name in ['pts_scatter','T','P','conc','kf','kr']:
+        data = getattr(results,name)
+        if data is not False:
+            np.save(os.path.join(tmp,name+'.npy'),np.asarray(data,dtype=np.float64))
+    for name in vars(results):
+        if name not in ['conditions','gas','f','res_fname','pts_scatter','T','P',\
+                        '_conc','_X','_kf','_kr']:
+            info['results'][name] = getattr(results,name)
+    # conditions modified by the reference computation
+    for name in ['pts_scatter','time_jsr_ref_lim','K_bracket_ref']:
+        if hasattr(conditions.simul_param,name):
+            info['simul_param'][name] = getattr(conditions.simul_param,name)
+    # flame solutions (warm start of the reduced flames)
+    if 'flame' in conditions.config:
+        fn = comp.flame_key(conditions)
+        for pre in ['','Kref_']:
+            if pre+fn in comp._flame_snapshots:
+                info['flames'][pre] = comp._flame_snapshots[pre+fn]
+
+    with open(os.path.join(tmp,'info.pkl'),'wb') as info_f:
+        pickle.dump(info,info_f,pickle.HIGHEST_PROTOCOL)
+    try:    os.rename(tmp,folder)
+    except: shutil.rmtree(tmp)     # already stored by another process
+
+
+def load_ref_cache(conditions,cache_key):
+    """ cached reference results (arrays mapped read-only), False if
+        not available                                                 """
+
+    if not cache_key: return False
+    folder = os.path.join(conditions.simul_param.ref_cache,cache_key)
+    if not os.path.isfile(os.path.join(folder,'info.pkl')): return False
+    with open(os.path.join(folder,'info.pkl'),'rb') as info_f:
+        info = pickle.load(info_f)
+
+    data = {}
+    for name in ['pts_scatter','T','P','conc','kf','kr']:
+        fn = os.path.join(folder,name+'.npy')
+        if os.path.isfile(fn): data[name] = np.load(fn,mmap_mode='r')
+        else:                  data[name] = False
+    if info['P_list']: P = data['P'].tolist()
+    else:              P = float(data['P'])
+
+    conditions.config = info['config']
+    for name in info['simul_param']:
+        setattr(conditions.simul_param,name,info['simul_param'][name])
+    results = cdef.Sim_Results(conditions,conditions.composition.gas,\
+                               np.array(data['pts_scatter']),data['T'].tolist(),P,\
+                               data['conc'],data['kf'],data['kr'])
+    for name in info['results']:
+        setattr(results,name,info['results'][name])
+    if 'flame' in conditions.config:
+        fn = comp.flame_key(conditions)
+        for pre in info['flames']:
+            comp._flame_snapshots[pre+fn] = info['flames'][pre]
+            if conditions.simul_param.flame_spill: comp.spill_flame(pre+fn,conditions)
+        results.f = comp.ref_flame(conditions)
+
+    return results
 
 
 def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
@@ -80,9 +449,27 @@ def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
 
     red_errors_list = []
 
+    # progress of the reduction (restart of a killed run)
+    checkpoint = conditions_list[0].simul_param.checkpoint
+    ckpt_file  = os.path.join(mp,'red_checkpoint.pkl')
+    ckpt       = False
+    eps_cases  = {}       # final eps of the reduced cases
+    if conditions_list[0].simul_param.resume:
+        ckpt = cdef.read_checkpoint(ckpt_file)
+        if ckpt:
+            # masks and kinetics of the completed operators (also returned
+            # if all the operators were completed before the restart)
+            load_red_checkpoint(ckpt,mech_data)
+            eps_cases = ckpt['eps']
+            txt = '\n\nRun resumed at operator '+str(ckpt['op']+1)+', case '+str(ckpt['case']+1)
+            if ckpt['loop']: txt += ', step '+str(ckpt['loop']['try_n'])
+            print_(txt,mp)
+
 
     for op in range(len(red_data_list)):
 
+        if ckpt and op < ckpt['op']: continue      # operator completed before the restart
+
         red_results_list[0].write_mech_info(op)
         red_data_list[op][0].op = op
 
@@ -122,6 +509,10 @@ def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
         tspc       = red_data_list[op][0].tspc
         mech_data.spec.activ_p  = [False]*len(mech_data.spec.name)
         mech_data.react.activ_p = [False]*len(mech_data.react.number)
+        case_start = 0
+        if ckpt and op == ckpt['op']:
+            case_start = ckpt['case']
+            load_red_checkpoint(ckpt,mech_data)
 
 
         if red_method != 'NULL':
@@ -150,6 +541,10 @@ def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
                 cross_red_error = False    # interactions between species reduction
                 stop_reduction=False
 
+                # case reduced before the restart (coefficients still
+                # computed if used by the optimization)
+                if i < case_start and not red_data.optim: continue
+
                 if verbose >=1:
                     print_('\n\n============================ ',mp)
                     print_('Configuration: '+conditions.config,mp)
@@ -181,6 +576,8 @@ def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
                     if red_data.optim:
                         red_data.optim_param.target_r.append(red_data.red_op.sensi_r)
 
+                if i < case_start: continue
+
                 # eps definition
                 eps_init   = copy.deepcopy(red_data.red_op.eps_init)
                 delta_eps      = copy.deepcopy(red_data.red_op.delta_eps_init)
@@ -253,6 +650,24 @@ def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
                 eps_cre  = [False]*n_tspecies   # stop reduction if cross reduction errors
                 eps_prev = list(eps)
 
+                if i == case_start and ckpt and ckpt['loop']:
+                    # interrupted case: eps loop state of the last completed
+                    # step, errors of the last evaluated mech computed again
+                    loop_state = ckpt['loop']
+                    try_acc,try_n,sp_try,sp_inter,T_try,ig_try,Sl_try,K_try,\
+                    active_sp_pm,active_r_pm,cross_red_error,stop_reduction,eps,\
+                    delta_eps,act_sp_prev,act_r_prev,sp_prev,r_prev,\
+                    First_try_T_error,First_try_Sl_error,First_try_ig_error,\
+                    First_try_K_error,First_try_sp_error,one_simul_success,T_error,\
+                    Sl_error,ig_error,K_error,sp_error,stop_T_red,stop_Sl_red,\
+                    stop_ig_red,stop_K_red,eps_stop,eps_cre,eps_prev,eps_evol,\
+                    first_try,best_ICsp,idx \
+                    = [loop_state[name] for name in _red_loop_state]
+                    red_data.red_op.gas = mech_data.new_solution(sp_prev,r_prev)
+                    red_results_loop, errors = candidate_evaluation(\
+                                conditions, ref_results, red_data,\
+                                red_data.red_op.gas, sp_prev, r_prev)
+
                 while not stop_reduction:
                     print_('\nStep:'+str(try_n)+' ('+red_method+')',mp); try_n+=1
                     sp_try[:] += 1
@@ -286,29 +701,12 @@ def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
                             print_("  "+str(active_sp_pm.count(True))+\
                                   " species, "+ str(active_r_pm.count(True))+\
                                   " reactions remaining",mp)
-                        mech_data.write_new_mech("temp.cti",active_sp_pm,active_r_pm)
-                        # --------------------------------------------------------------------------------
-                        # interpretation of the new mech
-                        if verbose<8:
-                        # supress console output during the simulation
-                            old_stdout = sys.stdout ; old_stderr = sys.stderr
-                            with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
-
-                        red_data.red_op.gas = ct.Solution('temp.cti')
-
-                        if verbose<8:
-                        # restore console output
-                            sys.stdout = old_stdout ; sys.stderr = old_stderr
-                        # --------------------------------------------------------------------------------
-
-                        red_results_loop = comp.red_computation(\
-                                    conditions, red_data.red_op.gas,\
-                                    active_sp_pm,active_r_pm)
-                        errors = cdef.Errors(conditions,ref_results,\
-                                      red_results_loop,red_data,red_data.red_op)
-                        # error calculation
-                        if errors.under_tol:
-                            os.system('cp temp.cti previous_mech.cti')
+                        # new mech (built in memory, no mechanism file)
+                        red_data.red_op.gas = mech_data.new_solution(active_sp_pm,active_r_pm)
+
+                        red_results_loop, errors = candidate_evaluation(\
+                                    conditions, ref_results, red_data,\
+                                    red_data.red_op.gas, active_sp_pm, active_r_pm)
                         if conditions.simul_param.show_plots:
                             plotData(tspc[0:red_data.n_tspc],ref_results,red_results_loop)
 
@@ -728,6 +1126,12 @@ def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
                                   ' -> eps(#): '+'%0.3f' %(eps[best_ICsp]),mp)
                             cross_red_error = False
 
+                    # eps loop state (restart of the case at the next step)
+                    if checkpoint:
+                        loc = locals()
+                        save_red_checkpoint(ckpt_file,op,i,mech_data,eps_cases,\
+                            {name:loc.get(name) for name in _red_loop_state})
+
 
 
                 # =========================
@@ -762,6 +1166,11 @@ def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
 
                 simulation += 1
 
+                eps_cases[(op,i)] = list(eps)
+                if checkpoint:
+                    save_red_checkpoint(ckpt_file,op,i+1,mech_data,eps_cases)
+                ckpt = False        # next cases / operators computed from scratch
+
             # clock
             clock.stop()
             
@@ -773,30 +1182,15 @@ def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
             filename = conditions_list[0].mech_ext
             new_filename = str(op+1) + '_' + filename
             os.chdir(conditions_list[0].main_path)
-            if op==0:  os.mkdir('Red_mech')
+            if not os.path.exists('Red_mech'):  os.mkdir('Red_mech')
             os.chdir('Red_mech')
             mech_data.write_new_mech(new_filename)
             os.chdir(conditions_list[0].main_path)
 
 
             # Calculation of the all data with last reduced mech
+            red_results_list = computation_validation(conditions_list,mech_data)
             for i in range(len(conditions_list)):
-                # --------------------------------------------------------------------------------
-                # interpretation of the new mech
-
-                # supress console output during the simulation
-                old_stdout = sys.stdout ; old_stderr = sys.stderr
-                with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
-
-                red_results_list[i].gas = ct.Solution('Red_mech/'+new_filename)
-
-                # restore console output
-                sys.stdout = old_stdout ; sys.stderr = old_stderr
-                # --------------------------------------------------------------------------------
-
-                red_results_list[i] = comp.red_computation(conditions_list[i],\
-                                    red_results_list[i].gas,\
-                                    mech_data.spec.activ_p,mech_data.react.activ_p)
                 errors = cdef.Errors(conditions_list[i],ref_results_list[i],\
                                   red_results_list[i],red_data_list[op][i],red_data_list[op][i].red_op)
                 red_errors_list.append(errors)
@@ -846,6 +1240,8 @@ def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
                 opt_results_list[l].write_case_data('Optimization',op,\
                                 False,opt_errors_list[l])
 
+        if checkpoint:
+            save_red_checkpoint(ckpt_file,op+1,0,mech_data,eps_cases)
 
     return  mech_data.spec.activ_p.count(True), \
             mech_data.react.activ_p.count(True), \
@@ -853,6 +1249,42 @@ def reduction(conditions_list,ref_results_list,red_data_list,mech_data):
 
 
 
+# eps loop variables of the case being reduced (checkpoints)
+_red_loop_state = ['try_acc','try_n','sp_try','sp_inter','T_try','ig_try','Sl_try',\
+                   'K_try','active_sp_pm','active_r_pm','cross_red_error',\
+                   'stop_reduction','eps','delta_eps','act_sp_prev','act_r_prev',\
+                   'sp_prev','r_prev','First_try_T_error','First_try_Sl_error',\
+                   'First_try_ig_error','First_try_K_error','First_try_sp_error',\
+                   'one_simul_success','T_error','Sl_error','ig_error','K_error',\
+                   'sp_error','stop_T_red','stop_Sl_red','stop_ig_red','stop_K_red',\
+                   'eps_stop','eps_cre','eps_prev','eps_evol','first_try','best_ICsp',\
+                   'idx']
+
+
+def save_red_checkpoint(filename,op,case,mech_data,eps_cases,loop_state=False):
+    """ progress of the reduction: next operator / case to compute, active
+        species and reactions (activ_m: previous operators, activ_p: cases
+        of the current operator), kinetic parameters (optimization), final
+        eps of the reduced cases and eps loop state of the case being
+        reduced (False at the end of a case)                                """
+
+    cdef.write_checkpoint({'op':op, 'case':case, 'loop':loop_state,\
+        'sp_activ_m':np.array(mech_data.spec.activ_m,dtype=bool),\
+        'sp_activ_p':np.array(mech_data.spec.activ_p,dtype=bool),\
+        'r_activ_m':np.array(mech_data.react.activ_m,dtype=bool),\
+        'r_activ_p':np.array(mech_data.react.activ_p,dtype=bool),\
+        'kin':mech_data.react.kin, 'eps':eps_cases},filename)
+
+
+def load_red_checkpoint(ckpt,mech_data):
+
+    mech_data.spec.activ_m  = ckpt['sp_activ_m'].tolist()
+    mech_data.spec.activ_p  = ckpt['sp_activ_p'].tolist()
+    mech_data.react.activ_m = ckpt['r_activ_m'].tolist()
+    mech_data.react.activ_p = ckpt['r_activ_p'].tolist()
+    mech_data.react.kin     = ckpt['kin']
+
+
 def input_results_treatment(conditions_list,ref_results_list):
 
     ''' return:
@@ -871,10 +1303,7 @@ def input_results_treatment(conditions_list,ref_results_list):
      -> to shift the experimental flame position
     '''
 
-    mech_results_list = []
-    for i in range(len(conditions_list)):
-        results,conditions = computation_reference(conditions_list[i],1)
-        mech_results_list.append(results)
+    conditions_list, mech_results_list = computation_references(conditions_list,1)
 
     # shift free flame_data:
     for i in range(len(conditions_list)):
@@ -901,7 +1330,7 @@ def input_results_treatment(conditions_list,ref_results_list):
             # add points at the origin:
             ref_results_list[i].pts_scatter = np.insert\
                                               (ref_results_list[i].pts_scatter,0,0)
-            ref_results_list[i].X=[ref_results_list[i].X[0]]+ref_results_list[i].X
+            ref_results_list[i].X=np.insert(ref_results_list[i].X,0,ref_results_list[i].X[0],axis=0)
             ref_results_list[i].T=[ref_results_list[i].T[0]]+ref_results_list[i].T
 
             # remove potential extra experimental points:
@@ -911,12 +1340,12 @@ def input_results_treatment(conditions_list,ref_results_list):
                 T_end           = ref_results_list[i].T[-(pt+1)]
                 if ref_results_list[i].pts_scatter[-(pt+1)]>=mech_results_list[i].pts_scatter[-1]:
                     ref_results_list[i].pts_scatter = np.delete(ref_results_list[i].pts_scatter,-1)
-                    del ref_results_list[i].X[-1]
+                    ref_results_list[i].X = ref_results_list[i].X[:-1]
                     del ref_results_list[i].T[-1]
                 else:
                     ref_results_list[i].pts_scatter=\
                         np.concatenate((ref_results_list[i].pts_scatter,[pts_scatter_end]))
-                    ref_results_list[i].X+=list([conc_end])
+                    ref_results_list[i].X=np.concatenate((ref_results_list[i].X,[conc_end]))
                     ref_results_list[i].T.append(T_end)
                     ref_results_list[i].X2conc()
                     break
@@ -943,7 +1372,6 @@ def input_results_treatment(conditions_list,ref_results_list):
 
 
 
-        ref_results_list_smooth[i].X = list(conc_smooth)
         T_v = np.array(ref_results_list[i].T)
         if len(T_v)==1: T_v=np.append(T_v,T_v)
         T = interp1d(x, T_v, kind='linear')
@@ -953,11 +1381,11 @@ def input_results_treatment(conditions_list,ref_results_list):
                 T_smooth[pt]=T(pts_scatter_mech[pt])
         T_smooth[-1]=T_smooth[-2]
         ref_results_list_smooth[i].T = list(T_smooth)
-        ref_results_list_smooth[i].X = list(conc_smooth)
+        ref_results_list_smooth[i].X = conc_smooth
         ref_results_list_smooth[i].X2conc()
         ref_results_list_smooth[i].pts_scatter=list(pts_scatter_mech)
-        ref_results_list_smooth[i].kf=list(mech_results_list[i].kf)
-        ref_results_list_smooth[i].kr=list(mech_results_list[i].kr)
+        ref_results_list_smooth[i].kf=np.copy(mech_results_list[i].kf)
+        ref_results_list_smooth[i].kr=np.copy(mech_results_list[i].kr)
         conditions_list[i].simul_param.pts_scatter=list(pts_scatter_mech)
 
     return conditions_list, mech_results_list, ref_results_list_smooth
@@ -1236,11 +1664,11 @@ def read_ref_data(data_file_name,gas,conc_unit,ext_data_type,tspc,mech,verbose=4
         ref_results_list[-1].T = list(T)
         ref_results_list[-1].P = P
         if conc_unit=="mol_m3":
-            ref_results_list[-1].conc = list(conc) ; ref_results_list[-1].conc2X()
+            ref_results_list[-1].conc = conc
         if conc_unit=="Molar_fraction":
-            ref_results_list[-1].X = list(conc) ;    ref_results_list[-1].X2conc()
-        ref_results_list[-1].kf = False
+            ref_results_list[-1].X = conc ;    ref_results_list[-1].X2conc()
         ref_results_list[-1].kf = False
+        ref_results_list[-1].kr = False
         if "reactor" in config:
             try:
                 ref_results_list[-1].ign_time_hr=float(case_titles[c][11])
@@ -1348,6 +1776,7 @@ def get_reduction_parameters(filename):
     caution_opt_fflame   = True
     caution_opt_cf_flame = True
     first_it             = True
+    obsolete_opt         = set()
 
     txt = fs.readline()
 
@@ -1369,6 +1798,8 @@ def get_reduction_parameters(filename):
         if txt[0] == 'conc_units':          concentration_units = clean_txt2(txt[1])
         if txt[0] == 'ext_data_type':       ext_data_type       = clean_txt2(txt[1])
         if txt[0] == 'verbose':             verbose             = int(txt[1])
+        if txt[0] == 'ref_cache':           ref_cache           = str2bool(txt[1])
+        if txt[0] == 'checkpoint':          checkpoint          = str2bool(txt[1])
         if txt[0] == 'show_plots':
             show_plots    = str2bool(txt[1])
         if txt[0] == 'tspc':
@@ -1384,6 +1815,10 @@ def get_reduction_parameters(filename):
         if txt[0] == 'sp_K':              sp_K          = txt2list_string(txt[1])
         if txt[0] == 'error_calculation': error_calculation = clean_txt(txt[1])
         if txt[0] == 'error_coupling':    error_coupling    = clean_txt(txt[1])
+        if txt[0] == 'screening':         screening         = str2bool(txt[1])
+        if txt[0] == 'screening_tol':     screening_tol     = float(txt[1])
+        if txt[0] == 'screening_step':    screening_step    = int(txt[1])
+        if txt[0] == 'screening_margin':  screening_margin  = float(txt[1])
 
     # gas
     try:    gas_ref = ct.Solution('_kinetic_mech/'+mech)
@@ -1428,14 +1863,15 @@ def get_reduction_parameters(filename):
             if txt[0] == 'tol_ts':            tol_ts        = txt2list_float(txt[1])
             # options for reactor
             if txt[0] == 'n_pts':             n_pts           = float(txt[1])
-            if txt[0] == 'delta_npts':        delta_npts      = float(txt[1])
             if txt[0] == 't_max_coeff':       t_max_coeff     = float(txt[1])
             if txt[0] == 'Scal_ref':          Scal_ref        = clean_txt(txt[1])
             if txt[0] == 'grad_curv_ratio':   grad_curv_ratio = float(txt[1])
-            if txt[0] == 'tign_nPoints':      tign_nPoints    = float(txt[1])
-            if txt[0] == 'tign_dt':           tign_dt         = float(txt[1])
+            # obsolete options (single pass reactor integration): ignored
+            if txt[0] in ['delta_npts','tign_nPoints','tign_dt']:
+                obsolete_opt.add(txt[0])
             # options for jsr
             if txt[0] == 't_max':             t_max           = float(txt[1]); caution_opt_jsr=False
+            if txt[0] == 'jsr_workers':       jsr_workers     = int(txt[1])
             # options for flame
             if txt[0] == 'tol_ss':            tol_ss          = txt2list_float(txt[1])
             if txt[0] == 'transport_model':   transport_model = clean_txt(txt[1])
@@ -1444,6 +1880,7 @@ def get_reduction_parameters(filename):
             if txt[0] == 'curve':             curve_ff        = float(txt[1])
             if txt[0] == 'ratio':             ratio_ff        = float(txt[1])
             if txt[0] == 'prune':             prune_ff        = float(txt[1])
+            if txt[0] == 'flame_spill':       flame_spill     = str2bool(txt[1])
             # option for free_flame / burner_flame
             if txt[0] == 'xmax':              xmax            = float(txt[1]);  caution_opt_fflame=False
             # option for burner_flame
@@ -1540,22 +1977,18 @@ def get_reduction_parameters(filename):
                         if 'n_pts' in locals():
                             conditions_list[-1].simul_param.n_pts = n_pts
                         # options for reactor
-                        if 'delta_npts' in locals():
-                            conditions_list[-1].simul_param.delta_npts = delta_npts
                         if 't_max_coeff' in locals():
                             conditions_list[-1].simul_param.t_max_coeff = t_max_coeff
                         if 'Scal_ref' in locals():
                             conditions_list[-1].simul_param.Scal_ref = Scal_ref
                         if 'grad_curv_ratio' in locals():
                             conditions_list[-1].simul_param.grad_curv_ratio = grad_curv_ratio
-                        if 'tign_nPoints' in locals():
-                            conditions_list[-1].simul_param.tign_nPoints = int(tign_nPoints)
-                        if 'tign_dt' in locals():
-                            conditions_list[-1].simul_param.tign_dt = tign_dt
                         # options for jsr
                         if 't_max' in locals():
                             caution_opt_jsr=False
                             conditions_list[-1].simul_param.end_sim = t_max
+                        if 'jsr_workers' in locals():
+                            conditions_list[-1].simul_param.jsr_workers = jsr_workers
                         if config == 'JSR':
                             conditions_list[-1].simul_param.pts_scatter = T_scatter
                         # options for flame
@@ -1573,6 +2006,8 @@ def get_reduction_parameters(filename):
                             conditions_list[-1].simul_param.ratio_ff = ratio_ff
                         if 'prune_ff' in locals():
                             conditions_list[-1].simul_param.prune_ff = prune_ff
+                        if 'flame_spill' in locals():
+                            conditions_list[-1].simul_param.flame_spill = flame_spill
                         # options for free_flame or PFR
                         if 'xmax' in locals():
                             caution_opt_fflame=False
@@ -1660,6 +2095,14 @@ def get_reduction_parameters(filename):
                             conditions_list[-1].error_param.sp_Sl = sp_Sl
                         if 'sp_K' in locals():
                             conditions_list[-1].error_param.sp_K = sp_K
+                        if 'screening' in locals():
+                            conditions_list[-1].error_param.screening = screening
+                        if 'screening_tol' in locals():
+                            conditions_list[-1].error_param.screening_tol = screening_tol
+                        if 'screening_step' in locals():
+                            conditions_list[-1].error_param.screening_step = screening_step
+                        if 'screening_margin' in locals():
+                            conditions_list[-1].error_param.screening_margin = screening_margin
                         conditions_list[-1].error_param.tspc   = tspc
                         conditions_list[-1].error_param.n_tspc = n_tspc
                         conditions_list[-1].main_path = main_path_ext
@@ -1696,14 +2139,12 @@ def get_reduction_parameters(filename):
             if 'tol_ts'           in locals(): del tol_ts
             # options for reactor
             if 'n_pts'            in locals(): del n_pts
-            if 'delta_npts'       in locals(): del delta_npts
             if 't_max_coeff'      in locals(): del t_max_coeff
             if 'Scal_ref'         in locals(): del Scal_ref
             if 'grad_curv_ratio'  in locals(): del grad_curv_ratio
-            if 'tign_nPoints'     in locals(): del tign_nPoints
-            if 'tign_dt'          in locals(): del tign_dt
             # options for jsr
             if 't_max'            in locals(): del t_max ; caution_opt_jsr=True
+            if 'jsr_workers'      in locals(): del jsr_workers
             # options for flame
             if 'tol_ss'           in locals(): del tol_ss
             if 'transport_model'  in locals(): del transport_model
@@ -1712,6 +2153,7 @@ def get_reduction_parameters(filename):
             if 'curve_ff'         in locals(): del curve_ff
             if 'ratio_ff'         in locals(): del ratio_ff
             if 'prune_ff'         in locals(): del prune_ff
+            if 'flame_spill'      in locals(): del flame_spill
             # option for free_flame
             if 'xmax'             in locals(): del xmax  ; caution_opt_fflame=True
             # option for burner_flame
@@ -1802,12 +2244,28 @@ def get_reduction_parameters(filename):
             cond.error_param.sp_Sl = sp_Sl
         if 'sp_K' in locals():
             cond.error_param.sp_K = sp_K
+        if 'screening' in locals():
+            cond.error_param.screening = screening
+        if 'screening_tol' in locals():
+            cond.error_param.screening_tol = screening_tol
+        if 'screening_step' in locals():
+            cond.error_param.screening_step = screening_step
+        if 'screening_margin' in locals():
+            cond.error_param.screening_margin = screening_margin
         cond.error_param.tspc   = tspc
         cond.error_param.n_tspc = n_tspc
         cond.main_path          = main_path
+        if 'ref_cache' not in locals() or ref_cache:
+            cond.simul_param.ref_cache = r_path + '/_ref_cache'
+        if 'checkpoint' in locals():
+            cond.simul_param.checkpoint = checkpoint
+
 
 
 
+    if obsolete_opt:
+        print('Warning: obsolete reactor options ignored (single pass integration '+\
+              'over the solver time steps): '+', '.join(sorted(obsolete_opt)))
 
     while '> Op:' not in txt[-1] and txt[0] != '':
         txt = fs.readline().split('=')
@@ -1846,6 +2304,7 @@ def get_reduction_parameters(filename):
             if txt[0] == 'max_error_Sl':      max_error_Sl       = float(txt[1])
             if txt[0] == 'max_error_K':       max_error_K        = float(txt[1])
             if txt[0] == 'inter_sp_inter':    inter_sp_inter     = str2bool(txt[1])
+            if txt[0] == 'precomp_OIC':       precomp_OIC        = str2bool(txt[1])
             if txt[0] == 'optim':             optim              = str2bool(txt[1])
             if txt[0] == 'ttol_sensi':
                 try:    ttol_sensi = txt2list_float(txt[1])
@@ -1872,6 +2331,13 @@ def get_reduction_parameters(filename):
                     if txt[0] == 'mut_opt':             mut_opt            = txt2list_float(txt[1])
                     if txt[0] == 'mut_intensity':       mut_intensity      = float(txt[1])
                     if txt[0] == 'sub_mech_sel':        sub_mech_sel       = txt2list_string(txt[1])
+                    if txt[0] == 'steady_state':        steady_state       = str2bool(txt[1])
+                    if txt[0] == 'n_islands':           n_islands          = int(txt[1])
+                    if txt[0] == 'migration_gen':       migration_gen      = int(txt[1])
+                    if txt[0] == 'n_migrants':          n_migrants         = int(txt[1])
+                    if txt[0] == 'migration_topology':  migration_topology = clean_txt(txt[1])
+                    if txt[0] == 'surrogate':           surrogate          = str2bool(txt[1])
+                    if txt[0] == 'surrogate_pct':       surrogate_pct      = float(txt[1])
             else:
                 optim = False
             txt = fs.readline().split('=')
@@ -1894,6 +2360,7 @@ def get_reduction_parameters(filename):
                 if 'max_error_Sl'   in locals(): red_data.red_op.max_error_Sl   = max_error_Sl
                 if 'max_error_K'    in locals(): red_data.red_op.max_error_K    = max_error_K
                 if 'inter_sp_inter' in locals(): red_data.red_op.inter_sp_inter = inter_sp_inter
+                if 'precomp_OIC'    in locals(): red_data.red_op.precomp_OIC    = precomp_OIC
                 if 'optim'          in locals(): red_data.red_op.optim          = optim
                 if 'ttol_sensi'     in locals(): red_data.red_op.tol_ts         = ttol_sensi
                 if 'optim' in locals():
@@ -1914,6 +2381,13 @@ def get_reduction_parameters(filename):
                         if 'mut_pct'            in locals(): red_data.optim_param.mut_pct            = mut_pct
                         if 'mut_opt'            in locals(): red_data.optim_param.mut_option         = mut_opt
                         if 'mut_intensity'      in locals(): red_data.optim_param.mut_intensity      = mut_intensity
+                        if 'steady_state'       in locals(): red_data.optim_param.steady_state       = steady_state
+                        if 'n_islands'          in locals(): red_data.optim_param.n_islands          = n_islands
+                        if 'migration_gen'      in locals(): red_data.optim_param.migration_gen      = migration_gen
+                        if 'n_migrants'         in locals(): red_data.optim_param.n_migrants         = n_migrants
+                        if 'migration_topology' in locals(): red_data.optim_param.migration_topology = migration_topology
+                        if 'surrogate'          in locals(): red_data.optim_param.surrogate          = surrogate
+                        if 'surrogate_pct'      in locals(): red_data.optim_param.surrogate_pct      = surrogate_pct
                         if 'sub_mech_sel' in locals():
                             # C0 submech
                             if 'H2' not in sub_mech_sel: red_data.optim_param.opt_subm_C[0] = False
@@ -1944,6 +2418,7 @@ def get_reduction_parameters(filename):
             if 'max_error_Sl'       in locals(): del max_error_Sl
             if 'max_error_K'        in locals(): del max_error_K
             if 'inter_sp_inter'     in locals(): del inter_sp_inter
+            if 'precomp_OIC'        in locals(): del precomp_OIC
             if 'optim'              in locals(): del optim
             if 'ttol_sensi'         in locals(): del ttol_sensi
             if 'n_gen'              in locals(): del n_gen
@@ -1962,6 +2437,13 @@ def get_reduction_parameters(filename):
             if 'mut_opt'            in locals(): del mut_opt
             if 'mut_intensity'      in locals(): del mut_intensity
             if 'sub_mech_sel'       in locals(): del sub_mech_sel
+            if 'steady_state'       in locals(): del steady_state
+            if 'n_islands'          in locals(): del n_islands
+            if 'migration_gen'      in locals(): del migration_gen
+            if 'n_migrants'         in locals(): del n_migrants
+            if 'migration_topology' in locals(): del migration_topology
+            if 'surrogate'          in locals(): del surrogate
+            if 'surrogate_pct'      in locals(): del surrogate_pct
 
             save_op = False
 
@@ -29,18 +29,23 @@ import os
 import sys
 import multiprocessing
 from multiprocessing import Pool
+import queue
 
-from shutil import copyfile
 import time as timer
 import cantera as ct
 
 import random as random
 import copy
+import hashlib
 #import gc
 import operator
 import csv
 
 
+# convergence data of optim_param (GA checkpoints)
+_conv_data = ['genVec','best_fitness','mean_fitness','worst_fitness',\
+              'n_simul','surrogate_error','cache_hit_rate']
+
 
 def geneticAlgorithm(conditions_list,mech_data,ref_results_list,red_data_list):
 
@@ -57,11 +62,28 @@ def geneticAlgorithm(conditions_list,mech_data,ref_results_list,red_data_list):
     if not os.path.exists("GA"): os.mkdir("GA")
     os.chdir("GA")
 
+    # random generators seeded once per optimization (states saved in the
+    # checkpoints, islands reseeded in island_process)
+    np.random.seed() ; random.seed()
+
+    # checkpoint of the optimization (restart of a killed run,
+    # islands checkpoints read in island_process)
+    simul_param = conditions_list[0].simul_param
+    op   = red_data_list[0].op
+    ckpt = False
+    if simul_param.resume:
+        ckpt = cdef.read_checkpoint('GA_checkpoint.pkl')
+        if ckpt and ckpt['op'] != op: ckpt = False     # checkpoint of another optimization
+
     # Reference ind
     ref_ind = Chromosome(conditions_list,mech_data,\
                          ref_results_list,red_data_list,False)
     ref_ind.fitness = ref_ind.fitness_eval(conditions_list,optim_param,ref_results_list)
 
+    # genome of the individuals (A, n, Ea of the reactions to optimize)
+    kin_map = Kin_map(ref_ind.mech)
+    ref_ind.genome = kin_map.get_genome(ref_ind.mech.react.kin)
+
 
     if verbose >= 1 :
         print_("Non optimized reduced mechanism fitness: "+"%.3f"%(ref_ind.fitness),mp)
@@ -78,38 +100,66 @@ def geneticAlgorithm(conditions_list,mech_data,ref_results_list,red_data_list):
     optim_param.count_mut()
     size_mut   = optim_param.total_mut
     size_tot   = int(size_ind + size_Xover + size_mut)
-    pop = Population(conditions_list,mech_data,red_data_list,ref_results_list,\
-                     size_tot)
-    pop.fitness_eval_newpop(optim_param,conditions_list,ref_results_list)
+    if optim_param.steady_state and size_Xover+size_mut == 0:
+        # no child slot in the population: generational loop
+        print_('No Xover / mutation childs: steady-state GA replaced by the generational GA',mp)
+        optim_param.steady_state = False
 
+    if optim_param.n_islands > 1:
+        # island model: populations evolved in separate processes
+        time_1 = timer.time()
+        best_ind = island_model(conditions_list,mech_data,ref_results_list,\
+                                red_data_list,ref_ind,kin_map,best_ind,size_tot)
 
-    # Find new best ind and save the mech,
-    # if not, replace worst ind of the current pop by the previous best ind
-    best_ind,new_best_ind = pop.compare_best_ind(best_ind,optim_param,verbose)
+    else:
+        pop = Population(conditions_list,mech_data,red_data_list,ref_results_list,\
+                         size_tot,kin_map)
 
-    gen=0
-    # save and display convergence informations
-    if verbose >= 1 : print_('Initial population:',mp)
-    pop.convergence_information(gen,optim_param,verbose)
-    pop.selection(optim_param,verbose)
+        # GA workers (started once, fitness evaluations of all the generations)
+        pool = start_pool(conditions_list,ref_results_list,optim_param,ref_ind)
 
-    time_1 = timer.time()
+        # population of the last completed generation (restart of a killed run)
+        if ckpt and ckpt['genome'].shape != (size_tot,kin_map.size):
+            ckpt = False       # checkpoint of another optimization
 
-    for gen in range(1, optim_param.n_gen+1):
-        print_("\n\nGeneration:" + str(gen),mp)
-        pop.Xover(optim_param,conditions_list,ref_results_list,verbose)
-        pop.mutation(optim_param,conditions_list,ref_results_list,gen,verbose)
-        pop.fitness_eval_newchilds(optim_param,conditions_list,ref_results_list)
-        pop.selection(optim_param,verbose)
-        best_ind,new_best_ind = pop.compare_best_ind(best_ind,optim_param,verbose)
+        if ckpt:
+            gen_start = ckpt['gen']+1
+            best_ind  = pop.load_checkpoint(ckpt,optim_param,best_ind)
+            print_('\nOptimization resumed after generation '+str(ckpt['gen']),mp)
 
-        if new_best_ind and optim_param.exp_data:                              # optimization of the time iteration for reactor models
-#            conditions_list,ref_results_list\
-#                    =best_ind.time_step_optim(conditions_list,ref_results_list)
-            best_ind.fitness = best_ind.fitness_eval(conditions_list,optim_param,ref_results_list)
+        else:
+            gen_start = 1
+            pop.fitness_eval_newpop(optim_param,pool)
 
-        if verbose > 5: pop.display(optim_param)
-        pop.convergence_information(gen,optim_param,verbose)
+
+            # Find new best ind and save the mech,
+            # if not, replace worst ind of the current pop by the previous best ind
+            best_ind,new_best_ind = pop.compare_best_ind(best_ind,optim_param,verbose)
+
+            gen=0
+            # save and display convergence informations
+            if verbose >= 1 : print_('Initial population:',mp)
+            pop.convergence_information(gen,optim_param,verbose)
+            pop.selection(optim_param,verbose)
+            if simul_param.checkpoint:
+                pop.save_checkpoint(gen,optim_param,best_ind,op,0)
+
+        time_1 = timer.time()
+
+        if optim_param.steady_state:
+            # asynchronous steady-state GA (no generation barrier)
+            n_eval   = ckpt['n_eval'] if ckpt and ckpt['n_eval'] else 0
+            best_ind = pop.steady_state(optim_param,pool,best_ind,verbose,\
+                                        simul_param.checkpoint,op,n_eval)
+
+        else:
+            for gen in range(gen_start, optim_param.n_gen+1):
+                best_ind = pop.generation(gen,optim_param,conditions_list,\
+                                          ref_results_list,pool,best_ind,verbose)
+                if simul_param.checkpoint:
+                    pop.save_checkpoint(gen,optim_param,best_ind,op)
+
+        pool.close() ; pool.join()
 
     time_2 = timer.time()
     if verbose >= 5 :
@@ -125,7 +175,7 @@ def geneticAlgorithm(conditions_list,mech_data,ref_results_list,red_data_list):
     Opt_results_list, errors_list, fitness = \
         best_ind.export_data(conditions_list,optim_param,ref_results_list)
 
-    del pop ; del ref_ind
+    del ref_ind
 
     os.chdir(conditions_list[0].main_path)
 
@@ -133,6 +183,247 @@ def geneticAlgorithm(conditions_list,mech_data,ref_results_list,red_data_list):
 
 
 
+#==============================================================================
+#   GA workers : persistent pool started once per optimization
+#==============================================================================
+
+_worker = {}     # data of the worker process (loaded by init_worker)
+
+def start_pool(conditions_list,ref_results_list,optim_param,ind,num_cores=False):
+    """ Pool of GA workers. The reference mechanism, the conditions and
+        the reference results are loaded once per worker by init_worker,
+        the tasks are then (index, genome) of the individuals.
+        ind: individual used as template by the workers (active species /
+        reactions and reactions to optimize)                               """
+
+    if not num_cores: num_cores = multiprocessing.cpu_count()
+
+    # saving and suppression of unpickable variables on workers inputs
+    gas     = [cond.composition.gas     for cond in conditions_list]
+    gas_ref = [cond.composition.gas_ref for cond in conditions_list]
+    for cond in conditions_list:
+        del cond.composition.gas
+        del cond.composition.gas_ref
+    gas_res = [res.gas for res in ref_results_list]
+    f       = [res.f   for res in ref_results_list]
+    for res in ref_results_list:
+        del res.gas
+        del res.f
+
+    pool = multiprocessing.Pool(num_cores,initializer=init_worker,\
+               initargs=(conditions_list,ref_results_list,optim_param,ind))
+
+    for i in range(len(conditions_list)):
+        conditions_list[i].composition.gas     = gas[i]
+        conditions_list[i].composition.gas_ref = gas_ref[i]
+    for i in range(len(ref_results_list)):
+        ref_results_list[i].gas = gas_res[i]
+        ref_results_list[i].f   = f[i]
+
+    return pool
+
+
+def init_worker(conditions_list,ref_results_list,optim_param,ind):
+
+    # change dir
+    os.chdir(conditions_list[0].main_path)
+
+    # supress console output during the interpretation
+    old_stdout = sys.stdout ; old_stderr = sys.stderr
+    with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
+    gas = ct.Solution(conditions_list[0].mech)
+    # restore console output
+    sys.stdout = old_stdout ; sys.stderr = old_stderr
+
+    for _c in range(len(conditions_list)):
+        conditions_list[_c].composition.gas     = gas
+        conditions_list[_c].composition.gas_ref = gas
+
+    os.chdir("GA")
+
+    _worker['conditions_list']  = conditions_list
+    _worker['ref_results_list'] = ref_results_list
+    _worker['optim_param']      = optim_param
+    _worker['ind']              = ind
+    _worker['kin_map']          = Kin_map(ind.mech)
+
+
+def fitness_eval_worker(task):
+
+    ind, genome, screening = task
+    chromosome = _worker['ind']
+    chromosome.mech.react.kin = _worker['kin_map'].get_kin(genome)
+
+    try:
+        fitness = chromosome.fitness_eval(_worker['conditions_list'],\
+                    _worker['optim_param'],_worker['ref_results_list'],ind,\
+                    screening)
+    except:
+        fitness = 0
+
+    return (fitness,ind)
+
+
+
+#==============================================================================
+#   Island model : populations evolved in separate processes
+#==============================================================================
+
+def island_model(conditions_list,mech_data,ref_results_list,red_data_list,\
+                 ref_ind,kin_map,best_ind,size_pop):
+    """ n_islands populations evolved independently in separate processes
+        (each with its own GA workers: cores / n_islands), exchanging their
+        best individuals every migration_gen generations through the
+        migration topology. The islands logs are written in GA/island_*,
+        the convergence information of optim_param is the merge of the
+        islands ones. Each island is checkpointed in its own folder.
+        Returns the best individual of all the islands.                    """
+
+    optim_param = red_data_list[0].optim_param
+    verbose     = conditions_list[0].simul_param.verbose
+    mp          = optim_param.main_path
+    n_islands   = int(optim_param.n_islands)
+    n_cores     = max(1,multiprocessing.cpu_count()//n_islands)
+
+    if verbose >= 1:
+        print_(str(n_islands)+' islands ('+optim_param.migration_topology+\
+               ' migration every '+str(optim_param.migration_gen)+\
+               ' generations), '+str(n_cores)+' workers per island',mp)
+
+    # suppression of unpickable variables on islands inputs
+    gas     = [cond.composition.gas     for cond in conditions_list]
+    gas_ref = [cond.composition.gas_ref for cond in conditions_list]
+    gas_res = [res.gas for res in ref_results_list]
+    f       = [res.f   for res in ref_results_list]
+    for cond in conditions_list:
+        cond.composition.gas = False ; cond.composition.gas_ref = False
+    for res in ref_results_list:
+        res.gas = False ; res.f = False
+
+    inboxes = [multiprocessing.Queue() for isl in range(n_islands)]
+    outputs = multiprocessing.Queue()
+    islands = []
+    try:
+        for isl in range(n_islands):
+            pop = Population(conditions_list,mech_data,red_data_list,\
+                             ref_results_list,size_pop,kin_map)
+            islands.append(multiprocessing.Process(target=island_process,\
+                  args=(isl,pop,conditions_list,ref_results_list,optim_param,\
+                        ref_ind,best_ind,inboxes,outputs,n_cores,verbose,\
+                        red_data_list[0].op)))
+            islands[-1].start()
+        results = []
+        while len(results) < n_islands:
+            try:
+                results.append(outputs.get(timeout=10))
+            except queue.Empty:
+                if any([island.exitcode for island in islands]):
+                    for island in islands: island.terminate()
+                    raise Exception('island process failed')
+        for island in islands: island.join()
+    finally:
+        for i in range(len(conditions_list)):
+            conditions_list[i].composition.gas     = gas[i]
+            conditions_list[i].composition.gas_ref = gas_ref[i]
+        for i in range(len(ref_results_list)):
+            ref_results_list[i].gas = gas_res[i]
+            ref_results_list[i].f   = f[i]
+
+    # merge of the convergence information of the islands
+    results.sort(key=operator.itemgetter(0))
+    conv = [res[3] for res in results]
+    optim_param.genVec        = list(conv[0]['genVec'])
+    optim_param.best_fitness  = list(np.max([c['best_fitness'] for c in conv],axis=0))
+    optim_param.mean_fitness  = list(np.mean([c['mean_fitness'] for c in conv],axis=0))
+    optim_param.worst_fitness = list(np.min([c['worst_fitness'] for c in conv],axis=0))
+    optim_param.n_simul       = list(np.sum([c['n_simul'] for c in conv],axis=0))
+    optim_param.cache_hit_rate= list(np.mean([c['cache_hit_rate'] for c in conv],axis=0))
+
+    # best individual of all the islands
+    for isl, genome, fitness, c in results:
+        if verbose >= 2:
+            print_('island '+str(isl+1)+' best ind: '+'%.3f' %fitness,mp)
+        if fitness > best_ind.fitness:
+            ind = ref_ind.light_copy()
+            ind.genome = np.array(genome) ; ind.fitness = fitness
+            best_ind = kin_map.materialize(ind)
+    best_ind.mech.write_new_mech("optim_mech.cti")
+    if verbose >= 1:
+        print_('Best ind (all islands): '+'%.3f' %best_ind.fitness,mp)
+
+    return best_ind
+
+
+def island_process(isl,pop,conditions_list,ref_results_list,optim_param,\
+                   ref_ind,best_ind,inboxes,outputs,n_cores,verbose,op=0):
+
+    # own random sequences
+    np.random.seed() ; random.seed()
+
+    # island folder (island mech), log of the secondary islands
+    folder = 'island_'+str(isl+1)
+    if not os.path.exists(folder): os.mkdir(folder)
+    os.chdir(folder)
+    if isl > 0:
+        optim_param.main_path = os.getcwd()
+        sys.stdout = open(os.devnull, "w")
+
+    pool = start_pool(conditions_list,ref_results_list,optim_param,ref_ind,n_cores)
+
+    # reference mech (best individual re-evaluation)
+    cur_path = os.getcwd()
+    os.chdir(conditions_list[0].main_path)
+    gas = ct.Solution(conditions_list[0].mech)
+    os.chdir(cur_path)
+    for cond in conditions_list:
+        cond.composition.gas = gas ; cond.composition.gas_ref = gas
+
+    # island population of the last completed generation (restart of a
+    # killed run, migrants not received before the stop are lost)
+    simul_param = conditions_list[0].simul_param
+    ckpt = False
+    if simul_param.resume:
+        ckpt = cdef.read_checkpoint('GA_checkpoint.pkl')
+        if ckpt and (ckpt['op'] != op or \
+                     ckpt['genome'].shape != (len(pop.population),pop.kin_map.size)):
+            ckpt = False       # checkpoint of another optimization
+
+    if ckpt:
+        gen_start = ckpt['gen']+1
+        best_ind  = pop.load_checkpoint(ckpt,optim_param,best_ind)
+        print_('\nIsland '+str(isl+1)+' resumed after generation '+str(ckpt['gen']),\
+               optim_param.main_path)
+    else:
+        gen_start = 1
+        pop.fitness_eval_newpop(optim_param,pool)
+        best_ind,new_best_ind = pop.compare_best_ind(best_ind,optim_param,verbose)
+        if verbose >= 1 : print_('Initial population (island '+str(isl+1)+'):',optim_param.main_path)
+        pop.convergence_information(0,optim_param,verbose)
+        pop.selection(optim_param,verbose)
+        if simul_param.checkpoint:
+            pop.save_checkpoint(0,optim_param,best_ind,op)
+
+    for gen in range(gen_start, optim_param.n_gen+1):
+        best_ind = pop.generation(gen,optim_param,conditions_list,\
+                                  ref_results_list,pool,best_ind,verbose)
+        if gen%optim_param.migration_gen == 0 and gen < optim_param.n_gen:
+            pop.migration(isl,optim_param,inboxes,verbose)
+        if simul_param.checkpoint:
+            pop.save_checkpoint(gen,optim_param,best_ind,op)
+
+    pool.close() ; pool.join()
+
+    # remaining migrants not waited at the end of the process
+    for inbox in inboxes: inbox.cancel_join_thread()
+
+    conv = {'genVec':optim_param.genVec, 'best_fitness':optim_param.best_fitness,\
+            'mean_fitness':optim_param.mean_fitness,\
+            'worst_fitness':optim_param.worst_fitness,'n_simul':optim_param.n_simul,\
+            'cache_hit_rate':optim_param.cache_hit_rate}
+    outputs.put((isl,best_ind.genome,best_ind.fitness,conv))
+
+
+
 def plotConvergence(optim_param):
     import matplotlib.pyplot as plt
 
@@ -149,20 +440,141 @@ def plotConvergence(optim_param):
 
 
 
+class Kin_map:
+    """ Index map between the flat genome of the individuals (A, n, Ea of
+        the reactions to optimize) and the kinetic coefficients react.kin
+        of the mechanism. Built once from the reference individual, whose
+        mech is used as template to materialize the individuals.          """
+
+    def __init__(self,mech):
+
+        self.mech = mech
+        r_idx=[] ; j_idx=[] ; k_idx=[] ; ref=[] ; incert=[] ; block=[]
+        n_block = 0
+        for r in range(len(mech.react.kin)):
+            if not mech.react.modif[r]: continue
+            if mech.react.type[r] in ["reaction","three_body_reaction"]:
+                triples = [mech.react.ref_kin[r]] ; j_list = [-1]
+            elif mech.react.type[r] in ["falloff_reaction","pdep_arrhenius"]:
+                triples = mech.react.ref_kin[r]   ; j_list = range(len(triples))
+            else: continue
+            for j,triple in zip(j_list,triples):
+                for k in range(3):
+                    r_idx.append(r) ; j_idx.append(j) ; k_idx.append(k)
+                    ref.append(triple[k]) ; block.append(n_block)
+                    incert.append(mech.react.incert[r][k]/100)
+                n_block += 1
+
+        self.r_idx   = np.array(r_idx,dtype=int)    # reaction of the gene
+        self.j_idx   = np.array(j_idx,dtype=int)    # falloff / plog set (-1 : none)
+        self.k_idx   = np.array(k_idx,dtype=int)    # 0: A, 1: n, 2: Ea
+        self.block   = np.array(block,dtype=int)    # Arrhenius set of the gene
+        self.ref     = np.array(ref,dtype=float)
+        self.incert  = np.array(incert,dtype=float)
+        self.size    = len(ref)
+        self.n_block = n_block
+        self.n_react = len(mech.react.kin)
+        self.is_A    = self.k_idx==0
+        self.zero    = self.ref==0
+        self.lb      = np.abs(self.ref*(1-self.incert))
+        self.ub      = np.abs(self.ref*(1+self.incert))
+
+    def get_genome(self,kin):
+        genome = np.zeros(self.size)
+        for g,(r,j,k) in enumerate(zip(self.r_idx.tolist(),self.j_idx.tolist(),\
+                                       self.k_idx.tolist())):
+            if j<0: genome[g] = kin[r][k]
+            else:   genome[g] = kin[r][j][k]
+        return genome
+
+    def get_kin(self,genome):
+        kin = copy.deepcopy(self.mech.react.ref_kin)
+        for g,(r,j,k) in enumerate(zip(self.r_idx.tolist(),self.j_idx.tolist(),\
+                                       self.k_idx.tolist())):
+            if j<0: kin[r][k]    = float(genome[g])
+            else:   kin[r][j][k] = float(genome[g])
+        return kin
+
+    def materialize(self,ind):
+        """ individual with its mech (best individual / export) """
+        ind_m      = copy.deepcopy(ind)
+        ind_m.mech = copy.deepcopy(self.mech)
+        ind_m.mech.react.kin = self.get_kin(ind.genome)
+        return ind_m
+
+
+
+def genome_key(genome):
+    """ canonical hash of the optimized kinetic parameters (fitness cache) """
+    genome = np.ascontiguousarray(genome,dtype=np.float64)+0.   # -0. -> 0.
+    return hashlib.sha1(genome.tobytes()).hexdigest()
+
+
+
+class Surrogate:
+    """ RBF regression of log(fitness) over the normalized genome
+        ((genome-ref)/(ref*incert)), trained on all the individuals
+        evaluated at full fidelity. Used to rank the new childs before
+        their simulation.                                                """
+
+    def __init__(self,kin_map):
+
+        self.ref   = kin_map.ref
+        self.scale = np.abs(kin_map.ref*kin_map.incert)
+        self.scale[self.scale==0] = 1
+        self.x     = [] ; self.y = []
+        self.model = False
+
+    def normalize(self,genomes):
+        return (np.atleast_2d(genomes)-self.ref)/self.scale
+
+    def add(self,genome,fitness):
+        if fitness>0:      # failed simulations not used
+            self.x.append(self.normalize(genome)[0])
+            self.y.append(np.log(fitness))
+            self.model = False
+
+    def ready(self,n_min):
+        return len(self.x) >= n_min
+
+    def predict(self,genomes):
+        from scipy.interpolate import RBFInterpolator
+
+        if self.model is False:
+            self.model = RBFInterpolator(np.array(self.x),np.array(self.y),\
+                           kernel='multiquadric',epsilon=1.,degree=0,\
+                           smoothing=1e-3,neighbors=min(len(self.x),100))
+        return np.exp(self.model(self.normalize(genomes)))
+
+
+
 class Chromosome:
     def __init__(self,conditions_list,mech_data,ref_results_list,red_data_list,\
-                 rand_kin=True):
+                 rand_kin=True,kin_map=False):
         optim_param = red_data_list[0].optim_param
-        self.mech    = copy.deepcopy(mech_data)
-        self.r2opt   = []
-        self.find_r2opt(red_data_list,optim_param,conditions_list)
-        self.get_uncertainty(optim_param)
 
-        if rand_kin:
-            self.randomize_kin(optim_param)
+        if kin_map:
+            # population individual : genome only
+            self.mech    = False
+            self.genome  = kin_map.ref.copy()
+            if rand_kin:
+                self.randomize_kin(kin_map)
+        else:
+            # reference individual (template of the kin_map)
+            self.mech    = copy.deepcopy(mech_data)
+            self.r2opt   = []
+            self.find_r2opt(red_data_list,optim_param,conditions_list)
+            self.get_uncertainty(optim_param)
+            self.genome  = False
 
         self.fitness = 0
 
+    def light_copy(self):
+        """ copy of the individual without its mech """
+        ind = copy.copy(self)
+        ind.mech = False ; ind.genome = np.array(self.genome)
+        return ind
+
 
 
     def find_r2opt(self,red_data_list,optim_param,conditions_list):
@@ -375,22 +787,8 @@ class Chromosome:
     def shift_flame_data(self,conditions_list,optim_param,ref_results_list):
         verbose = conditions_list[0].simul_param.verbose
 
-        filename = 'temp.cti'
-        self.mech.write_new_mech(filename)
-
-        # --------------------------------------------------------------------------------
-        # interpretation of the new mech
-
-        # supress console output during the interpretation
-        if verbose<9:
-            old_stdout = sys.stdout ; old_stderr = sys.stderr
-            with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
-
-        gas = ct.Solution(filename)
-
-        # restore console output
-        if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr
-        # --------------------------------------------------------------------------------
+        # new mech (built in memory)
+        gas = self.mech.new_solution()
 
         qoi_tot = [] ; qoi_tot_pond =  [] ; pond=0
 
@@ -405,7 +803,8 @@ class Chromosome:
                 ref_results = ref_results_list[i]
 
                 Opt_results = comp.red_computation(ref_results.conditions, \
-                                   gas,self.mech.spec.activ_m,self.mech.react.activ_m)
+                                   gas,self.mech.spec.activ_m,self.mech.react.activ_m,\
+                                   kinetics=False)
 
                 end_sim     = ref_results.conditions.simul_param.end_sim
                 shifting    = -end_sim
@@ -443,10 +842,8 @@ class Chromosome:
         verbose = conditions_list[0].simul_param.verbose
 
         print_('time step optimization',mp)
-        filename = 'temp.cti'
-        self.mech.write_new_mech(filename)
         # --------------------------------------------------------------------------------
-        # interpretation of the new mech
+        # new mech (built in memory)
 
         # supress console output during the interpretation
         if verbose<9:
@@ -455,7 +852,7 @@ class Chromosome:
 
         for i in range(len(conditions_list)):
             conditions   = conditions_list[i]
-            conditions.composition.gas = ct.Solution(filename)
+            conditions.composition.gas = self.mech.new_solution()
             if 'reactor' in conditions.config:
                 opt_results, conditions = comp.ref_computation(conditions)
                 ref_results = comp.red_computation(conditions, \
@@ -471,47 +868,20 @@ class Chromosome:
         return conditions_list, ref_results_list
 
 
-    def randomize_kin(self,optim_param):
-
-        for r in range(len(self.mech.react.type)):
-            if self.mech.react.modif[r]:
-                incert_r = [u/100 for u in self.mech.react.incert[r]]
-                if self.mech.react.type[r] == "three_body_reaction"\
-                or self.mech.react.type[r] == "reaction":
-                    for k in range(len(self.mech.react.kin[r])):
-                        self.mech.react.kin[r][k]=self.mech.react.ref_kin[r][k]\
-                        +self.mech.react.ref_kin[r][k]*random.uniform(-1,1)*incert_r[k]
-                        if k==0: # avoid negative pre-exponential factor
-                            self.mech.react.kin[r][k]=abs(self.mech.react.kin[r][k])
-                elif self.mech.react.type[r] == "falloff_reaction"\
-                or self.mech.react.type[r] == "pdep_arrhenius":
-                    for k1 in range(len(self.mech.react.kin[r])):
-                        for k2 in range(len(self.mech.react.kin[r][k1])):
-                            self.mech.react.kin[r][k1][k2]=self.mech.react.ref_kin[r][k1][k2]\
-                              +self.mech.react.ref_kin[r][k1][k2]*random.uniform(-1,1)*incert_r[k2]
-                            if k2==0: # avoid negative pre-exponential factor
-                                self.mech.react.kin[r][k1][k2]=abs(self.mech.react.kin[r][k1][k2])
-
-
-    def fitness_eval(self,conditions_list,optim_param,ref_results_list,n_par=0):
-        verbose = conditions_list[0].simul_param.verbose
+    def randomize_kin(self,kin_map):
 
-        filename = 'temp_'+str(n_par)+'.cti'
-        self.mech.write_new_mech(filename)
+        rand = np.random.uniform(-1,1,kin_map.size)
+        self.genome = kin_map.ref + kin_map.ref*rand*kin_map.incert
+        # avoid negative pre-exponential factor
+        self.genome[kin_map.is_A] = np.abs(self.genome[kin_map.is_A])
 
-        # --------------------------------------------------------------------------------
-        # interpretation of the new mech
-
-        # supress console output during the interpretation
-        if verbose<9:
-            old_stdout = sys.stdout ; old_stderr = sys.stderr
-            with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
 
-        gas = ct.Solution(filename)
+    def fitness_eval(self,conditions_list,optim_param,ref_results_list,n_par=0,\
+                     screening=False):
+        verbose = conditions_list[0].simul_param.verbose
 
-        # restore console output
-        if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr
-        # --------------------------------------------------------------------------------
+        # mech of the process updated in place with the individual kinetics
+        gas = self.mech.get_solution()
 
         qoi_tot = [] ; pond=0
         for i in range(len(conditions_list)):
@@ -532,7 +902,8 @@ class Chromosome:
 
             cur_path = os.getcwd()
             Opt_results = comp.red_computation(conditions,gas, \
-                               self.mech.spec.activ_m,self.mech.react.activ_m)
+                               self.mech.spec.activ_m,self.mech.react.activ_m,\
+                               kinetics=False,screening=screening)
             os.chdir(cur_path)
 
             errors = cdef.Errors(conditions,ref_results,Opt_results,\
@@ -568,7 +939,7 @@ class Chromosome:
 
         return fitness
 
-    def export_data(self,conditions_list,optim_param,ref_results_list,filename='temp.cti'):
+    def export_data(self,conditions_list,optim_param,ref_results_list):
         verbose = conditions_list[0].simul_param.verbose
 
         errors_list=[] ; Opt_results_list = []
@@ -576,21 +947,9 @@ class Chromosome:
         qoi_tot = [] ; pond=0
 
         os.chdir(conditions_list[0].main_path+'/GA')
-        self.mech.write_new_mech(filename)
-        
-        # --------------------------------------------------------------------------------
-        # interpretation of the new mech
-
-        # supress console output during the interpretation
-        if verbose<9:
-            old_stdout = sys.stdout ; old_stderr = sys.stderr
-            with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
-
-        gas = ct.Solution(filename)
 
-        # restore console output
-        if verbose<9: sys.stdout = old_stdout ; sys.stderr = old_stderr
-        # --------------------------------------------------------------------------------
+        # new mech (built in memory)
+        gas = self.mech.new_solution()
 
 
         for i in range(len(conditions_list)):
@@ -602,8 +961,6 @@ class Chromosome:
             conditions   = conditions_list[i]
             ref_results = ref_results_list[i]
 
-            self.mech.write_new_mech(filename)
-
             T_check  = conditions_list[i].error_param.T_check
             Sl_check = conditions_list[i].error_param.Sl_check
             ig_check = conditions_list[i].error_param.ig_check
@@ -611,7 +968,8 @@ class Chromosome:
 
             cur_path = os.getcwd()
             Opt_results_list.append(comp.red_computation(conditions, \
-                       gas,self.mech.spec.activ_m,self.mech.react.activ_m))
+                       gas,self.mech.spec.activ_m,self.mech.react.activ_m,\
+                       kinetics=False))
             os.chdir(cur_path)
             errors_list.append(cdef.Errors(conditions,ref_results,\
                                          Opt_results_list[-1],optim_param))
@@ -643,13 +1001,21 @@ class Chromosome:
 
 class Population:
     def __init__(self,conditions_list,mech_data,red_data_list,ref_results_list,\
-                 size_pop):
-
-        self.population = []
+                 size_pop,kin_map):
+
+        self.population  = []
+        self.kin_map     = kin_map
+        self.error_param = conditions_list[0].error_param
+        self.surrogate   = Surrogate(kin_map)
+        self.n_simul     = 0        # simulated individuals (current generation)
+        self.surr_error  = False    # surrogate prediction error (current generation)
+        self.fitness_cache = {}     # genome_key -> fitness (full fidelity)
+        self.cache_hits    = 0      # fitness found in the cache (current generation)
+        self.cache_req     = 0      # fitness requests (current generation)
 
         for ind in range(size_pop):
             self.population.append(Chromosome(conditions_list,mech_data,\
-                                   ref_results_list,red_data_list,True))
+                                   ref_results_list,red_data_list,True,kin_map))
 
     def __getitem__(self, i):
         return self.population[i]
@@ -680,7 +1046,7 @@ class Population:
         new_best_ind = False
         # compare the current best population ind to the previous best ind
         if self.population[best_idx].fitness > best_ind.fitness:
-            best_ind = copy.deepcopy(self.population[best_idx])
+            best_ind = self.kin_map.materialize(self.population[best_idx])
             best_ind.mech.write_new_mech("optim_mech.cti")
             if verbose >= 3:
                 print_("New best_ind: "+"%.3f" %(best_ind.fitness),mp)
@@ -688,7 +1054,7 @@ class Population:
         best_idx = self.find_best(n_ind)
         if self.population[best_idx].fitness < best_ind.fitness:
             worst_idx=self.find_worst(best_idx,n_ind)
-            self.population[worst_idx]=copy.deepcopy(best_ind)
+            self.population[worst_idx]=best_ind.light_copy()
 
         return best_ind, new_best_ind
 
@@ -714,213 +1080,286 @@ class Population:
                 worst_idx = p ; best_fit = self.population[p].fitness
         return worst_idx
 
-    def fitness_eval_par(self,fit_eval_inp):
-
-        optim_param         = fit_eval_inp[0]
-        conditions_list     = fit_eval_inp[1]
-        ref_results_list    = fit_eval_inp[2]
-        bar                 = fit_eval_inp[3]
-        ind                 = fit_eval_inp[4]
-        is_child            = fit_eval_inp[5]
-        if is_child:
-            ind               = optim_param.n_ind + ind
-            title="New ind evaluation  "
-        else:
-            title="New pop evaluation  "
-
-        mech = conditions_list[0].mech
-
-        # change dir
-        os.chdir(conditions_list[0].main_path)
-
-        # supress console output during the interpretation
-        old_stdout = sys.stdout ; old_stderr = sys.stderr
-        with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
-        gas = ct.Solution(mech)
-        # restore console output
-        sys.stdout = old_stdout ; sys.stderr = old_stderr
-
-        for _c in range(len(conditions_list)):
-            conditions_list[_c].composition.gas     = gas
-            conditions_list[_c].composition.gas_ref = gas
-
-        os.chdir("GA")
-
-        try:
-            fitness = self.population[ind].fitness_eval(conditions_list,optim_param,ref_results_list,ind)
-        except:
-            fitness = 0
-
-        bar.update(ind,title)
-        return (fitness,ind)
-
-    def fitness_eval_newchilds(self,optim_param,conditions_list,ref_results_list):
-
-
-        num_cores = multiprocessing.cpu_count()
+    def fitness_eval_newchilds(self,optim_param,pool):
 
         child_nb = optim_param.total_Xover + optim_param.total_mut
+        idx      = [optim_param.n_ind + ch for ch in range(child_nb)]
+        idx, predicted = self.surrogate_ranking(idx,optim_param)
+
+        if self.error_param.screening:
+            # low fidelity fitness of the childs, full fidelity only for the
+            # childs close to the selection threshold (worst parent fitness)
+            self.fitness_eval_pool(idx,pool,"New ind screening   ",True)
+            threshold = min([self.population[p].fitness \
+                             for p in range(optim_param.n_ind)])
+            idx = [ind for ind in idx if self.population[ind].fitness\
+                   *self.error_param.screening_margin >= threshold]
+
+        self.fitness_eval_pool(idx,pool,"New ind evaluation  ")
+
+        # surrogate prediction error on the childs simulated at full fidelity
+        if predicted:
+            errors = [abs(predicted[ind]-self.population[ind].fitness)\
+                      /max(self.population[ind].fitness,1e-10) for ind in idx]
+            if errors: self.surr_error = float(np.mean(errors))
+
+    def migration(self,isl,optim_param,inboxes,verbose=0):
+        """ emigration of the n_migrants best individuals of the island isl
+            to its neighbours (migration_topology: ring, all, random), and
+            immigration of the individuals received so far (asynchronous)
+            in place of the worst ones                                      """
+
+        mp        = optim_param.main_path
+        n_ind     = optim_param.n_ind
+        n_islands = len(inboxes)
+        others    = [i for i in range(n_islands) if i != isl]
+        if   optim_param.migration_topology == 'all':    dest = others
+        elif optim_param.migration_topology == 'random': dest = [random.choice(others)]
+        else:                                            dest = [(isl+1)%n_islands]   # ring
+
+        best = sorted(range(n_ind),key=lambda p: self.population[p].fitness,reverse=True)
+        migrants = [(self.population[p].genome,self.population[p].fitness) \
+                    for p in best[:int(optim_param.n_migrants)]]
+        for i in dest: inboxes[i].put(migrants)
+
+        received = []
+        while True:
+            try:    received += inboxes[isl].get_nowait()
+            except queue.Empty: break
+        for genome,fitness in received:
+            self.fitness_cache.setdefault(genome_key(genome),fitness)
+            worst = self.find_worst(self.find_best(n_ind),n_ind)
+            if fitness > self.population[worst].fitness:
+                self.population[worst] = copy.copy(self.population[worst])
+                self.population[worst].genome  = np.array(genome)
+                self.population[worst].fitness = fitness
+        if verbose >= 5:
+            print_(str(len(received))+' migrants received',mp)
+
+    def generation(self,gen,optim_param,conditions_list,ref_results_list,\
+                   pool,best_ind,verbose=0):
+        """ generation of the generational GA (childs creation, evaluation
+            and selection). Returns the best individual                    """
 
-        gas     = conditions_list[0].composition.gas
-        gas_ref = conditions_list[0].composition.gas_ref
-
-        # saving and suppression of unpickable variables on fitness eval inputs
-        for cond in range(len(conditions_list)):
-            del conditions_list[cond].composition.gas
-            del conditions_list[cond].composition.gas_ref
-        f=[]
-        for res in range(len(ref_results_list)):
-            f.append(ref_results_list[res].f)
-            del ref_results_list[res].gas
-            del ref_results_list[res].f
-
-        bar = cdef.ProgressBar(child_nb, '')
-        title="New ind evaluation  "
-        bar.update(0,title)
-
-        fit_eval_inp = []
-        for ch in range(child_nb):
-            fit_eval_inp.append([optim_param,conditions_list,ref_results_list,bar,ch,True])
-
-        # saving of the ref mechanism
-        mech = conditions_list[0].mech
-        os.chdir(conditions_list[0].main_path)
-        copyfile(mech,'GA/'+mech)
-        os.chdir("GA")
-
-
-        # Fitness calculation
-
-        # no parallelisation --------------------------------------------------
-
-#        fit_list = []
-#        mech = conditions_list[0].mech
-#        # supress console output during the interpretation
-#        old_stdout = sys.stdout ; old_stderr = sys.stderr
-#        with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
-#        gas = ct.Solution(mech)
-#        # restore console output
-#        sys.stdout = old_stdout ; sys.stderr = old_stderr
-#        for _c in range(len(conditions_list)):
-#            conditions_list[_c].composition.gas     = gas
-#            conditions_list[_c].composition.gas_ref = gas
-#        for ch in range(child_nb):
-#            fit_list.append([self.population[ch].fitness_eval(conditions_list,optim_param,ref_results_list,ch),ch])
-
-
-        # Parallelisation 1 ---------------------------------------------------
-#        with Pool(processes=num_cores) as pool:
-#            fit_list = [ pool.apply_async(self.fitness_eval_par, args) for args in fit_eval_inp ]
-
-        # Parallelisation 2 ---------------------------------------------------
-#        fit_list = []
-#        def log_result(fit_i):
-#            # This is called whenever foo_pool(i) returns a result.
-#            # result_list is modified only by the main process, not the pool workers.
-#            fit_list.append(fit_i)
-#
-#        pool=Pool(processes=num_cores)
-#        for args in fit_eval_inp:
-#            pool.apply_async(self.fitness_eval_par, args, callback=log_result)
-#        pool.close()
-
-        # Parallelisation 3 ---------------------------------------------------
-        with multiprocessing.Pool(num_cores) as p:
-            fit_list = p.map(self.fitness_eval_par, fit_eval_inp)
+        mp = optim_param.main_path
 
+        print_("\n\nGeneration:" + str(gen),mp)
+        self.Xover(optim_param,conditions_list,ref_results_list,verbose)
+        self.mutation(optim_param,conditions_list,ref_results_list,gen,verbose)
+        self.fitness_eval_newchilds(optim_param,pool)
+        self.selection(optim_param,verbose)
+        best_ind,new_best_ind = self.compare_best_ind(best_ind,optim_param,verbose)
 
+        if new_best_ind and optim_param.exp_data:                              # optimization of the time iteration for reactor models
+#            conditions_list,ref_results_list\
+#                    =best_ind.time_step_optim(conditions_list,ref_results_list)
+            best_ind.fitness = best_ind.fitness_eval(conditions_list,optim_param,ref_results_list)
 
-        fit_list.sort(reverse=False, key=lambda col: col[1])
+        if verbose > 5: self.display(optim_param)
+        self.convergence_information(gen,optim_param,verbose)
+
+        return best_ind
+
+    def save_checkpoint(self,gen,optim_param,best_ind,op,n_eval=False):
+        """ population (genomes and fitness) of the completed generation gen,
+            best individual, random generators state, convergence data,
+            fitness cache and surrogate training data (GA_checkpoint.pkl).
+            n_eval: evaluated childs (steady-state GA)                       """
+
+        conv = {}
+        for name in _conv_data:
+            conv[name] = list(getattr(optim_param,name))
+        cdef.write_checkpoint({'op':op, 'gen':gen, 'n_eval':n_eval,\
+            'genome':np.array([ind.genome for ind in self.population]),\
+            'fitness':np.array([ind.fitness for ind in self.population]),\
+            'best_genome':best_ind.genome, 'best_fitness':best_ind.fitness,\
+            'np_random':np.random.get_state(), 'random':random.getstate(),\
+            'conv':conv, 'fitness_cache':self.fitness_cache,\
+            'surrogate':(self.surrogate.x,self.surrogate.y)},'GA_checkpoint.pkl')
+
+    def load_checkpoint(self,ckpt,optim_param,best_ind):
+        """ restart from the checkpoint of save_checkpoint.
+            Returns the best individual                      """
+
+        for ind,genome,fitness in zip(self.population,ckpt['genome'],ckpt['fitness']):
+            ind.genome = np.array(genome) ; ind.fitness = float(fitness)
+        np.random.set_state(ckpt['np_random']) ; random.setstate(ckpt['random'])
+        for name in ckpt['conv']:
+            setattr(optim_param,name,list(ckpt['conv'][name]))
+        self.fitness_cache = ckpt['fitness_cache']
+        self.surrogate.x, self.surrogate.y = ckpt['surrogate']
+
+        if ckpt['best_fitness'] > best_ind.fitness:
+            best = best_ind.light_copy()
+            best.genome = np.array(ckpt['best_genome']) ; best.fitness = ckpt['best_fitness']
+            best_ind = self.kin_map.materialize(best)
+            best_ind.mech.write_new_mech("optim_mech.cti")
 
-        for _i in range(len(fit_list)):
-            ind = optim_param.n_ind + _i
-            self.population[ind].fitness = fit_list[_i][0]
+        return best_ind
 
+    def surrogate_ranking(self,idx,optim_param):
+        """ childs idx ranked by the surrogate: only the most promising
+            fraction is kept for simulation, the others are discarded
+            (fitness 0). Returns the kept childs and their predicted
+            fitness (False if the surrogate is not used)                  """
 
-        bar.update(child_nb,title)
-        print('\n')
+        if not optim_param.surrogate or not self.surrogate.ready(optim_param.n_ind/2):
+            return idx, False
 
-        for i in range(len(conditions_list)):
-            conditions_list[i].composition.gas     = gas
-            conditions_list[i].composition.gas_ref = gas_ref
-        for i in range(len(ref_results_list)):
-            ref_results_list[i].gas = gas
-            ref_results_list[i].f   = f[i]
+        predicted = self.surrogate.predict([self.population[ind].genome \
+                                            for ind in idx])
+        n_sim = max(1,int(np.ceil(optim_param.surrogate_pct*len(idx)/100)))
+        order = np.argsort(-predicted)
+        for k in order[n_sim:]:
+            self.population[idx[k]].fitness = 0
 
-    def fitness_eval_newpop(self,optim_param,conditions_list,ref_results_list):
+        return [idx[k] for k in order[:n_sim]], \
+               {idx[k]:predicted[k] for k in order[:n_sim]}
 
+    def new_childs(self,optim_param,gen):
+        """ batch of childs created with the selection, Xover and mutation
+            operators applied to a copy of the population (steady-state GA).
+            Returns the childs to simulate and their predicted fitness      """
 
-        num_cores = multiprocessing.cpu_count()
+        mating = copy.copy(self) ; mating.population = list(self.population)
+        mating.selection(optim_param,0)
+        mating.Xover(optim_param,False,False,0)
+        mating.mutation(optim_param,False,False,gen,0)
 
         n_ind = optim_param.n_ind
-#        print('total_Xover: '+str(optim_param.total_Xover))
-#        print('total_mut: '+str(optim_param.total_mut))
-#        print('total_child: '+str(child_nb))
-
-        gas     = conditions_list[0].composition.gas
-        gas_ref = conditions_list[0].composition.gas_ref
-
-        # saving and suppression of unpickable variables on fitness eval inputs
-        for cond in range(len(conditions_list)):
-            del conditions_list[cond].composition.gas
-            del conditions_list[cond].composition.gas_ref
-        f=[]
-        for res in range(len(ref_results_list)):
-            f.append(ref_results_list[res].f)
-            del ref_results_list[res].gas
-            del ref_results_list[res].f
-
-        bar = cdef.ProgressBar(n_ind, '')
-        title="New pop evaluation  "
-        bar.update(0,title)
-
-        fit_eval_inp = []
-        for _i in range(n_ind):
-            fit_eval_inp.append([optim_param,conditions_list,ref_results_list,bar,_i,False])
+        idx   = list(range(n_ind,len(mating.population)))
+        idx, predicted = mating.surrogate_ranking(idx,optim_param)
+        if not predicted: predicted = {}
+
+        return [(mating.population[ind],predicted.get(ind,False)) for ind in idx]
+
+    def steady_state(self,optim_param,pool,best_ind,verbose=0,\
+                     checkpoint=False,op=0,n_eval=0):
+        """ asynchronous steady-state GA: a new child is submitted as soon as
+            a worker is free, and replaces the worst individual of the
+            population as soon as its fitness is known (no generation
+            barrier). The childs slots of the population keep the last
+            evaluated childs, used by the selection of the next batches.
+            Convergence information and stopping criterion are based on
+            equivalent generations (number of simulated childs of a
+            generation of the generational GA), the population is
+            checkpointed at the end of each equivalent generation.
+            n_eval: childs evaluated before the restart of a killed run
+            (childs being evaluated when the run was killed are lost).       """
+
+        mp       = optim_param.main_path
+        n_ind    = optim_param.n_ind
+        n_slots  = len(self.population)-n_ind
+        child_nb = optim_param.total_Xover + optim_param.total_mut
+        if optim_param.surrogate:
+            child_nb = max(1,int(np.ceil(optim_param.surrogate_pct*child_nb/100)))
+        n_eval_tot = optim_param.n_gen*child_nb
+        n_proc     = multiprocessing.cpu_count()
+
+        # best individual kept in the population
+        best_ind = self.compare_best_ind(best_ind,optim_param,verbose)[0]
+
+        done    = queue.Queue()
+        childs  = [] ; pending = {} ; surr_errors = []
+        n_submit = n_eval ; gen = n_eval//child_nb
+
+        while n_eval < n_eval_tot:
+
+            # one child per worker (+1 waiting in the pool queue)
+            while len(pending) <= n_proc and n_submit < n_eval_tot:
+                if not childs:
+                    childs = self.new_childs(optim_param,gen+1)
+                pending[n_submit] = childs.pop(0)
+                key = genome_key(pending[n_submit][0].genome)
+                self.cache_req += 1
+                if key in self.fitness_cache:   # duplicated genome: not simulated
+                    self.cache_hits += 1
+                    done.put((self.fitness_cache[key],n_submit))
+                else:
+                    pool.apply_async(fitness_eval_worker,\
+                        ((n_submit,pending[n_submit][0].genome,False),),\
+                        callback=done.put,\
+                        error_callback=lambda err,task=n_submit: done.put((0,task)))
+                n_submit += 1
+
+            # completed evaluation
+            fitness, task = done.get()
+            child, predicted = pending.pop(task)
+            child.fitness = fitness
+            key = genome_key(child.genome)
+            if key not in self.fitness_cache:
+                self.fitness_cache[key] = fitness
+                self.surrogate.add(child.genome,fitness)
+                self.n_simul += 1
+            if predicted is not False:
+                surr_errors.append(abs(predicted-fitness)/max(fitness,1e-10))
+            self.population[n_ind+n_eval%n_slots] = child
+            n_eval += 1
+
+            # replacement of the worst individual
+            worst = self.find_worst(self.find_best(n_ind),n_ind)
+            if fitness > self.population[worst].fitness:
+                self.population[worst] = child
+            if fitness > best_ind.fitness:
+                best_ind = self.kin_map.materialize(child)
+                best_ind.mech.write_new_mech("optim_mech.cti")
+                if verbose >= 3:
+                    print_("New best_ind: "+"%.3f" %(best_ind.fitness),mp)
+
+            # equivalent generation
+            if n_eval%child_nb == 0:
+                gen += 1
+                if surr_errors: self.surr_error = float(np.mean(surr_errors))
+                surr_errors = []
+                print_("\n\nGeneration (equivalent):" + str(gen),mp)
+                if verbose > 5: self.display(optim_param)
+                self.convergence_information(gen,optim_param,verbose)
+                if checkpoint:
+                    self.save_checkpoint(gen,optim_param,best_ind,op,n_eval)
+
+        return best_ind
+
+    def fitness_eval_newpop(self,optim_param,pool):
+
+        idx = list(range(optim_param.n_ind))
+        self.fitness_eval_pool(idx,pool,"New pop evaluation  ")
+
+    def fitness_eval_pool(self,idx,pool,title='',screening=False):
+        """ fitness of the individuals idx computed by the GA workers
+            (only the genomes are sent to the workers)                    """
+
+        # identical genomes simulated once, fitness of the genomes already
+        # evaluated taken from the cache
+        same = {}
+        for ind in idx:
+            key = genome_key(self.population[ind].genome)
+            if key in self.fitness_cache:
+                self.population[ind].fitness = self.fitness_cache[key]
+            else:
+                same.setdefault(key,[]).append(ind)
+        if not screening:
+            self.cache_req  += len(idx)
+            self.cache_hits += len(idx)-len(same)
 
-        # saving of the ref mechanism
-        mech = conditions_list[0].mech
-        os.chdir(conditions_list[0].main_path)
-        copyfile(mech,'GA/'+mech)
-        os.chdir("GA")
+        bar = cdef.ProgressBar(len(same), '')
+        bar.update(0,title)
 
+        tasks = [(inds[0],self.population[inds[0]].genome,screening) \
+                 for inds in same.values()]
+        n_eval = 0
+        for fitness,ind in pool.imap_unordered(fitness_eval_worker,tasks):
+            key = genome_key(self.population[ind].genome)
+            for ind_same in same[key]:
+                self.population[ind_same].fitness = fitness
+            if not screening:
+                self.fitness_cache[key] = fitness
+                self.surrogate.add(self.population[ind].genome,fitness)
+            n_eval += 1
+            bar.update(n_eval,title)
+        self.n_simul += len(tasks)
 
-#        # byposs parallelisation for debugging -------------------------------
-#        if 'Dagaut' in conditions_list[0].main_path:
-#            fit_i = []
-#            mech = conditions_list[0].mech
-#            # supress console output during the interpretation
-#            old_stdout = sys.stdout ; old_stderr = sys.stderr
-#            with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
-#            gas = ct.Solution(mech)
-#            # restore console output
-#            sys.stdout = old_stdout ; sys.stderr = old_stderr
-#            for _c in range(len(conditions_list)):
-#                conditions_list[_c].composition.gas     = gas
-#                conditions_list[_c].composition.gas_ref = gas
-#            for ind in range(n_ind):
-#                fit_i.append(self.fitness_eval(conditions_list,optim_param,ref_results_list,ind),ind)
-#        else:
-#        # byposs parallelisation for debugging -------------------------------
-        # Fitness calculation
-        with multiprocessing.Pool(num_cores) as p:
-            fit_i = p.map(self.fitness_eval_par, fit_eval_inp)
-
-        fit_i.sort(reverse=False, key=lambda col: col[1])
-
-        for _i in range(len(fit_i)):
-            self.population[_i].fitness = fit_i[_i][0]
-
-        bar.update(n_ind,title)
         print('\n')
 
-        for i in range(len(conditions_list)):
-            conditions_list[i].composition.gas     = gas
-            conditions_list[i].composition.gas_ref = gas_ref
-        for i in range(len(ref_results_list)):
-            ref_results_list[i].gas = gas
-            ref_results_list[i].f   = f[i]
-
 
 
     def convergence_information(self,gen,optim_param,verbose=0):
@@ -947,6 +1386,26 @@ class Population:
             optim_param.mean_fitness.append(avr_fit)
             optim_param.worst_fitness.append(min_fit)
 
+        # simulation count and surrogate prediction error of the generation
+        if verbose>=2 and optim_param.surrogate:
+            if self.surr_error is not False:
+                print_("simulated ind: "+str(self.n_simul)+\
+                       "   surrogate prediction error: "+"%.1f" %(self.surr_error*100)+"%",mp)
+            else:
+                print_("simulated ind: "+str(self.n_simul),mp)
+        optim_param.n_simul.append(self.n_simul)
+        optim_param.surrogate_error.append(self.surr_error)
+        self.n_simul = 0 ; self.surr_error = False
+
+        # fitness cache hit rate (duplicated individuals not simulated)
+        hit_rate = self.cache_hits/self.cache_req if self.cache_req else 0
+        if verbose>=2 and gen>0:
+            print_("fitness cache: "+str(self.cache_hits)+"/"+str(self.cache_req)+\
+                   " hits ("+"%.1f" %(hit_rate*100)+"%),   "+\
+                   str(len(self.fitness_cache))+" genomes stored",mp)
+        optim_param.cache_hit_rate.append(hit_rate)
+        self.cache_hits = 0 ; self.cache_req = 0
+
 
 
 
@@ -976,10 +1435,10 @@ class Population:
 
     def select_2_roulette(self,optim_param):
 
-        pop_copy = copy.deepcopy(self)
+        pop_copy = copy.copy(self) ; pop_copy.population = list(self.population)
         pop_copy.sort_fitness()
 
-        random.seed() ; fit = [] ; proba = [] ; rand_sel_vect=[] #; nan_list = []
+        fit = [] ; proba = [] ; rand_sel_vect=[] #; nan_list = []
         size_pop = optim_param.n_ind
 
         # build fitness vector
@@ -1012,10 +1471,10 @@ class Population:
 
     def select_3_rank(self, optim_param):
 
-        pop_copy = copy.deepcopy(self)
+        pop_copy = copy.copy(self) ; pop_copy.population = list(self.population)
         pop_copy.sort_fitness()
 
-        random.seed() ; rank = [] ; proba = [] ; rand_sel_vect=[]
+        rank = [] ; proba = [] ; rand_sel_vect=[]
 
         # build rank vector
         for p in range(len(pop_copy.population)):
@@ -1043,10 +1502,10 @@ class Population:
 
 
         q = optim_param.selection_options[0]
-        pop_copy = copy.deepcopy(self)
+        pop_copy = copy.copy(self) ; pop_copy.population = list(self.population)
         pop_copy.sort_fitness
 
-        random.seed() ; proba = [] ; rand_sel_vect=[]
+        proba = [] ; rand_sel_vect=[]
 
         # calculate selection probability vector
         for r in range(len(pop_copy.population)):
@@ -1116,213 +1575,108 @@ class Population:
         print_('',mp)
 
 
+    def parents(self,optim_param,n_parents=2):
+        """ random parents (different) among the selected individuals """
+        return list(np.random.choice(int(optim_param.n_ind),n_parents,replace=False))
+
     def Xover_1_simple(self,conditions_list,optim_param,ref_results_list,created_ind):
 
-        random.seed()
-        size_react = len(self.population[0].mech.react.kin)
-        size_pop   = optim_param.n_ind
-        parent1    = random.randrange(0, size_pop)
-        parent2    = random.randrange(0, size_pop)
+        km = self.kin_map
+        size_pop         = optim_param.n_ind
+        parent1, parent2 = self.parents(optim_param)
         child1     = size_pop+created_ind
         child2     = size_pop+created_ind+1
-        while parent1 == parent2 :
-            parent2 = random.randrange(0, size_pop)
 
         self.population[child1] = copy.deepcopy(self.population[parent1])
         self.population[child2] = copy.deepcopy(self.population[parent2])
 
-        a = random.randrange(0,size_react)
-        for i in range(a,size_react):
-            self.population[child1].mech.react.kin[i] = copy.deepcopy(self.population[parent2].mech.react.kin[i])
-            self.population[child2].mech.react.kin[i] = copy.deepcopy(self.population[parent1].mech.react.kin[i])
-
-#        self.population[child1].fitness_eval(conditions_list,optim_param,ref_results_list)
-#        self.population[child2].fitness_eval(conditions_list,optim_param,ref_results_list)
+        # exchange of the reactions after a random cut
+        swap = km.r_idx >= np.random.randint(0,km.n_react)
+        self.population[child1].genome[swap] = self.population[parent2].genome[swap]
+        self.population[child2].genome[swap] = self.population[parent1].genome[swap]
 
     def Xover_2_multiple(self,conditions_list,optim_param,ref_results_list,created_ind):
 
-        random.seed()
-        size_react = len(self.population[0].mech.react.kin)
-        size_pop   = optim_param.n_ind
-        parent1    = random.randrange(0, size_pop)
-        parent2    = random.randrange(0, size_pop)
+        km = self.kin_map
+        size_pop         = optim_param.n_ind
+        parent1, parent2 = self.parents(optim_param)
         child1     = size_pop+created_ind
         child2     = size_pop+created_ind+1
-        while parent1 == parent2:
-            parent2 = random.randrange(0, size_pop)
 
         self.population[child1] = copy.deepcopy(self.population[parent1])
         self.population[child2] = copy.deepcopy(self.population[parent2])
 
-        for i in range(size_react):
-            a = random.randrange(0,2)
-            if a ==1:
-                self.population[child1].mech.react.kin[i] = copy.deepcopy(self.population[parent2].mech.react.kin[i])
-                self.population[child2].mech.react.kin[i] = copy.deepcopy(self.population[parent1].mech.react.kin[i])
-
+        # exchange of randomly chosen reactions
+        swap = (np.random.randint(0,2,km.n_react)==1)[km.r_idx]
+        self.population[child1].genome[swap] = self.population[parent2].genome[swap]
+        self.population[child2].genome[swap] = self.population[parent1].genome[swap]
+
+    def Xover_mix(self,new_val,n_try):
+        """ first mix coefficient (try) for which all the coefficients of the
+            Arrhenius sets are within their uncertainty bounds.
+            new_val: list of (genome size x n_try) candidate values
+            returns the accepted values of each candidate (genome size) and
+            the mask of the genes of the sets with an accepted try         """
+
+        km = self.kin_map
+        ok = np.ones((km.size,n_try),dtype=bool)
+        for val in new_val:
+            ok &= (km.lb[:,None]<np.abs(val)) & (np.abs(val)<km.ub[:,None])
+        ok |= km.zero[:,None]
+        ok_block = np.ones((km.n_block,n_try),dtype=bool)
+        np.logical_and.at(ok_block,km.block,ok)
+
+        accepted = ok_block.any(axis=1)[km.block]
+        i_try    = ok_block.argmax(axis=1)[km.block]
+        new_val  = [np.where(km.zero,0.,val[np.arange(km.size),i_try]) for val in new_val]
+        for val in new_val:     # avoid negative pre-exponential factor
+            val[km.is_A] = np.abs(val[km.is_A])
+
+        return new_val, accepted
 
     def Xover_3_arith(self,conditions_list,optim_param,ref_results_list,created_ind):
-    #(self,ref_pop,created_ind, AG_reference, AG_mech, error_param, max_variation):
 
-        random.seed()
-        size_react = len(self.population[0].mech.react.kin)
+        km = self.kin_map
         size_pop   = optim_param.n_ind
-        p1    = random.randrange(0, size_pop)
-        p2    = random.randrange(0, size_pop)
+        p1, p2     = self.parents(optim_param)
         child1     = size_pop+created_ind
         child2     = size_pop+created_ind+1
-        while p1 == p2:
-            p2 = random.randrange(0, size_pop)
+        n_try      = 16         # 1 try + 15 retries
 
         self.population[child1] = copy.deepcopy(self.population[p1])
         self.population[child2] = copy.deepcopy(self.population[p2])
 
-
-        for r in range(size_react):
-            incert_r = [u/100 for u in self.population[0].mech.react.incert[r]]
-            if self.population[0].mech.react.modif[r]:
-                mix = random.random()
-
-                if self.population[0].mech.react.type[r] =='three_body_reaction' \
-                or self.population[0].mech.react.type[r] =='reaction':
-                    nTry = 0; maxRetry = 15
-                    while nTry <= maxRetry:
-
-                        val1=[];val2=[]
-                        for k in range(3):
-                            ref = self.population[0].mech.react.ref_kin[r][k]
-                            if ref!= 0.0:
-                                new_val1  = self.population[p1].mech.react.kin[r][k]*mix \
-                                           +self.population[p2].mech.react.kin[r][k]*(1-mix)
-                                new_val2  = self.population[p2].mech.react.kin[r][k]*mix \
-                                           +self.population[p1].mech.react.kin[r][k]*(1-mix)
-                                if  abs(ref*(1-incert_r[k])) < abs(new_val1) < abs(ref*(1+incert_r[k]))\
-                                and abs(ref*(1-incert_r[k])) < abs(new_val2) < abs(ref*(1+incert_r[k])):
-                                    val1.append(new_val1)
-                                    val2.append(new_val2)
-                            else :
-                                val1.append(.0)
-                                val2.append(.0)
-                        if len(val1)==3:
-                            val1[0]=abs(val1[0])    # avoid negative pre-exponential factor
-                            val2[0]=abs(val2[0])    # avoid negative pre-exponential factor
-                            self.population[child1].mech.react.kin[r] = list(val1)
-                            self.population[child2].mech.react.kin[r] = list(val2)
-                            break
-                        else:
-                            nTry +=1 ; mix = random.random()
-
-
-                if self.population[0].mech.react.type[r] =='falloff_reaction' \
-                or self.population[0].mech.react.type[r] =='pdep_arrhenius':
-                    for j in range(len(self.population[0].mech.react.kin[r])):
-                        nTry = 0; maxRetry = 15
-                        while nTry <= maxRetry:
-                            success = True
-                            val1=[];val2=[]
-                            for k in range(3):
-                                ref=self.population[0].mech.react.ref_kin[r][j][k]
-                                if ref!= 0.0:
-                                    new_val1  = self.population[p1].mech.react.kin[r][j][k]*mix\
-                                               +self.population[p2].mech.react.kin[r][j][k]*(1-mix)
-                                    new_val2  = self.population[p2].mech.react.kin[r][j][k]*mix \
-                                               +self.population[p1].mech.react.kin[r][j][k]*(1-mix)
-                                    if abs(new_val1) < abs(ref*(1-incert_r[k]))\
-                                    or abs(new_val1) > abs(ref*(1+incert_r[k])):
-                                        success = False
-                                    elif abs(new_val2) < abs(ref*(1-incert_r[k]))\
-                                    or   abs(new_val2) > abs(ref*(1+incert_r[k])):
-                                        success = False
-                                    else:
-                                        val1.append(new_val1)
-                                        val2.append(new_val2)
-                                else :
-                                    val1.append(.0)
-                                    val2.append(.0)
-                            if success:
-                                val1[0]=abs(val1[0])    # avoid negative pre-exponential factor
-                                val2[0]=abs(val2[0])    # avoid negative pre-exponential factor
-                                self.population[child1].mech.react.kin[r][j]=list(val1)
-                                self.population[child2].mech.react.kin[r][j]=list(val2)
-                                break
-                            else:
-                                nTry +=1 ; mix = random.random()
-
+        # arithmetic mix of each Arrhenius set (new mix if out of bounds)
+        g1  = self.population[p1].genome[:,None]
+        g2  = self.population[p2].genome[:,None]
+        mix = np.random.random((km.n_block,n_try))[km.block]
+        (val1,val2), accepted = self.Xover_mix([g1*mix+g2*(1-mix),\
+                                                g2*mix+g1*(1-mix)],n_try)
+        self.population[child1].genome[accepted] = val1[accepted]
+        self.population[child2].genome[accepted] = val2[accepted]
 
     def Xover_4_heuri(self,conditions_list,optim_param,ref_results_list,created_ind):
 
-        random.seed()
-        size_react = len(self.population[0].mech.react.kin)
+        km = self.kin_map
         size_pop   = optim_param.n_ind
-        p1    = random.randrange(0, size_pop)
-        p2    = random.randrange(0, size_pop)
-        while p1 == p2:
-            p2 = random.randrange(0, size_pop)
+        p1, p2     = self.parents(optim_param)
         if self.population[p1].fitness>self.population[p2].fitness:
             best=p1; worse=p2
         else:
             best=p2; worse=p1
         child1     = size_pop+created_ind
         child2     = size_pop+created_ind+1
+        n_try      = 16         # 1 try + 15 retries
 
         self.population[child1] = copy.deepcopy(self.population[worse])
         self.population[child2] = copy.deepcopy(self.population[best])
 
-
-        for r in range(size_react):
-            incert_r = [u/100 for u in self.population[0].mech.react.incert[r]]
-            mix = random.random()
-            if self.population[0].mech.react.modif[r]:
-                if self.population[0].mech.react.type[r] =='three_body_reaction' \
-                or self.population[0].mech.react.type[r] =='reaction':
-                    nTry = 0; maxRetry = 15
-                    while nTry <= maxRetry:
-                        success = True
-                        val1=[]
-                        for k in range(3):
-                            ref = self.population[0].mech.react.ref_kin[r][k]
-                            if ref!= 0.0:
-                                bestVal  = self.population[best].mech.react.kin[r][k]
-                                worseVal = self.population[worse].mech.react.kin[r][k]
-                                new_val  = mix*(bestVal-worseVal)+bestVal
-                                if abs(new_val) < abs(ref*(1-incert_r[k]))\
-                                or abs(new_val) > abs(ref*(1+incert_r[k])):
-                                    success = False
-                                else: val1.append(new_val)
-                            else :
-                                val1.append(.0)
-                        if success:
-                            val1[0]=abs(val1[0])    # avoid negative pre-exponential factor
-                            self.population[child1].mech.react.kin[r] = list(val1)
-                            break
-                        else:
-                            nTry +=1 ; mix = random.random()
-
-                if self.population[0].mech.react.type[r] =='falloff_reaction' \
-                or self.population[0].mech.react.type[r] =='pdep_arrhenius':
-                    for j in range(len(self.population[0].mech.react.kin[r])):
-                        nTry = 0; maxRetry = 15
-                        while nTry <= maxRetry:
-                            success = True
-                            val1=[]
-                            for k in range(3):
-                                ref=self.population[0].mech.react.ref_kin[r][j][k]
-                                if ref!= 0.0:
-                                    bestVal  = self.population[best].mech.react.kin[r][j][k]
-                                    worseVal = self.population[worse].mech.react.kin[r][j][k]
-                                    new_val  = mix*(bestVal-worseVal)+bestVal
-                                    if abs(new_val) < abs(ref*(1-incert_r[k]))\
-                                    or abs(new_val) > abs(ref*(1+incert_r[k])):
-                                        success = False
-                                    else: val1.append(new_val)
-                                else :
-                                    val1.append(.0)
-                            if success:
-                                val1[0]=abs(val1[0])    # avoid negative pre-exponential factor
-                                self.population[child1].mech.react.kin[r][j]=list(val1)
-                                break
-                            else:
-                                nTry +=1 ; mix = random.random()
+        # extrapolation from the worse to the best parent of each Arrhenius set
+        bestVal  = self.population[best].genome[:,None]
+        worseVal = self.population[worse].genome[:,None]
+        mix = np.random.random((km.n_block,n_try))[km.block]
+        (val1,), accepted = self.Xover_mix([mix*(bestVal-worseVal)+bestVal],n_try)
+        self.population[child1].genome[accepted] = val1[accepted]
 
 
 ### Mutation
@@ -1363,160 +1717,63 @@ class Population:
 
     def mut_1_unif(self,conditions_list,optim_param,ref_results_list,created_ind,opt):
 
-        random.seed()
-        size_react = len(self.population[0].mech.react.kin)
+        km = self.kin_map
         size_pop   = int(optim_param.n_ind)
-        parent1    = random.randrange(0, size_pop)
+        parent1    = self.parents(optim_param,1)[0]
         child1     = int(size_pop+created_ind)
-        probaMut = optim_param.mut_intensity
+        probaMut   = optim_param.mut_intensity
 
         self.population[child1] = copy.deepcopy(self.population[parent1])
+        genome = self.population[child1].genome
 
-        for r in range(size_react):
-            incert_r = [u/100 for u in self.population[0].mech.react.incert[r]]
-            if self.population[0].mech.react.modif[r]:
-                if self.population[0].mech.react.type[r] =='three_body_reaction' \
-                or self.population[0].mech.react.type[r] =='reaction':
-                    val=[]
-                    for k in range(3):
-                        ref = self.population[0].mech.react.ref_kin[r][k]
-                        rand = random.random()*100
-                        if rand < probaMut: # random modif of a kinetic constant
-                            val.append(random.uniform(ref*(1-incert_r[k])\
-                                                    ,ref*(1+incert_r[k])))
-                        else:
-                            val.append(self.population[child1].mech.react.kin[r][k])
-                    val[0]=abs(val[0])    # avoid negative pre-exponential factor
-                    self.population[child1].mech.react.kin[r]=list(val)
-                if self.population[0].mech.react.type[r] =='falloff_reaction' \
-                or self.population[0].mech.react.type[r] =='pdep_arrhenius':
-                    for j in range(len(self.population[0].mech.react.kin[r])):
-                        val=[]
-                        for k in range(3):
-                            ref = self.population[0].mech.react.ref_kin[r][j][k]
-                            rand = random.random()*100
-                            if rand < probaMut: # random modif of a kinetic constant
-                                val.append(random.uniform(ref*(1-incert_r[k])\
-                                                        ,ref*(1+incert_r[k])))
-                            else:
-                                val.append(self.population[child1].mech.react.kin[r][j][k])
-                        val[0]=abs(val[0])    # avoid negative pre-exponential factor
-                        self.population[child1].mech.react.kin[r][j]=list(val)
-
-
+        # random modif of the kinetic constants within the uncertainty bounds
+        mut = np.random.random(km.size)*100 < probaMut
+        genome[mut] = np.random.uniform(km.ref*(1-km.incert),km.ref*(1+km.incert))[mut]
+        genome[km.is_A] = np.abs(genome[km.is_A])   # avoid negative pre-exponential factor
 
     def mut_2_nonUnif(self,conditions_list,optim_param,ref_results_list,created_ind,\
                       gen,option):
 
-        random.seed()
-        size_react = len(self.population[0].mech.react.kin)
+        km = self.kin_map
         size_pop   = int(optim_param.n_ind)
-        parent1    = random.randrange(0, size_pop)
+        parent1    = self.parents(optim_param,1)[0]
         child1     = int(size_pop+created_ind)
         probaMut   = optim_param.mut_intensity
         ratio      = gen/optim_param.n_gen
         shape      = option
 
         self.population[child1] = copy.deepcopy(self.population[parent1])
-
-        for r in range(size_react):
-            rand = random.random()*100
-            incert_r = [u/100 for u in self.population[0].mech.react.incert[r]]
-            if rand < probaMut:
-                if self.population[0].mech.react.modif[r]:
-                    if self.population[0].mech.react.type[r] =='three_body_reaction' \
-                    or self.population[0].mech.react.type[r] =='reaction':
-                        for k in range(3):
-                            ref = self.population[0].mech.react.ref_kin[r][k]
-                            min_val = ref*(1-incert_r[k])
-                            max_val = ref*(1+incert_r[k])
-                            val = self.population[child1].mech.react.kin[r][k]
-                            rand_dir = random.randrange(0,2)
-                            if rand_dir == 0: # random modif of a kinetic constant
-                                change=(max_val-val)*(random.random()*(1-ratio))**shape
-                                self.population[child1].mech.react.kin[r][k]+=change
-                                if k==0: # avoid negative pre-exponential factor
-                                    self.population[child1].mech.react.kin[r][k] \
-                                         = self.population[child1].mech.react.kin[r][k]
-                            elif rand_dir == 1:
-                                change=(val-min_val)*(random.random()*(1-ratio))**shape
-                                self.population[child1].mech.react.kin[r][k]-=change
-                                if k==0: # avoid negative pre-exponential factor
-                                    self.population[child1].mech.react.kin[r][k] \
-                                         = self.population[child1].mech.react.kin[r][k]
-                    elif self.population[0].mech.react.type[r] =='falloff_reaction' \
-                    or self.population[0].mech.react.type[r] =='pdep_arrhenius':
-                        for j in range(len(self.population[0].mech.react.kin[r])):
-                            for k in range(3):
-                                ref = self.population[0].mech.react.ref_kin[r][j][k]
-                                min_val = ref*(1-incert_r[k])
-                                max_val = ref*(1+incert_r[k])
-                                val = self.population[child1].mech.react.kin[r][j][k]
-                                rand_dir = random.randrange(0,2)
-                                if rand_dir == 0: # random modif of a kinetic constant
-                                    change=(max_val-val)*(random.random()*(1-ratio))**shape
-                                    self.population[child1].mech.react.kin[r][j][k]+=change
-                                    if k==0: # avoid negative pre-exponential factor
-                                        self.population[child1].mech.react.kin[r][j][k] \
-                                             = abs(self.population[child1].mech.react.kin[r][j][k])
-                                elif rand_dir == 1:
-                                    change=(val-min_val)*(random.random()*(1-ratio))**shape
-                                    self.population[child1].mech.react.kin[r][j][k]-=change
-                                    if k==0: # avoid negative pre-exponential factor
-                                        self.population[child1].mech.react.kin[r][j][k] \
-                                             = self.population[child1].mech.react.kin[r][j][k]
-
-#        self.population[child1].fitness_eval(conditions_list,optim_param,ref_results_list)
-
-
+        genome = self.population[child1].genome
+
+        # random modif of the kinetic constants of the mutated reactions,
+        # towards the max (rand_dir=0) or min (rand_dir=1) value
+        mut      = (np.random.random(km.n_react)*100 < probaMut)[km.r_idx]
+        rand_dir = np.random.randint(0,2,km.size)
+        min_val  = km.ref*(1-km.incert)
+        max_val  = km.ref*(1+km.incert)
+        amp      = (np.random.random(km.size)*(1-ratio))**shape
+        change   = np.where(rand_dir==0,(max_val-genome)*amp,-(genome-min_val)*amp)
+        genome[mut] += change[mut]
+        genome[km.is_A] = np.abs(genome[km.is_A])   # avoid negative pre-exponential factor
 
     def mut_3_bound(self,conditions_list,optim_param,ref_results_list,created_ind,opt):
 
-        random.seed()
-        size_react = len(self.population[0].mech.react.kin)
+        km = self.kin_map
         size_pop   = int(optim_param.n_ind)
-        parent1    = random.randrange(0, size_pop)
+        parent1    = self.parents(optim_param,1)[0]
         child1     = int(size_pop+created_ind)
         probaMut   = optim_param.mut_intensity
-        self.population[child1] = copy.deepcopy(self.population[parent1])
 
-        for r in range(size_react):
-            rand = random.random()*100
-            incert_r = [u/100 for u in self.population[0].mech.react.incert[r]]
-            if rand < probaMut:
-                if self.population[0].mech.react.modif[r]:
-                    if self.population[0].mech.react.type[r] =='three_body_reaction' \
-                    or self.population[0].mech.react.type[r] =='reaction':
-                        for k in range(3):
-                            ref = self.population[0].mech.react.ref_kin[r][k]
-                            rand_dir = random.randrange(0,2)
-                            if rand_dir == 0: # random modif of a kinetic constant to the boundary value
-                                if k==0:
-                                    self.population[child1].mech.react.kin[r][k] \
-                                    = abs(ref*(1-incert_r[k]))
-                                else:
-                                    self.population[child1].mech.react.kin[r][k] \
-                                    = ref*(1-incert_r[k])
-                            elif rand_dir == 1:
-                                self.population[child1].mech.react.kin[r][k] \
-                                = ref*(1+incert_r[k])
-                    elif self.population[0].mech.react.type[r] =='falloff_reaction' \
-                    or   self.population[0].mech.react.type[r] =='pdep_arrhenius':
-                        for j in range(len(self.population[0].mech.react.kin[r])):
-                            for k in range(3):
-                                ref = self.population[0].mech.react.ref_kin[r][j][k]
-                                rand_dir = random.randrange(0,2)
-                                if rand_dir == 0: # random modif of a kinetic constant to the boundary value
-                                    if k==0:      # avoid negative pre-exponential factor
-                                        self.population[child1].mech.react.kin[r][j][k] \
-                                        = abs(ref*(1-incert_r[k]))
-                                    else:
-                                        self.population[child1].mech.react.kin[r][j][k] \
-                                        = ref*(1-incert_r[k])
-                                elif rand_dir == 1:
-                                    self.population[child1].mech.react.kin[r][j][k] \
-                                    = ref*(1+incert_r[k])
-#        self.population[child1].fitness_eval(conditions_list,optim_param,ref_results_list)
+        self.population[child1] = copy.deepcopy(self.population[parent1])
+        genome = self.population[child1].genome
+
+        # random modif of the kinetic constants of the mutated reactions
+        # to the boundary values
+        mut      = (np.random.random(km.n_react)*100 < probaMut)[km.r_idx]
+        rand_dir = np.random.randint(0,2,km.size)
+        bound    = np.where(rand_dir==0,km.ref*(1-km.incert),km.ref*(1+km.incert))
+        genome[mut] = bound[mut]
+        genome[km.is_A] = np.abs(genome[km.is_A])   # avoid negative pre-exponential factor
 
 
 
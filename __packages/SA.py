@@ -23,6 +23,8 @@
 import cantera as ct
 import numpy as np
 import __packages.Class_def as cdef
+import __packages.DRG as drg
+import __packages.Computation as comp
 from  __packages.Class_def import print_
 import pandas as pd
 import copy
@@ -56,9 +58,7 @@ def sensitivities_computation_SA(red_data, mech_data,red_results):
     n_points = len(pts_scatter)
     n_points_SA = int(red_data.red_op.n_points)
 
-    nu_f = gas_ref.reactant_stoich_coeffs()
-    nu_r = gas_ref.product_stoich_coeffs()
-    nu   = nu_f-nu_r
+    topo = mech_data.topo
 
     # Sensitivity coeff matrix
     if 'SARGEP' in red_data.reduction_operator:
@@ -166,8 +166,8 @@ def sensitivities_computation_SA(red_data, mech_data,red_results):
                                         for r in range(n_r_ref):
                                             if mech_data.react.activ_m[r]:
                                                 # Inter-species sensitivity calculation:
-                                                for spB in range(n_sp_ref):
-                                                    if (mech_data.spec.activ_m[spB] and nu[spB,r]!=0):
+                                                for spB in topo.r_species_net(r):
+                                                    if mech_data.spec.activ_m[spB]:
                                                         # collecting sensitivities of reactions involving both species
                                                         S_AB_tsp_z_r[z_i][r][spA,spB]=S_react_x[z_i][spA][r]
                         z_i+=1
@@ -219,37 +219,14 @@ def sensitivities_computation_SA(red_data, mech_data,red_results):
                     gas_red.set_multiplier(1+dk, r_red) # set the multiplier of kf for r reaction
 
 
-                    os.chdir(conditions.main_path)
-                    os.chdir('Flame_ref_results')
-
-                    fn = str(conditions.num)
-                    if 'free' in conditions.config or 'burner' in conditions.config:
-                        fn += 'ff_'
-                    elif 'tp_' in conditions.config:
-                        fn =+ 'tp_'
-                    else:
-                        fn += 'cf_'
-
-                    if 'diff' in conditions.config: phi = 'diff'
-                    else: phi = '%.2f' %conditions.composition.phi
-
-                    if conditions.state_var.P>10000:
-                        fn+=conditions.composition.fuel.replace('/','').split('(')[0]\
-                        +'_'+phi\
-                        +'_'+'%.0f'%conditions.state_var.T+'_'+'%.2f'%(conditions.state_var.P/1e5)\
-                        +'.xml'
-                    else:
-                        fn+=conditions.composition.fuel.replace('/','').split('(')[0]\
-                        +'_'+phi\
-                        +'_'+'%.0f'%conditions.state_var.T+'_'+'%.0f'%(conditions.state_var.P)\
-                        +'.xml'
+                    fn = comp.flame_key(conditions)
 
                     #=================================================
                     # supress console output during the simulation
                     if conditions.simul_param.verbose < 9:
                         old_stdout = sys.stdout ; old_stderr = sys.stderr
                         with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
-                    f.restore(fn, 'ref_solution')
+                    comp.restore_flame(f, fn, conditions)
                     # Initialize and solve
                     try:
                         f.solve(auto = False, loglevel = 0, refine_grid = False)
@@ -290,8 +267,8 @@ def sensitivities_computation_SA(red_data, mech_data,red_results):
             		                                  *((np.max([conc_pert[ired],0])-conc_red[spA])\
             		                                     /(kf_pert-kf_ref))
             		                                # Inter-species sensitivity calculation:
-            		                                for spB in range(n_sp_ref):
-            		                                    if (mech_data.spec.activ_m[spB] and nu[spB,r]!=0):
+            		                                for spB in topo.r_species_net(r):
+            		                                    if mech_data.spec.activ_m[spB]:
             		                                        # collecting sensitivities of reactions involving both species
             		                                        S_AB_tsp_z_r[z_i][r][spA,spB]=S_react_x[z_i][spA][r]
                                         else:
@@ -303,8 +280,8 @@ def sensitivities_computation_SA(red_data, mech_data,red_results):
                                                       *((np.max([conc_pert[ired],0])-conc_red[spA])\
                                                          /(kf_pert-kf_ref))
                                                     # Inter-species sensitivity calculation:
-                                                    for spB in range(n_sp_ref):
-                                                        if (mech_data.spec.activ_m[spB] and nu[spB,r]!=0):
+                                                    for spB in topo.r_species_net(r):
+                                                        if mech_data.spec.activ_m[spB]:
                                                             # collecting sensitivities of reactions involving both species
                                                             S_AB_tsp_z_r[z_i][r][tsp,spB]=S_react_x[z_i][tsp][r]
                             z_i+=1
@@ -470,8 +447,8 @@ def sensitivities_computation_SA(red_data, mech_data,red_results):
                                         print('toto')
                                 elif conditions.config == "reactor_HP":
                                     S_react_x[t_i][spA][r]=sensi_r_t[sp_red+2,r_red]
-                                for spB in range(n_sp_ref):
-                                    if mech_data.spec.activ_m[spB] and nu[spB, r] != 0:
+                                for spB in topo.r_species_net(r):
+                                    if mech_data.spec.activ_m[spB]:
                                         # Inter-species sensitivity calculation:
                                         # (sum of the sensitivities of reactions involving both species)
                                         if conditions.config == "reactor_UV":
@@ -487,8 +464,9 @@ def sensitivities_computation_SA(red_data, mech_data,red_results):
                         # S_AB_t sensitivity normalisation on t
                         max_S_AB_tsp_t = max(abs(S_AB_tsp_t[t_i][spA]))
                         if max_S_AB_tsp_t>0:
+                            r_sp_net = topo.r_species_net(r)
                             for spB in range(n_sp_ref):
-                                if mech_data.spec.activ_m[spB] and nu[spB, r] != 0:
+                                if mech_data.spec.activ_m[spB] and spB in r_sp_net:
                                     S_AB_tsp_t[t_i][spA,spB]=S_AB_tsp_t[t_i][spA,spB]/max_S_AB_tsp_t
                                 # keep only the max sens coeffs in all time steps
                                 if S_AB_tsp_t[t_i][spA,spB] > S_AB_tsp[spA,spB]:
@@ -565,6 +543,7 @@ def sensitivities_computation_SA(red_data, mech_data,red_results):
 
 
     red_data.red_op.sensi_sp = S_AB_tsp
+    red_data.red_op.OIC_table = {}      # reset of the precomputed sensi table
     red_data.red_op.sensi_r  = S_react
 
     if red_data.write_results:
@@ -577,6 +556,40 @@ def sensitivities_computation_SA(red_data, mech_data,red_results):
 
 
 
+def sensi_table(red_data,red_method,eps=False):
+    """ Species sensitivities of all the species for each target species,
+        normalized by the max of the target row :
+          SAR_sp   : direct coefficients
+          SARGEP_sp: max-product path coefficients in the sensi_sp graph
+        Without eps, the table is computed once per case and stored in
+        red_op.OIC_table, each eps step being then a threshold of it.      """
+
+    key = 'SARGEP' if red_method == 'SARGEP_sp' else 'SAR'
+    if eps is False and key in red_data.red_op.OIC_table:
+        return red_data.red_op.OIC_table[key]
+
+    sensi_AB = np.array(red_data.red_op.sensi_sp,dtype=float)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        sensi_AB = sensi_AB/np.max(sensi_AB,axis=1)[:,None]
+    sensi_AB = np.nan_to_num(sensi_AB)
+    tsp_idx  = red_data.targetSpeciesIdx
+
+    if key == 'SARGEP':
+        adj   = drg.ic_graph(sensi_AB)
+        S_tab = np.zeros((len(tsp_idx),len(sensi_AB)))
+        for t in range(len(tsp_idx)):
+            if eps is False: eps_t = 0
+            else:            eps_t = eps[t]
+            S_tab[t] = drg.graph_max_path(adj,tsp_idx[t],eps_t,'product')
+    else:
+        S_tab = sensi_AB
+
+    if eps is False: red_data.red_op.OIC_table[key] = S_tab
+
+    return S_tab
+
+
+
 def speciesWithdrawal(conditions, red_data, red_method, mech_data, eps):
         #gas, fuel, diluant, sensi_species, eps, target_species, active_species_main, verbose = 3) :
 
@@ -586,13 +599,6 @@ def speciesWithdrawal(conditions, red_data, red_method, mech_data, eps):
     gas  = red_data.gas_ref
 
 
-    #sensi_AB = red_data.red_op.sensi_sp
-    sensi_AB = copy.deepcopy(red_data.red_op.sensi_sp)
-    for sp in range(len(sensi_AB)):
-        sensi_AB[sp]=sensi_AB[sp]/max(sensi_AB[sp])
-
-
-
     tsp_idx = red_data.targetSpeciesIdx
     verbose=conditions.simul_param.verbose
 
@@ -615,78 +621,20 @@ def speciesWithdrawal(conditions, red_data, red_method, mech_data, eps):
             if not active_species[ind_spec]: active_species[ind_spec]=True
 
 
-    if red_method == 'SARGEP_sp':
-
-    # Dijkstra algorithm
-        tspi =-1
-        for tsp in tsp_idx:
-                tspi +=1
-                mpq_list = []
-
-                # max-priority queue (mpq) construction
-                OIC = []
-                for spA in range(ns):
-                    OIC.append(sensi_AB[tsp, spA])
-                    if OIC[spA] > eps[tspi]:
-                        mpq_list.append(spA)
-
-                for mpq in range(len(mpq_list)):
-    #                R = np.array((ns,ns))
-                    R_max=[] ; visited_sp=[]
-                    for sp in range(ns):
-                        R_max.append(OIC[mpq]*sensi_AB[mpq,sp])
-                        visited_sp.append([tspi,sp])
-                        if OIC[mpq]*sensi_AB[mpq,sp] > eps[tspi]:
-                            active_species[sp] = True
-                    R_max[tspi]=0 ; R_max[mpq]=0
-
-
-                    # graph search
-                    idx_node = R_max.index(max(R_max))
-                    while max(R_max)>eps[tspi]:
-                        # node informations
-                        visited_sp_node = visited_sp[idx_node]
-
-                        # interaction coefficients of the step
-                        Ri = []
-                        for sp in range(ns):
-                            if sp not in visited_sp_node:
-                                Ri.append(R_max[idx_node]*sensi_AB[idx_node,sp])
-                                if Ri[-1]>eps[tspi]:
-                                    active_species[sp] = True
-                            else:
-                                Ri.append(0)
-
-                        # record informations on the present step of graph analysis
-                        R_max[idx_node]=max(Ri)
-                        visited_sp[idx_node].append(Ri.index(max(Ri)))
-                        if max(Ri)>max(R_max):
-                            idx_node = Ri.index(max(Ri))
-                        else:
-                            idx_node = R_max.index(max(R_max))
-
-        ## Species sensitivities based withdrawal
-        #for t in range(len(tsp_idx)):
-            #spA=tsp_idx[t]
-            #if not active_species[spA]: active_species[spA]=True
-            #for spB in range(ns):
-                #if not mech_data.spec.activ_m[spB]:
-                    #active_species[spB] = False
-                #else:
-                    #if sensi_AB[t][spB]>eps[t] and not active_species[spB]:
-                        #active_species[spB]=True
+    # interaction coefficients of the species for each target species
+    if red_data.red_op.precomp_OIC:
+        S_tab = sensi_table(red_data,red_method)
+    else:
+        S_tab = sensi_table(red_data,red_method,eps)
 
-    if '_sp' in red_method:
-        # Species sensitivities based withdrawal
-        for t in range(len(tsp_idx)):
-            spA=tsp_idx[t]
-            if not active_species[spA]: active_species[spA]=True
-            for spB in range(ns):
-                if not mech_data.spec.activ_m[spB]:
-                    active_species[spB] = False
-                else:
-                    if sensi_AB[t][spB]>eps[t] and not active_species[spB]:
-                        active_species[spB]=True
+    # Species sensitivities based withdrawal
+    for t in range(len(tsp_idx)):
+        active_species[tsp_idx[t]] = True
+        for spB in np.nonzero(S_tab[t]>eps[t])[0]:
+            active_species[spB] = True
+    for spB in range(ns):
+        if not mech_data.spec.activ_m[spB]:
+            active_species[spB] = False
 
     return active_species
 
@@ -710,8 +658,7 @@ def reactionWithdrawal(conditions, mech_data,active_species,red_data,red_method,
 
     tsp_idx = red_data.targetSpeciesIdx
 
-    nu_f =gas_ref.reactant_stoich_coeffs()
-    nu_r =gas_ref.product_stoich_coeffs()
+    topo = mech_data.topo
 
     active_reactions = list(mech_data.react.activ_p)
 
@@ -730,17 +677,10 @@ def reactionWithdrawal(conditions, mech_data,active_species,red_data,red_method,
 
     # define new activated species / reactions based on species sensitivities
     if '_sp' in red_method:
-        active_reactions = [True]*len(mech_data.react.activ_p)
-        for r in range(nr):
-            if not mech_data.react.activ_m[r]:
-                active_reactions[r] = False
-            else:
-                for sp in range(ns):
-                    # remove reactions involving non active species
-                    if not active_species[sp]:
-                        if nu_f[sp][r]!=0 or nu_r[sp][r]!=0:
-                            active_reactions[r] = False
-                            break
+        # remove reactions involving non active species
+        r_removed = topo.reactions_involving(np.logical_not(active_species))
+        active_reactions = [bool(mech_data.react.activ_m[r] and not r_removed[r])\
+                            for r in range(nr)]
 
 
     # define new activated species / reactions based on reactions sensitivities
@@ -788,14 +728,12 @@ def reactionWithdrawal(conditions, mech_data,active_species,red_data,red_method,
         except:
             A=2
 
+        # keep species involved in active reactions
+        sp_involved = topo.species_involved(active_reactions)
         for sp in range(ns):
-            if not active_species[sp]:
-                if mech_data.spec.activ_m[sp]:
-                    for r in range(nr):
-                        if active_reactions[r]:
-                            if nu_f[sp][r] != 0 or nu_r[sp][r] != 0:
-                                active_species[sp]=True
-                                break
+            if not active_species[sp] and mech_data.spec.activ_m[sp] \
+            and sp_involved[sp]:
+                active_species[sp]=True
 
     # check threebody exception (+AR) (+HE) etc.
     for r in range(len(mech_data.react.formula)):
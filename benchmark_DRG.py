@@ -0,0 +1,188 @@
+"""
+    Brookesia
+    Reduction and optimization of kinetic mechanisms
+
+    Copyright (C) 2019  Matynia, Delaroque, Chakravarty
+    contact : alexis.matynia@sorbonne-universite.fr
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+#==============================================================================
+#    Benchmark of the direct interaction coefficients computation
+#
+#    usage : python benchmark_DRG.py [mech_1.cti mech_2.cti ...]
+#
+#    - DRG.dic_par (vectorized) is timed on each mechanism
+#    - DRG.dic_par_loop (former loop version) is used as reference for the
+#      accuracy check. Its cost is O(nr.ns^2), so it is only run on the
+#      mechanisms with less than ns_check_max species (and on one point)
+#    - accuracy criteria :
+#       rates of progress: |q - q_loop| < tol_q.(q_fwd + q_rev)
+#       coefficients     : max|dic - dic_loop| < tol_dic  (dic in [0,1])
+#      The net rates of reactions close to (partial) equilibrium are
+#      dominated by round-off errors (q_fwd ~ q_rev) in both versions, so
+#      the coefficients are compared on the same rates of progress.
+#    - end-to-end check of the timed DRG.dic_par output against dic_par_loop:
+#       |dic_par - dic_loop| < tol_dic + tol_rnd.(|nu|.(q_fwd+q_rev)).delta/den
+#      (round-off of the net rates propagated to the coefficients)
+#==============================================================================
+
+import os
+import sys
+import time as timer
+import numpy as np
+import cantera as ct
+
+import __packages.DRG as drg
+import __packages.Class_def as cdef
+
+mech_dir     = '_kinetic_mech'
+mech_bench   = ['C7_Mehl.cti','C12_Mehl.cti']
+mech_check   = ['C0_H2_Law.cti','C1_GRI30.cti']
+n_points     = 10          # number of sampling points (as red_op.n_points)
+ns_check_max = 200         # max number of species for the loop reference
+tol_q        = 1e-12       # max relative difference on the rates of progress
+tol_dic      = 1e-8        # max absolute difference on the coefficients
+tol_rnd      = 1e-9        # max relative round-off of the net rates (end-to-end check)
+T_list       = np.linspace(1000,2500,n_points)
+
+
+def get_states(gas):
+    """ Synthetic sampling points: stoichiometric fuel/air mixture partially
+        burnt (blend of fresh and equilibrium compositions). Equilibrium
+        states alone are not used : fwd and rev rates cancel out and the net
+        rates are dominated by round-off errors in both versions.          """
+
+    fuel = False
+    for sp in ['NC12H26','NC7H16','CH4','H2']:
+        if sp in gas.species_names:
+            fuel = sp ; break
+    n_H = gas.n_atoms(fuel,'H')
+    if 'C' in gas.element_names: n_C = gas.n_atoms(fuel,'C')
+    else:                        n_C = 0
+    X   = fuel+':1, O2:'+str(n_C+n_H/4)+', N2:'+str(3.76*(n_C+n_H/4))
+
+    kf = [] ; kr = [] ; conc = []
+    for i,T in enumerate(T_list):
+        gas.TPX = T, ct.one_atm, X
+        X_fresh = gas.X
+        gas.equilibrate('TP')
+        prog = (i+1)/(n_points+1)        # progress variable
+        gas.TPX = T, ct.one_atm, prog*gas.X+(1-prog)*X_fresh
+        kf.append(np.array(gas.forward_rate_constants))
+        kr.append(np.array(gas.reverse_rate_constants))
+        conc.append(np.array(gas.concentrations))
+
+    return kf, kr, conc
+
+
+def reaction_rates_loop(k_f,k_r,conc,nu_f,nu_r):
+    """ former loop computation of the forward and reverse rates """
+
+    ns, nr = nu_f.shape
+    fRate = np.ones(nr) ; rRate = np.ones(nr)
+    for r in range(nr):
+        for sp in range(ns):
+            if nu_f[sp, r]!=0 or nu_r[sp, r]!=0:
+                fRate[r] *= (1e3*conc[sp])**nu_f[sp, r]
+                rRate[r] *= (1e3*conc[sp])**nu_r[sp, r]
+        fRate[r] *= k_f[r]
+        rRate[r] *= k_r[r]
+
+    return fRate, rRate
+
+
+def dic_arg(topo,dense=False):
+
+    ns = topo.ns ; nr = topo.nr
+    nu_f = topo.nu_f ; nu_r = topo.nu_r ; nu = topo.nu
+    kronecker = topo.incid.astype(float)
+    if dense:
+        nu_f = nu_f.toarray() ; nu_r = nu_r.toarray() ; nu = nu.toarray()
+        kronecker = kronecker.toarray()
+
+    return [ns, nr, [True]*nr, [True]*ns, nu, nu_f, nu_r, kronecker]
+
+
+def bench_mech(mech, check):
+
+    # supress console output during the interpretation
+    old_stdout = sys.stdout ; old_stderr = sys.stderr
+    with open(os.devnull, "w") as devnull: sys.stdout = devnull ; sys.stderr = devnull
+    gas = ct.Solution(os.path.join(mech_dir,mech))
+    sys.stdout = old_stdout ; sys.stderr = old_stderr
+
+    topo         = cdef.Mech_topology(gas)
+    dic_par_arg  = dic_arg(topo)
+    kf, kr, conc = get_states(gas)
+    args = [[dic_par_arg,kf[i],kr[i],conc[i],i] for i in range(n_points)]
+
+    print(mech+' : '+str(gas.n_species)+' species / '\
+          +str(gas.n_reactions)+' reactions')
+
+    time_1 = timer.time()
+    dic_vec = [drg.dic_par(arg) for arg in args]
+    time_2 = timer.time()
+    print('   vectorized : '+'%.3f' %((time_2-time_1)/n_points)+' s/point')
+
+    if check and gas.n_species <= ns_check_max:
+        dic_par_arg, k_f, k_r, conc, i = args[-1]
+        dic_par_arg = dic_arg(topo,dense=True)
+        ns, nr, react_activ, spec_activ, nu, nu_f, nu_r, kronecker = dic_par_arg
+
+        time_1 = timer.time()
+        dic_loop = drg.dic_par_loop([dic_par_arg, k_f, k_r, conc, i])
+        time_2 = timer.time()
+        print('   loop       : '+'%.3f' %(time_2-time_1)+' s/point')
+
+        fRate, rRate = reaction_rates_loop(k_f,k_r,conc,nu_f,nu_r)
+        q     = drg.reaction_rates(k_f,k_r,conc,nu_f,nu_r,react_activ)
+        err_q = np.max(np.abs(q-(fRate-rRate))/np.maximum(fRate+rRate,1e-300))
+        dic   = drg.dic_coeffs(nu,fRate-rRate,kronecker,spec_activ)
+        err   = max(np.max(np.abs(dic-dic_loop[0])),\
+                    np.max(np.abs(dic-drg.dic_coeffs(topo.nu,fRate-rRate,\
+                                   topo.incid.astype(float),spec_activ))))
+        # timed vectorized output (same point), tolerance scaled by the
+        # round-off of the net rates
+        nu_q    = nu*(fRate-rRate)
+        den     = np.maximum(np.sum(np.maximum(0,nu_q),axis=1),\
+                             np.sum(np.maximum(0,-nu_q),axis=1))
+        scale   = (np.abs(nu)*(fRate+rRate)).dot(kronecker.T)\
+                  /np.maximum(den,1e-300)[:,None]
+        err_par = np.max(np.abs(dic_vec[-1][0]-dic_loop[0])/(tol_dic+tol_rnd*scale))
+
+        print('   max |q - q_loop|/(q_f+q_r) = '+'%.2e' %err_q+'  (tol: '+'%.0e' %tol_q+')')
+        print('   max |dic - dic_loop|       = '+'%.2e' %err+'  (tol: '+'%.0e' %tol_dic+')')
+        print('   dic_par / dic_par_loop     = '+'%.2e' %err_par+'  (tol: 1, round-off scaled)')
+        if err_q > tol_q or err > tol_dic or err_par > 1:
+            print('   ERROR: vectorized DIC out of tolerance')
+            return False
+
+    return True
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv)>1:
+        mech_list = [(m,True) for m in sys.argv[1:]]
+    else:
+        mech_list = [(m,True) for m in mech_check] \
+                  + [(m,False) for m in mech_bench]
+
+    success = True
+    for mech,check in mech_list:
+        success = bench_mech(mech,check) and success
+
+    if not success: sys.exit(1)
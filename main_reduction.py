@@ -41,7 +41,9 @@ from  __packages.Class_def import print_
 print('\n'*100)
 
 
-def run_reduction(filename):
+def run_reduction(filename,resume=False):
+    """ resume: folder of a killed run (main_path), restarted from its
+        checkpoints                                                     """
 
     #==============================================================================
     #%%      Read reduction conditions
@@ -49,6 +51,15 @@ def run_reduction(filename):
 
     conditions_list, red_data_list, ref_results_list = genf.get_reduction_parameters(filename)
 
+    if resume:
+        mp = os.path.abspath(resume)
+        for cond in conditions_list:
+            cond.main_path = mp
+            cond.simul_param.resume = True
+        for red_data in [rd for op_list in red_data_list for rd in op_list]:
+            if hasattr(red_data,'optim_param'):
+                red_data.optim_param.main_path = mp
+
 
     #==============================================================================
     #%%      New folder creation
@@ -73,6 +84,7 @@ def run_reduction(filename):
     os.chdir(conditions_list[0].main_path)
 
     print_('Computed with :\n * Cantera  '+ct.__version__+'\n * Brookesia 1.0\n\n',mp)
+    if resume: print_('Resumed run\n\n',mp)
 
     try:
         #==============================================================================
@@ -108,11 +120,8 @@ def run_reduction(filename):
         #==============================================================================
 
         if not ref_results_list:  # if no external data provided
-            ref_results_list = []
-            for i in range(len(conditions_list)):
-                results,conditions = genf.computation_reference(conditions_list[i],verbose)
-                conditions_list[i] = conditions
-                ref_results_list.append(results)
+            conditions_list, ref_results_list = \
+                genf.computation_references(conditions_list,verbose)
 
     #    ref_results_list[0].plotData_opt(['CH4'])
 
@@ -147,8 +156,12 @@ def run_reduction(filename):
     except:
         print_(traceback.format_exc(),mp)
 
+# python main_reduction.py input_file [--resume main_path_of_the_killed_run]
 if len(sys.argv)>1:
     filename = sys.argv[1]
-    run_reduction(filename)
+    resume   = False
+    if '--resume' in sys.argv:
+        resume = sys.argv[sys.argv.index('--resume')+1]
+    run_reduction(filename,resume)
 
 #run_reduction('1_reactor_pts.inp')